@@ -15,6 +15,8 @@
 
 """API handlers for retrieving Chrome channel release schedules and milestones."""
 
+import time
+
 import settings
 from framework import basehandlers
 from internals import fetchchannels
@@ -132,6 +134,17 @@ def construct_specified_milestones_details(start, end):
 class ChannelsAPI(basehandlers.APIHandler):
     """Channels are the Chrome Versions across platforms."""
 
+    def get_etag_version(self, **kwargs):
+        """Return the current versions and the period of cached schedules."""
+        if settings.UNIT_TEST_MODE or settings.PLAYWRIGHT_MODE:
+            return 'test'
+        omaha_data = fetchchannels.get_omaha_data()
+        versions = [v['version'] for v in omaha_data[0]['versions']]
+        # Schedules are fetched again when their cache entries expire, so a
+        # response is not reused after the period in which it was cached.
+        period = int(time.time()) // fetchchannels.SCHEDULE_CACHE_TIME
+        return '%s|%d' % (','.join(versions), period)
+
     def do_get(self, **kwargs):
         """Get channel release information."""
         # Query-string parameters 'start' and 'end' are provided
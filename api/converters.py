@@ -148,10 +148,8 @@ def _prep_stage_info(
     if prefetched_stages is not None:
         stages = prefetched_stages
     else:
-        stages = Stage.query(
-            Stage.feature_id == fe.key.integer_id(),
-            Stage.archived == False,  # noqa: E501, E712
-        )
+        feature_id = fe.key.integer_id()
+        stages = stage_helpers.get_stages_by_feature([feature_id])[feature_id]
     stage_info: StagePrepResponse = {
         'proto': None,
         'dev_trial': None,
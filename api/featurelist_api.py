@@ -19,15 +19,25 @@
 
 from framework import basehandlers, permissions, users
 from internals import feature_helpers
+from internals.core_models import FeatureEntry
 
 
 class FeaturesJsonHandler(basehandlers.EntitiesAPIHandler):
     """Handler for returning features list in JSON format."""
 
+    STREAM_JSON = True
+
+    def get_etag_version(self, **kwargs):
+        """The list changes when any feature or stage does."""
+        version = FeatureEntry.get_version()
+        if version is None:
+            return None
+        user = users.get_current_user()
+        return '%d|%s' % (version, permissions.can_edit_any_feature(user))
+
     def do_get(self, **kwargs):
-        """Returns feature data in JSON format."""
+        """Returns feature data in JSON format, one feature at a time."""
         user = users.get_current_user()
-        feature_list = feature_helpers.get_features_by_impl_status(
+        return feature_helpers.iter_features_by_impl_status(
             show_unlisted=permissions.can_edit_any_feature(user)
         )
-        return feature_list
@@ -35,6 +35,7 @@ from internals import (
     processes,
     releasenotes_l10n_helpers,
     search,
+    search_cache,
     search_fulltext,
     stage_helpers,
 )
@@ -64,6 +65,8 @@ DEVREL_EMAIL = 'devrel-chromestatus-all@google.com'
 class FeaturesAPI(basehandlers.EntitiesAPIHandler):
     """Features are the the main records that we track."""
 
+    STREAM_JSON = True
+
     def get_one_feature(self, feature_id: int) -> VerboseFeatureDict:
         """Get a single feature by ID."""
         fe = self.get_specified_feature(feature_id=feature_id)
@@ -137,10 +140,42 @@ class FeaturesAPI(basehandlers.EntitiesAPIHandler):
         except ValueError as err:
             self.abort(400, msg=str(err))
 
-        return {
+        result = {
             'total_count': total_count,
             'features': features_on_page,
         }
+        if self.get_bool_arg('explain'):
+            result['plan'] = search.explain_query(
+                user_query,
+                show_unlisted=show_unlisted_features,
+                show_enterprise=show_enterprise,
+            )
+        return result
+
+    def get_etag_version(self, **kwargs) -> str | None:
+        """Return the versions of the data that a GET response depends on."""
+        feature_id = kwargs.get('feature_id', None)
+        if feature_id:
+            # Don't reveal whether a feature changed to users who can't view it.
+            self.get_specified_feature(feature_id=feature_id)
+            version = FeatureEntry.get_version(feature_id)
+            return None if version is None else str(version)
+
+        user_query = self.request.args.get('q', '')
+        if search.is_time_based(user_query) or self.request.args.get('lang'):
+            # Results can change without any entity changing.
+            return None
+        version = FeatureEntry.get_version()
+        if version is None:
+            return None
+        user = users.get_current_user()
+        dependencies = [search_cache.GATES, search_cache.VOTES]
+        if user:
+            dependencies.append(search_cache.starred_by(user.email()))
+        return '|'.join(
+            [str(version), str(permissions.can_edit_any_feature(user))]
+            + [str(search_cache.get_generation(d)) for d in dependencies]
+        )
 
     def do_get(self, **kwargs):
         """Handle GET requests for a single feature or a search."""
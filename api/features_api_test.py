@@ -269,6 +269,23 @@ class FeaturesAPITest(testing_config.CustomTestCase):
         self.assertEqual('feature two', actual['features'][0]['name'])
         self.assertEqual('feature one', actual['features'][1]['name'])
 
+    def test_get__explain(self):
+        """We can see the plan used to evaluate the query terms."""
+        url = self.request_path + (
+            '?q=category%3DSecurity%20name%3D%22feature%20one%22'
+        )
+        with test_app.test_request_context(url):
+            actual = self.handler.do_get()
+        self.assertNotIn('plan', actual)
+
+        with test_app.test_request_context(url + '&explain=1'):
+            actual = self.handler.do_get()
+        self.assertEqual(
+            ['category=Security', 'name="feature one"'],
+            sorted(step['term'] for step in actual['plan']['steps']),
+        )
+        self.assertEqual(4, actual['plan']['num_features'])
+
     def test_get__all_listed_feature_names(self):
         """Get all feature names that are listed."""
         url = self.request_path + '?name_only=true'
@@ -53,6 +53,28 @@ def _datapoints_to_json_dicts(datapoints):
     return json_dicts
 
 
+def _timeline_to_json_dicts(bucket_id, timeline):
+    user = users.get_current_user()
+    # Don't show raw percentages if user is not a googler.
+    full_precision = _is_googler(user)
+
+    json_dicts = [
+        {
+            'bucket_id': bucket_id,
+            'date': str(date),  # YYYY-MM-DD
+            # Nine significant digits are enough to show each float32.
+            'day_percentage': (
+                float('%.9g' % percentage)
+                if full_precision
+                else round(percentage, ROUNDING)
+            ),
+            'property_name': timeline.property_name,
+        }
+        for date, percentage in timeline.get_points()
+    ]
+    return json_dicts
+
+
 class TimelineHandler(basehandlers.FlaskHandler):
     """Handler for returning timeline data for a given bucket."""
 
@@ -83,18 +105,33 @@ class TimelineHandler(basehandlers.FlaskHandler):
 
         cache_key = '%s|%s' % (self.CACHE_KEY, bucket_id)
 
-        datapoints = rediscache.get(cache_key)
+        timeline = rediscache.get(cache_key)
+
+        if timeline is None:
+            timeline = self.get_timeline(bucket_id)
+            rediscache.set(cache_key, timeline, time=CACHE_AGE)
 
-        if not datapoints:
+        return _timeline_to_json_dicts(bucket_id, timeline)
+
+    def get_timeline(self, bucket_id):
+        """Load the timeline of a bucket, building it on the first request.
+
+        After that, the metrics cron job appends each day to it.
+        """
+        timeline_key = metrics_models.MetricsTimeline.make_key(
+            self.MODEL_CLASS, bucket_id
+        )
+        timeline = timeline_key.get()
+        if timeline is None:
             query = self.make_query(bucket_id)
             query = query.order(self.MODEL_CLASS.date)
             datapoints = query.fetch(None)  # All matching results.
-
-            # Remove outliers if percentage is not between 0-1.
-            # datapoints = filter(lambda x: 0 <= x.day_percentage <= 1, datapoints)
-            rediscache.set(cache_key, datapoints, time=CACHE_AGE)
-
-        return _datapoints_to_json_dicts(datapoints)
+            timeline = metrics_models.MetricsTimeline.from_datapoints(
+                self.MODEL_CLASS, bucket_id, datapoints
+            )
+            if datapoints:
+                timeline.put()
+        return timeline
 
 
 class PopularityTimelineHandler(TimelineHandler):
@@ -149,49 +186,18 @@ class FeatureHandler(basehandlers.FlaskHandler):
     CACHE_PREFIX = 'metrics|'
 
     def __query_metrics_for_properties(self):
-        datapoints = []
-
-        buckets_future = self.PROPERTY_CLASS.query().fetch_async(None)
+        # The rows are written by fetchmetrics, and by the
+        # /scripts/backfill_latest_metrics maintenance script for older data.
+        latest_metrics = metrics_models.LatestMetric.get_all(self.MODEL_CLASS)
 
-        # First, grab a bunch of recent datapoints in a batch.
-        # That operation is fast and makes most of the iterations
-        # of the main loop become in-RAM operations.
-        batch_datapoints_query = self.MODEL_CLASS.query()
-        batch_datapoints_query = batch_datapoints_query.order(
-            -self.MODEL_CLASS.date
-        )
-        batch_datapoints_list = batch_datapoints_query.fetch(5000)
-        logging.info(
-            'batch query found %r recent datapoints', len(batch_datapoints_list)
-        )
-        batch_datapoints_dict = {}
-        for dp in batch_datapoints_list:
-            if dp.bucket_id not in batch_datapoints_dict:
-                batch_datapoints_dict[dp.bucket_id] = dp
-        logging.info(
-            'batch query found datapoints for %r buckets',
-            len(batch_datapoints_dict),
-        )
-
-        # For every css property, fetch latest day_percentage.
-        buckets = buckets_future.get_result()
-        futures = []
-        for b in buckets:
-            if b.bucket_id in batch_datapoints_dict:
-                datapoints.append(batch_datapoints_dict[b.bucket_id])
-            else:
-                query = self.MODEL_CLASS.query()
-                query = query.filter(self.MODEL_CLASS.bucket_id == b.bucket_id)
-                query = query.order(-self.MODEL_CLASS.date)
-                futures.append(query.get_async())
-
-        for f in futures:
-            last_result = f.result()
-            if last_result:
-                datapoints.append(last_result)
+        # Only list the buckets that have a name in the histogram.
+        bucket_names = self.PROPERTY_CLASS.get_all()
+        datapoints = [
+            dp for dp in latest_metrics if dp.bucket_id in bucket_names
+        ]
 
         # Sort list by percentage. Highest first.
-        datapoints.sort(key=lambda x: x.day_percentage, reverse=True)
+        datapoints.sort(key=lambda x: x.day_percentage or 0, reverse=True)
         return datapoints
 
     def get_template_data(self, **kwargs):
@@ -315,3 +321,96 @@ class FeatureBucketsHandler(basehandlers.FlaskHandler):
             )
 
         return properties
+
+
+def _summary_to_json_dict(summary):
+    user = users.get_current_user()
+    # Don't show raw percentages if user is not a googler.
+    full_precision = _is_googler(user)
+    if full_precision:
+        return summary
+    return {
+        name: round(value, ROUNDING) if isinstance(value, float) else value
+        for name, value in summary.items()
+    }
+
+
+class MetricsSummaryHandler(basehandlers.FlaskHandler):
+    """Base handler for the rolling means and movers of a metrics model."""
+
+    HTTP_CACHE_TYPE = 'private'
+    JSONIFY = True
+
+    TYPE_TO_MODEL_CLASS = {
+        'cssanimated': metrics_models.AnimatedProperty,
+        'csspopularity': metrics_models.StableInstance,
+        'featurepopularity': metrics_models.FeatureObserver,
+        'webfeaturepopularity': metrics_models.WebDXFeature,
+    }
+
+    def get_summary(self, metric_type):
+        """Return the stored MetricsSummary of a metric type, or None."""
+        model_class = self.TYPE_TO_MODEL_CLASS.get(metric_type)
+        if model_class is None:
+            self.abort(404, msg='Unknown metric type %r' % metric_type)
+
+        # The metrics cron job stores a new summary and then deletes the
+        # cached copy along with the other keys that start with 'metrics|'.
+        cache_key = 'metrics|summary|%s' % model_class._get_kind()
+        summary = rediscache.get(cache_key)
+        if summary is None:
+            summary = metrics_models.MetricsSummary.make_key(model_class).get()
+            if summary is None:
+                return None
+            rediscache.set(cache_key, summary, time=CACHE_AGE)
+        return summary
+
+
+class BucketSummaryHandler(MetricsSummaryHandler):
+    """Handler for the rolling means and weekly deltas of each bucket."""
+
+    def get_template_data(self, **kwargs):
+        """Return the summaries of all buckets, or of just one."""
+        summary = self.get_summary(kwargs.get('metric_type'))
+        if summary is None:
+            return {'as_of': None, 'milestone_start': None, 'buckets': []}
+
+        buckets = summary.summaries
+        bucket_id = self.get_int_arg('bucket_id')
+        if bucket_id is not None:
+            buckets = [b for b in buckets if b['bucket_id'] == bucket_id]
+        return {
+            'as_of': str(summary.as_of),
+            'milestone_start': (
+                str(summary.milestone_start)
+                if summary.milestone_start
+                else None
+            ),
+            'buckets': [_summary_to_json_dict(b) for b in buckets],
+        }
+
+
+class MoversHandler(MetricsSummaryHandler):
+    """Handler for the buckets with the largest weekly rises and falls."""
+
+    DEFAULT_NUM = 20
+
+    def get_template_data(self, **kwargs):
+        """Return the summaries of the top risers and fallers."""
+        summary = self.get_summary(kwargs.get('metric_type'))
+        if summary is None:
+            return {'as_of': None, 'risers': [], 'fallers': []}
+
+        num = self.get_int_arg('num', self.DEFAULT_NUM)
+        summaries_by_bucket_id = {b['bucket_id']: b for b in summary.summaries}
+        return {
+            'as_of': str(summary.as_of),
+            'risers': [
+                _summary_to_json_dict(summaries_by_bucket_id[bucket_id])
+                for bucket_id in summary.movers['risers'][:num]
+            ],
+            'fallers': [
+                _summary_to_json_dict(summaries_by_bucket_id[bucket_id])
+                for bucket_id in summary.movers['fallers'][:num]
+            ],
+        }
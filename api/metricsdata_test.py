@@ -19,6 +19,7 @@ from unittest import mock
 
 import flask
 import werkzeug.exceptions
+from google.cloud import ndb  # type: ignore
 
 import testing_config  # Must be imported first
 from api import metricsdata
@@ -134,6 +135,42 @@ class PopularityTimelineHandlerTests(testing_config.CustomTestCase):
         self.assertEqual(1, len(actual_datapoints))
         self.assertEqual(0.01234568, actual_datapoints[0]['day_percentage'])
 
+    def test_get_template_data__timeline(self):
+        """The timeline is built once, and then appended to by the cron."""
+        testing_config.sign_in('test@google.com', 111)
+        url = '/data/timeline/csspopularity?bucket_id=1'
+        with test_app.test_request_context(url):
+            self.handler.get_template_data()
+        timeline = metrics_models.MetricsTimeline.make_key(
+            metrics_models.StableInstance, 1
+        ).get()
+        self.assertEqual('prop', timeline.property_name)
+
+        timeline.add_points([(datetime.date(2000, 1, 1), 0.5)])
+        timeline.put()
+        rediscache.delete_keys_with_prefix('metrics')
+        with test_app.test_request_context(url):
+            actual_datapoints = self.handler.get_template_data()
+
+        self.assertEqual(
+            [
+                {
+                    'bucket_id': 1,
+                    'date': '2000-01-01',
+                    'day_percentage': 0.5,
+                    'property_name': 'prop',
+                },
+                {
+                    'bucket_id': 1,
+                    'date': str(datetime.date.today()),
+                    'day_percentage': 0.0123456791,
+                    'property_name': 'prop',
+                },
+            ],
+            actual_datapoints,
+        )
+        timeline.key.delete()
+
 
 class CSSPopularityHandlerTests(testing_config.CustomTestCase):
     """Tests for CSSPopularityHandler."""
@@ -149,6 +186,11 @@ class CSSPopularityHandlerTests(testing_config.CustomTestCase):
             property_name='b prop',
         )
         self.datapoint.put()
+        ndb.put_multi(
+            metrics_models.LatestMetric.merge(
+                metrics_models.StableInstance, [self.datapoint]
+            )
+        )
         # Set up CssPropertyHistogram data.
         self.prop_1 = metrics_models.CssPropertyHistogram(
             bucket_id=1, property_name='b prop'
@@ -167,6 +209,11 @@ class CSSPopularityHandlerTests(testing_config.CustomTestCase):
         )
         self.prop_4.put()
 
+    def tearDown(self):
+        """Clean up the test environment."""
+        for row in metrics_models.LatestMetric.query():
+            row.key.delete()
+
     def test_get_top_num_cache_key(self):
         """Test get top num cache key."""
         actual = self.handler.get_top_num_cache_key(30)
@@ -207,6 +254,39 @@ class CSSPopularityHandlerTests(testing_config.CustomTestCase):
         self.assertEqual(1, len(actual_datapoints))
         self.assertEqual(0.0123456789, actual_datapoints[0].day_percentage)
 
+    def test_get_template_data__latest_metrics(self):
+        """The latest datapoints are read from LatestMetric rows."""
+        url = '/data/csspopularity'
+        metrics_models.LatestMetric(
+            key=metrics_models.LatestMetric.make_key(
+                metrics_models.StableInstance, 2
+            ),
+            metric_kind='StableInstance',
+            bucket_id=2,
+            property_name='a prop',
+            date=datetime.date.today(),
+            day_percentage=0.5,
+        ).put()
+        rediscache.delete_keys_with_prefix('metrics')
+        with test_app.test_request_context(url):
+            actual_datapoints = self.handler.get_template_data()
+
+        self.assertEqual([2, 1], [dp['bucket_id'] for dp in actual_datapoints])
+
+    def test_get_template_data__no_backfill(self):
+        """Datapoints without a LatestMetric row are not queried."""
+        metrics_models.StableInstance(
+            day_percentage=0.5,
+            date=datetime.date.today(),
+            bucket_id=2,
+            property_name='a prop',
+        ).put()
+        url = '/data/csspopularity'
+        with test_app.test_request_context(url):
+            actual_datapoints = self.handler.get_template_data()
+
+        self.assertEqual([1], [dp['bucket_id'] for dp in actual_datapoints])
+
 
 class FeatureBucketsHandlerTest(testing_config.CustomTestCase):
     """Tests for FeatureBucketsHandler."""
@@ -262,3 +342,82 @@ class FeatureBucketsHandlerTest(testing_config.CustomTestCase):
                 prop_type='webfeatureprops'
             )
         self.assertEqual([(6, 'HTTP/3'), (5, 'Popover')], actual_buckets)
+
+
+class MetricsSummaryHandlerTest(testing_config.CustomTestCase):
+    """Tests for BucketSummaryHandler and MoversHandler."""
+
+    def setUp(self):
+        """Cache the summary of FeatureObserver datapoints."""
+        self.summaries = [
+            {
+                'bucket_id': bucket_id,
+                'property_name': 'prop%d' % bucket_id,
+                'date': '2026-03-31',
+                'day_percentage': 0.0123456789,
+                'mean_7': 0.0123456789,
+                'mean_28': 0.01,
+                'milestone_mean': None,
+                'week_over_week_delta': delta,
+            }
+            for bucket_id, delta in [(1, 0.0023456789), (2, -0.001), (3, 0.0)]
+        ]
+        self.summary = metrics_models.MetricsSummary(
+            id='FeatureObserver',
+            as_of=datetime.date(2026, 3, 31),
+            milestone_start=datetime.date(2026, 3, 3),
+            summaries=self.summaries,
+            movers={'risers': [1], 'fallers': [2]},
+        )
+        rediscache.set('metrics|summary|FeatureObserver', self.summary)
+        testing_config.sign_in('test@google.com', 111)
+
+    def tearDown(self):
+        """Sign out."""
+        testing_config.sign_out()
+
+    def test_bucket_summary(self):
+        """All buckets are returned at full precision to googlers."""
+        handler = metricsdata.BucketSummaryHandler()
+        with test_app.test_request_context('/data/summary/featurepopularity'):
+            actual = handler.get_template_data(metric_type='featurepopularity')
+        self.assertEqual('2026-03-31', actual['as_of'])
+        self.assertEqual('2026-03-03', actual['milestone_start'])
+        self.assertEqual(self.summaries, actual['buckets'])
+
+    def test_bucket_summary__one_bucket(self):
+        """Others can ask for one bucket and get rounded values."""
+        testing_config.sign_out()
+        handler = metricsdata.BucketSummaryHandler()
+        with test_app.test_request_context(
+            '/data/summary/featurepopularity?bucket_id=1'
+        ):
+            actual = handler.get_template_data(metric_type='featurepopularity')
+        self.assertEqual(1, len(actual['buckets']))
+        bucket = actual['buckets'][0]
+        self.assertEqual(1, bucket['bucket_id'])
+        self.assertEqual(0.01234568, bucket['mean_7'])
+        self.assertEqual(0.00234568, bucket['week_over_week_delta'])
+        self.assertIsNone(bucket['milestone_mean'])
+
+    def test_bucket_summary__unknown_type(self):
+        """An unknown metric type is not found."""
+        handler = metricsdata.BucketSummaryHandler()
+        with test_app.test_request_context('/data/summary/bogus'):
+            with self.assertRaises(werkzeug.exceptions.NotFound):
+                handler.get_template_data(metric_type='bogus')
+
+    def test_movers(self):
+        """The top risers and fallers are returned with their summaries."""
+        handler = metricsdata.MoversHandler()
+        with test_app.test_request_context('/data/movers/featurepopularity'):
+            actual = handler.get_template_data(metric_type='featurepopularity')
+        self.assertEqual('2026-03-31', actual['as_of'])
+        self.assertEqual([self.summaries[0]], actual['risers'])
+        self.assertEqual([self.summaries[1]], actual['fallers'])
+
+        with test_app.test_request_context(
+            '/data/movers/featurepopularity?num=0'
+        ):
+            actual = handler.get_template_data(metric_type='featurepopularity')
+        self.assertEqual([], actual['risers'])
@@ -29,6 +29,8 @@ from internals import core_enums, feature_helpers
 class ReleaseNotesAPI(basehandlers.APIHandler):
     """API handler for fetching public release notes features for a milestone (GET /api/v0/releasenotes/{milestone})."""
 
+    STREAM_JSON = True
+
     def do_get(self, **kwargs: Any) -> dict[str, Any]:
         """Get public release notes features for a specific milestone.
 
@@ -57,6 +59,8 @@ class ReleaseNotesAPI(basehandlers.APIHandler):
 class ReleaseNotesL10nAPI(basehandlers.APIHandler):
     """Implements the OpenAPI /releasenotes/l10n path."""
 
+    STREAM_JSON = True
+
     def do_get(self, **kwargs: Any) -> dict[str, Any]:
         """Get release notes for a milestone range.
 
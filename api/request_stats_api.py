@@ -0,0 +1,26 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""API handler for reporting the call counts and latency of each route."""
+
+from framework import basehandlers, instrumentation, permissions
+
+
+class RequestStatsAPI(basehandlers.APIHandler):
+    """Percentiles of the recent requests to each route, for site admins."""
+
+    @permissions.require_admin_site
+    def do_get(self, **kwargs):
+        """Return percentiles of each counter by route."""
+        return {'routes': instrumentation.get_route_percentiles()}
@@ -105,12 +105,6 @@ class StagesAPI(basehandlers.EntitiesAPIHandler):
         stage = self._create_stage(feature_id, feature.feature_type, stage_type)
         self.update_stage(stage, body, [])
 
-        # Changing stage values means the cached feature should be invalidated.
-        lookup_key = FeatureEntry.feature_cache_key(
-            FeatureEntry.DEFAULT_CACHE_KEY, feature_id
-        )
-        rediscache.delete(lookup_key)
-
         # Return  the newly created stage ID.
         return {'message': 'Stage created.', 'stage_id': stage.key.integer_id()}
 
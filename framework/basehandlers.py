@@ -15,6 +15,8 @@
 
 """Base classes for Flask-based API and web request handlers."""
 
+import contextlib
+import hashlib
 import json
 import logging
 import os
@@ -22,28 +24,46 @@ import re
 from dataclasses import dataclass
 from dataclasses import field as dc_field
 from datetime import datetime
-from typing import Any, NoReturn, Optional, Type, TypeVar
+from typing import Any, Iterator, NoReturn, Optional, Type, TypeVar
 
 import flask
 import flask.views
 import google.appengine.api
 import werkzeug.exceptions
+import werkzeug.http
 from flask import render_template, session
 from flask_cors import CORS
 from google.cloud import ndb  # type: ignore
 
 import settings
 from api import api_specs
-from framework import csp, permissions, secrets, users, utils, xsrf
+from framework import (
+    csp,
+    instrumentation,
+    permissions,
+    request_cache,
+    secrets,
+    users,
+    utils,
+    xsrf,
+)
 from internals import approval_defs, core_enums, notifier_helpers, user_models
 from internals.core_models import FeatureEntry, MilestoneSet, Stage
 from internals.data_types import CHANGED_FIELDS_LIST_TYPE
 from internals.review_models import Gate
 
+try:
+    import orjson
+except ImportError:  # Responses are encoded with json instead.
+    orjson = None
+
 # Our API responses are prefixed with this ro prevent attacks that
 # exploit <script src="...">.  See go/xssi.
 XSSI_PREFIX = ")]}'\n"
 
+# Streamed JSON responses are sent in chunks of at least this many bytes.
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 # See https://www.regextester.com/93901 for url regex
 SCHEME_PATTERN = r'((?P<scheme>[a-z]+):(\/\/)?)?'
@@ -112,6 +132,34 @@ class BaseHandler(flask.views.MethodView):
             self.abort(403, msg='User must be signed in')
         return current_user
 
+    def get_etag_version(self, *args, **kwargs) -> str | None:
+        """Return a token that changes whenever the GET response changes.
+
+        Subclasses can override this to support conditional GET requests.
+        It is called before the response is computed, so it should be much
+        cheaper, e.g., a generation number from rediscache.  Returning None
+        means that the response has no ETag.  FlaskHandler only sends ETags
+        with JSON feeds, because rendered pages include a new CSP nonce.
+        """
+        return None
+
+    def get_etag(self, *args, **kwargs) -> str | None:
+        """Return an ETag that is specific to the URL, user, and version."""
+        version = self.get_etag_version(*args, **kwargs)
+        if version is None:
+            return None
+        user = self.get_current_user()
+        text = '|'.join(
+            [version, self.request.full_path, user.email() if user else '']
+        )
+        return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+    def not_modified(self, etag: str | None) -> bool:
+        """Return True if the client already has the response with the ETag."""
+        return etag is not None and self.request.if_none_match.contains_weak(
+            etag
+        )
+
     def get_json_param_dict(self) -> dict:
         """Return the JSON content in the body of the request."""
         return self.request.get_json(force=True, silent=True) or {}
@@ -265,9 +313,76 @@ class BaseHandler(flask.views.MethodView):
         return entity
 
 
+def dumps_json(value: Any) -> bytes:
+    """Serialize a value like json.dumps(value, default=str), but faster."""
+    if orjson is None:
+        return json.dumps(value, default=str).encode()
+    return orjson.dumps(
+        value,
+        default=str,
+        option=orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS,
+    )
+
+
+def iter_json_chunks(
+    handler_data: Any, items_key: str, prefix: str = XSSI_PREFIX
+) -> Iterator[bytes]:
+    """Yield the JSON of handler data in chunks, one item at a time.
+
+    Args:
+      handler_data: A dict, which is sent with its items_key value as a
+        JSON list, or an iterable such as a generator, which is sent as a
+        JSON list.  Anything else is serialized in one piece.
+      items_key: The key of the dict value that can be large.
+      prefix: Text to send before the JSON.
+
+    Yields:
+      Byte strings of at least STREAM_CHUNK_SIZE bytes, except the last.
+    """
+    buf = bytearray(prefix.encode())
+    if isinstance(handler_data, dict) and items_key in handler_data:
+        envelope = {k: v for k, v in handler_data.items() if k != items_key}
+        items = handler_data[items_key]
+        head = dumps_json(envelope)[:-1]
+        buf += head + (b',' if envelope else b'') + dumps_json(items_key)
+        buf += b':['
+        suffix = b']}'
+    elif isinstance(handler_data, (dict, str, bytes)) or not hasattr(
+        handler_data, '__iter__'
+    ):
+        buf += dumps_json(handler_data)
+        yield bytes(buf)
+        return
+    else:
+        items = handler_data
+        buf += b'['
+        suffix = b']'
+
+    for i, item in enumerate(items):
+        if i:
+            buf += b','
+        if hasattr(item, 'to_dict'):
+            item = item.to_dict()
+        buf += dumps_json(item)
+        if len(buf) >= STREAM_CHUNK_SIZE:
+            yield bytes(buf)
+            buf.clear()
+    buf += suffix
+    yield bytes(buf)
+
+
 class APIHandler(BaseHandler):
     """Base class for all API endpoints."""
 
+    # Subclasses can set this to send GET responses in chunks, so that the
+    # whole JSON string is never in memory.  do_get() can then return a
+    # generator, which is sent as a JSON list.  If it returns a dict, the
+    # value of STREAM_ITEMS_KEY is sent one item at a time.
+    STREAM_JSON = False
+    STREAM_ITEMS_KEY = 'features'
+
     def get_headers(self):
         """Add CORS and Chrome Frame to all responses."""
         session.permanent = True
@@ -285,14 +400,36 @@ class APIHandler(BaseHandler):
             XSSI_PREFIX + body, mimetype=flask.current_app.json.mimetype
         )
 
+    def stream_jsonify(self, handler_data):
+        """Return a Flask Response object that sends JSON as it is encoded.
+
+        The body is sent after the request handler returns.
+        ndb_wsgi_middleware() keeps the NDB context, request cache, and
+        instrumentation scope open until then.  stream_with_context()
+        keeps the Flask request, so a generator that handler_data yields
+        from can load entities and check the user as it goes.
+        """
+        chunks = iter_json_chunks(handler_data, self.STREAM_ITEMS_KEY)
+        return flask.current_app.response_class(
+            flask.stream_with_context(chunks),
+            mimetype=flask.current_app.json.mimetype,
+        )
+
     def get(self, *args, **kwargs):
         """Handle an incoming HTTP GET request."""
         headers = self.get_headers()
+        etag = self.get_etag(*args, **kwargs)
+        if etag is not None:
+            headers['ETag'] = werkzeug.http.quote_etag(etag)
+        if self.not_modified(etag):
+            return flask.current_app.response_class(status=304), headers
         handler_data = self.do_get(*args, **kwargs)
         # OpenAPI models have a to_dict attribute that should be used for
         # converting to JSON.
         if hasattr(handler_data, 'to_dict'):
             handler_data = handler_data.to_dict()
+        if self.STREAM_JSON:
+            return self.stream_jsonify(handler_data), headers
         return self.defensive_jsonify(handler_data), headers
 
     def post(self, *args, **kwargs):
@@ -674,11 +811,18 @@ class FlaskHandler(BaseHandler):
             location = self.request.url.replace('www.', '', 1)
             logging.info('Striping www and redirecting to %r', location)
             return self.redirect(location)
+        etag = self.get_etag(*args, **kwargs)
+        if self.not_modified(etag):
+            headers = self.get_headers()
+            headers['ETag'] = werkzeug.http.quote_etag(etag)
+            return flask.current_app.response_class(status=304), headers
         handler_data = self.get_template_data(*args, **kwargs)
         users.refresh_user_session()
 
         if self.JSONIFY and type(handler_data) in (dict, list):
             headers = self.get_headers()
+            if etag is not None:
+                headers['ETag'] = werkzeug.http.quote_etag(etag)
             return flask.jsonify(handler_data), headers
 
         elif type(handler_data) == dict:  # noqa: E721
@@ -844,13 +988,52 @@ class WarmupHandler(BaseHandler):
         return 'OK', 200
 
 
+class _ClosingBody:
+    """A response body that exits the request scopes when it is closed.
+
+    Like werkzeug.wsgi.ClosingIterator, close() always runs, even if the
+    server closes the body without iterating it, e.g., when the client
+    disconnects.
+    """
+
+    def __init__(self, app_iter, exit_stack: contextlib.ExitStack):
+        """Wrap the body of a response and the scopes to exit after it."""
+        self.app_iter = app_iter
+        self.exit_stack = exit_stack
+
+    def __iter__(self) -> Iterator:
+        """Iterate the wrapped body."""
+        return iter(self.app_iter)
+
+    def close(self) -> None:
+        """Close the wrapped body, and then exit the request scopes."""
+        try:
+            close = getattr(self.app_iter, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self.exit_stack.close()
+
+
 def ndb_wsgi_middleware(wsgi_app):
-    """Create a new runtime context for cloud ndb for every request"""  # noqa: D415
+    """Create a new runtime context for cloud ndb for every request.
+
+    The context and the request scopes stay open until the body has been
+    sent, so a streamed response can still load entities, use the request
+    cache, and have its calls counted.
+    """
     client = ndb.Client()
 
     def middleware(environ, start_response):
-        with client.context():
-            return wsgi_app(environ, start_response)
+        exit_stack = contextlib.ExitStack()
+        with exit_stack:
+            exit_stack.enter_context(client.context())
+            exit_stack.enter_context(request_cache.scope())
+            exit_stack.enter_context(instrumentation.scope())
+            app_iter = wsgi_app(environ, start_response)
+            # Hand the open scopes over to the body.
+            exit_stack = exit_stack.pop_all()
+        return _ClosingBody(app_iter, exit_stack)
 
     return middleware
 
@@ -950,6 +1133,10 @@ def FlaskApplication(import_name, routes, pattern_base='', debug=False):
         import_name, template_folder=settings.get_flask_template_path()
     )
     app.original_wsgi_app = app.wsgi_app  # Only for unit tests.
+    # Count the Datastore, Redis, and HTTP calls of each request, and let
+    # the request cache see each Datastore commit.
+    instrumentation.install()
+    app.after_request(instrumentation.finish_request)
     app.wsgi_app = ndb_wsgi_middleware(app.wsgi_app)  # For Cloud NDB Context
     # For GAE legacy libraries
     app.wsgi_app = google.appengine.api.wrap_wsgi_app(app.wsgi_app)
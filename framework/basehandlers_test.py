@@ -15,6 +15,7 @@
 """Tests for the basehandlers module, verifying request handling, permissions, and responses."""
 
 import testing_config  # isort: skip  # Must be imported before the module under test.
+import contextlib
 import json
 from unittest import mock
 
@@ -25,7 +26,13 @@ import werkzeug.exceptions  # Flask HTTP stuff.
 import settings
 
 # from google.appengine.api import users
-from framework import basehandlers, users, xsrf
+from framework import (
+    basehandlers,
+    instrumentation,
+    request_cache,
+    users,
+    xsrf,
+)
 from framework.basehandlers import Route
 from gen.py.chromestatus_openapi.chromestatus_openapi.models.feature_links_response import (  # noqa: E501
     FeatureLinksResponse,
@@ -681,6 +688,89 @@ class APIHandlerTests(testing_config.CustomTestCase):
             response.get_data().decode('utf-8'),
         )
 
+    @mock.patch('framework.basehandlers.APIHandler.do_get')
+    def test_get__stream_json(self, mock_do_get):
+        """If STREAM_JSON is set, get() should send the same JSON in chunks."""
+        self.handler.STREAM_JSON = True
+        mock_do_get.return_value = {
+            'total_count': 2,
+            'features': [{'id': 1}, {'id': 2}],
+        }
+        with test_app.test_request_context('/path'):
+            response, _ = self.handler.get()
+            self.assertTrue(response.is_streamed)
+            actual_text = response.get_data().decode('utf-8')
+
+        self.assertTrue(actual_text.startswith(basehandlers.XSSI_PREFIX))
+        self.assertEqual(
+            mock_do_get.return_value,
+            json.loads(actual_text[len(basehandlers.XSSI_PREFIX) :]),
+        )
+
+    @mock.patch('framework.basehandlers.APIHandler.get_etag_version')
+    @mock.patch('framework.basehandlers.APIHandler.do_get')
+    def test_get__etag(self, mock_do_get, mock_get_etag_version):
+        """get() should send an ETag and a 304 if the client has it."""
+        mock_do_get.return_value = {'key': 'value'}
+        mock_get_etag_version.return_value = '123'
+        with test_app.test_request_context('/path'):
+            response, headers = self.handler.get()
+        self.assertEqual(200, response.status_code)
+        etag = headers['ETag']
+
+        mock_do_get.reset_mock()
+        with test_app.test_request_context(
+            '/path', headers={'If-None-Match': etag}
+        ):
+            response, headers = self.handler.get()
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag, headers['ETag'])
+        mock_do_get.assert_not_called()
+
+        mock_get_etag_version.return_value = '124'
+        with test_app.test_request_context(
+            '/path', headers={'If-None-Match': etag}
+        ):
+            response, headers = self.handler.get()
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, headers['ETag'])
+
+    @mock.patch('framework.basehandlers.APIHandler.do_get')
+    def test_get__no_etag(self, mock_do_get):
+        """By default, get() sends no ETag and ignores If-None-Match."""
+        mock_do_get.return_value = {'key': 'value'}
+        with test_app.test_request_context(
+            '/path', headers={'If-None-Match': '*'}
+        ):
+            response, headers = self.handler.get()
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn('ETag', headers)
+
+    def test_iter_json_chunks__generator(self):
+        """A generator is sent as a list, in chunks of the minimum size."""
+        items = ({'id': i, 'name': 'x' * 1000} for i in range(200))
+        chunks = list(basehandlers.iter_json_chunks(items, 'features', ''))
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks[:-1]:
+            self.assertGreaterEqual(len(chunk), basehandlers.STREAM_CHUNK_SIZE)
+        actual = json.loads(b''.join(chunks))
+        self.assertEqual(list(range(200)), [item['id'] for item in actual])
+
+    def test_iter_json_chunks__other_values(self):
+        """Values without items are serialized in one piece."""
+        for handler_data in [
+            {'features': []},
+            {'message': 'ok'},
+            [],
+            'text',
+            None,
+        ]:
+            chunks = list(
+                basehandlers.iter_json_chunks(handler_data, 'features', '')
+            )
+            self.assertEqual(handler_data, json.loads(b''.join(chunks)))
+
     def test_post(self):
         """If a subclass has do_post(), post() should return a JSON response."""
         self.handler = TestableAPIHandler()
@@ -1739,3 +1829,54 @@ class FlaskApplicationTests(testing_config.CustomTestCase):
             actual_response = test_app.full_dispatch_request()
 
         self.assertNotIn('Access-Control-Allow-Origin', actual_response.headers)
+
+
+class NdbWsgiMiddlewareTests(testing_config.CustomTestCase):
+    """Tests for the per-request middleware."""
+
+    @mock.patch('google.cloud.ndb.Client')
+    def test_middleware__scopes_open_while_streaming(self, mock_client):
+        """The request scopes stay open until the body has been sent."""
+        # The test case already has an NDB context for this thread.
+        mock_client.return_value.context.side_effect = contextlib.nullcontext
+        seen = []
+
+        def wsgi_app(environ, start_response):
+            def generate():
+                seen.append(
+                    (request_cache.current(), instrumentation.current())
+                )
+                yield b'ok'
+
+            return generate()
+
+        app_iter = basehandlers.ndb_wsgi_middleware(wsgi_app)({}, None)
+        self.assertEqual([b'ok'], list(app_iter))
+        cache, metrics = seen[0]
+        self.assertIsNotNone(cache)
+        self.assertIsNotNone(metrics)
+        self.assertIs(cache, request_cache.current())
+
+        # The server closes the body once it has been sent.
+        app_iter.close()
+        self.assertIsNone(request_cache.current())
+        self.assertIsNone(instrumentation.current())
+
+    @mock.patch('google.cloud.ndb.Client')
+    def test_middleware__closed_without_iterating(self, mock_client):
+        """A body that is closed before it is sent still exits the scopes."""
+        ndb_context = mock.MagicMock()
+        mock_client.return_value.context.return_value = ndb_context
+        body = mock.MagicMock()
+        wsgi_app = mock.Mock(return_value=body)
+
+        app_iter = basehandlers.ndb_wsgi_middleware(wsgi_app)({}, None)
+        self.assertIsNotNone(request_cache.current())
+        self.assertIsNotNone(instrumentation.current())
+        app_iter.close()
+
+        body.close.assert_called_once()
+        body.__iter__.assert_not_called()
+        ndb_context.__exit__.assert_called_once()
+        self.assertIsNone(request_cache.current())
+        self.assertIsNone(instrumentation.current())
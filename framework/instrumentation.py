@@ -0,0 +1,309 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-request counts and durations of Datastore, Redis, and HTTP calls.
+
+install() wraps the functions that send NDB RPCs, Redis commands, and
+outbound HTTP requests.  While ndb_wsgi_middleware() handles a request
+in scope(), each call adds to the counters of that request.  When the
+response is ready, finish_request() sends the totals in a Server-Timing
+header.  Once the body has been sent, which for a streamed response is
+later, it logs a structured summary of slow requests and queues a sample
+for the route.
+
+Samples are appended to one rediscache list per route at most every
+FLUSH_INTERVAL seconds, so that get_route_percentiles() can summarize
+the recent requests that all instances handled.
+"""
+
+import collections
+import contextlib
+import contextvars
+import functools
+import logging
+import threading
+import time
+from typing import Any, Iterator
+
+import flask
+import redis
+import requests
+from google.cloud.ndb import _datastore_api  # type: ignore
+
+import settings
+from framework import rediscache, request_cache
+
+NDB_GET = 'ndb_get'
+NDB_QUERY = 'ndb_query'
+NDB_PUT = 'ndb_put'
+NDB_OTHER = 'ndb_other'
+REDIS = 'redis'
+HTTP = 'http'
+CATEGORIES = [NDB_GET, NDB_QUERY, NDB_PUT, NDB_OTHER, REDIS, HTTP]
+
+NDB_CATEGORIES_BY_RPC = {
+    'Lookup': NDB_GET,
+    'RunQuery': NDB_QUERY,
+    'RunAggregationQuery': NDB_QUERY,
+    'Commit': NDB_PUT,
+}
+
+STATS_KEY = 'RequestStats'
+ROUTES_KEY = STATS_KEY + '|routes'
+# Samples of the newest requests to keep for each route.
+MAX_SAMPLES_PER_ROUTE = 1000
+# How often each instance appends its queued samples, in seconds.
+FLUSH_INTERVAL = 30
+PERCENTILES = [50, 90, 99]
+rediscache.use_codec(STATS_KEY, rediscache.CODEC_JSON)
+
+
+class RequestMetrics:
+    """The counters of one request."""
+
+    def __init__(self):
+        """Start timing the request."""
+        self.start = time.perf_counter()
+        self.counts: collections.Counter[str] = collections.Counter()
+        self.seconds: collections.Counter[str] = collections.Counter()
+
+    def add(self, category: str, seconds: float) -> None:
+        """Count one call that took the given time."""
+        self.counts[category] += 1
+        self.seconds[category] += seconds
+
+    def elapsed_ms(self) -> float:
+        """Return the time since the request started."""
+        return (time.perf_counter() - self.start) * 1000
+
+    def server_timing(self, total_ms: float) -> str:
+        """Return the value of a Server-Timing header."""
+        metrics = [
+            '%s;dur=%.1f;desc="%d calls"'
+            % (category, self.seconds[category] * 1000, self.counts[category])
+            for category in CATEGORIES
+            if self.counts[category]
+        ]
+        metrics.append('total;dur=%.1f' % total_ms)
+        return ', '.join(metrics)
+
+    def sample(self, total_ms: float) -> dict[str, float]:
+        """Return a flat dict of the counters for aggregation."""
+        sample = {'total_ms': round(total_ms, 1)}
+        for category in CATEGORIES:
+            sample[category + '_calls'] = self.counts[category]
+            sample[category + '_ms'] = round(self.seconds[category] * 1000, 1)
+        return sample
+
+
+_current: contextvars.ContextVar[RequestMetrics | None] = (
+    contextvars.ContextVar('request_metrics', default=None)
+)
+
+
+def current() -> RequestMetrics | None:
+    """Return the metrics of the current request, if any."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def scope() -> Iterator[RequestMetrics]:
+    """Count calls until the end of the block."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def _timed(func, category: str):
+    """Wrap a function so that each call in a request is counted."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.add(category, time.perf_counter() - start)
+
+    return wrapper
+
+
+def _timed_make_call(make_call):
+    """Wrap NDB's make_call() to count each RPC until its result arrives.
+
+    The request cache also counts each RPC here, and forgets its entries
+    on each commit, so that there is one wrapper for both.
+    """
+
+    @functools.wraps(make_call)
+    def wrapper(rpc_name, *args, **kwargs):
+        metrics = _current.get()
+        start = time.perf_counter()
+        future = make_call(rpc_name, *args, **kwargs)
+        request_cache.record_rpc(rpc_name, future)
+        if metrics is not None:
+            category = NDB_CATEGORIES_BY_RPC.get(rpc_name, NDB_OTHER)
+            future.add_done_callback(
+                lambda _: metrics.add(category, time.perf_counter() - start)
+            )
+        return future
+
+    return wrapper
+
+
+_installed = False
+
+
+def install() -> None:
+    """Wrap the NDB, Redis, and requests functions, once per process."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    _datastore_api.make_call = _timed_make_call(_datastore_api.make_call)
+    redis.Redis.execute_command = _timed(redis.Redis.execute_command, REDIS)
+    redis.client.Pipeline.execute = _timed(redis.client.Pipeline.execute, REDIS)
+    requests.Session.request = _timed(requests.Session.request, HTTP)
+
+
+_pending: dict[str, list[dict[str, float]]] = collections.defaultdict(list)
+_pending_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def flush(force: bool = False) -> None:
+    """Append the queued samples to rediscache if it is time to."""
+    global _last_flush
+    now = time.monotonic()
+    with _pending_lock:
+        if not _pending or (not force and now - _last_flush < FLUSH_INTERVAL):
+            return
+        samples_by_route = dict(_pending)
+        _pending.clear()
+        _last_flush = now
+
+    rediscache.add_to_set(ROUTES_KEY, list(samples_by_route))
+    for route, samples in samples_by_route.items():
+        rediscache.push_to_list(
+            '%s|%s' % (STATS_KEY, route), samples, MAX_SAMPLES_PER_ROUTE
+        )
+
+
+def finish_request(response: flask.Response) -> flask.Response:
+    """Report the metrics of the current Flask request."""
+    metrics = _current.get()
+    if metrics is None:
+        return response
+    cache = request_cache.current()
+    # A streamed body has not been generated yet, so the header only
+    # covers the calls made until now.
+    server_timing = metrics.server_timing(metrics.elapsed_ms())
+    if cache is not None:
+        server_timing += ', %s' % _cache_timing(cache)
+    response.headers['Server-Timing'] = server_timing
+
+    url_rule = flask.request.url_rule
+    route = '%s %s' % (
+        flask.request.method,
+        url_rule.rule if url_rule else '(unmatched)',
+    )
+    report = functools.partial(
+        _report,
+        metrics,
+        cache,
+        route,
+        flask.request.path,
+        response.status_code,
+    )
+    if response.is_streamed:
+        response.call_on_close(report)
+    else:
+        report()
+    return response
+
+
+def _cache_timing(cache: request_cache.RequestCache) -> str:
+    """Return a Server-Timing metric for the request cache counters."""
+    stats = cache.stats()
+    return 'rcache;desc="%d hits, %d misses, %d datastore rpcs"' % (
+        stats['hits'],
+        stats['misses'],
+        stats['datastore_rpcs'],
+    )
+
+
+def _report(
+    metrics: RequestMetrics,
+    cache: request_cache.RequestCache | None,
+    route: str,
+    path: str,
+    status: int,
+) -> None:
+    """Log a slow request and queue its sample for the route."""
+    total_ms = metrics.elapsed_ms()
+    sample = metrics.sample(total_ms)
+    stats = cache.stats() if cache is not None else {}
+    sample['rcache_hits'] = stats.get('hits', 0)
+    sample['rcache_misses'] = stats.get('misses', 0)
+    sample['datastore_rpcs'] = stats.get('datastore_rpcs', 0)
+    if total_ms >= settings.SLOW_REQUEST_MS:
+        summary = dict(sample, route=route, path=path, status=status)
+        if cache is not None:
+            summary['rpcs_by_name'] = dict(cache.rpc_counts)
+        logging.warning(
+            'Slow request %s took %d ms: %r',
+            route,
+            total_ms,
+            summary,
+            extra={'json_fields': summary},
+        )
+    with _pending_lock:
+        _pending[route].append(sample)
+    try:
+        flush()
+    except redis.RedisError:
+        logging.exception('Could not store request samples')
+
+
+def _percentile(sorted_values: list[float], percent: int) -> float:
+    """Return the nearest-rank percentile of sorted values."""
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[rank - 1]
+
+
+def get_route_percentiles() -> dict[str, dict[str, Any]]:
+    """Return percentiles of each counter of the recent requests by route."""
+    flush(force=True)
+    result = {}
+    for route in rediscache.get_set(ROUTES_KEY):
+        samples = rediscache.get_list('%s|%s' % (STATS_KEY, route))
+        if not samples:
+            continue
+        route_stats: dict[str, Any] = {'requests': len(samples)}
+        for name in samples[0]:
+            values = sorted(sample.get(name, 0) for sample in samples)
+            if not values[-1]:
+                continue  # Omit counters that are always zero.
+            route_stats[name] = {
+                'p%d' % percent: _percentile(values, percent)
+                for percent in PERCENTILES
+            }
+        result[route] = route_stats
+    return result
@@ -0,0 +1,151 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the per-request instrumentation."""
+
+import testing_config  # isort: split
+
+from unittest import mock
+
+import flask
+
+from framework import instrumentation, request_cache
+
+test_app = flask.Flask(__name__)
+test_app.add_url_rule('/features/<int:feature_id>', 'feature')
+
+
+class InstrumentationTest(testing_config.CustomTestCase):
+    """Tests for counting calls and reporting them."""
+
+    def setUp(self):
+        """Start without queued samples."""
+        instrumentation._pending.clear()
+        self.func = instrumentation._timed(lambda: 'result', 'redis')
+
+    def test_timed__no_scope(self):
+        """Calls outside of a request are not counted."""
+        self.assertEqual('result', self.func())
+        self.assertIsNone(instrumentation.current())
+
+    def test_timed__scope(self):
+        """Calls within a request are counted by category."""
+        with instrumentation.scope() as metrics:
+            self.func()
+            self.func()
+        self.assertEqual({'redis': 2}, dict(metrics.counts))
+        self.assertIn('redis;dur=', metrics.server_timing(5.0))
+        self.assertIn('desc="2 calls"', metrics.server_timing(5.0))
+        self.assertTrue(metrics.server_timing(5.0).endswith('total;dur=5.0'))
+
+    @mock.patch('settings.SLOW_REQUEST_MS', 0)
+    @mock.patch('logging.warning')
+    def test_finish_request(self, mock_warning):
+        """The response gets a Server-Timing header and the route a sample."""
+        with (
+            test_app.test_request_context('/features/123'),
+            instrumentation.scope(),
+        ):
+            self.func()
+            response = instrumentation.finish_request(flask.Response('ok'))
+
+        self.assertIn('redis;dur=', response.headers['Server-Timing'])
+        mock_warning.assert_called_once()
+        summary = mock_warning.call_args.kwargs['extra']['json_fields']
+        self.assertEqual('GET /features/<int:feature_id>', summary['route'])
+        self.assertEqual(1, summary['redis_calls'])
+
+        stats = instrumentation.get_route_percentiles()
+        route_stats = stats['GET /features/<int:feature_id>']
+        self.assertEqual(1, route_stats['requests'])
+        self.assertEqual(
+            {'p50': 1, 'p90': 1, 'p99': 1}, route_stats['redis_calls']
+        )
+        self.assertNotIn('http_calls', route_stats)
+
+    @mock.patch('settings.SLOW_REQUEST_MS', 0)
+    @mock.patch('logging.warning')
+    def test_finish_request__streamed(self, mock_warning):
+        """A streamed response is reported once its body has been sent."""
+
+        def generate():
+            self.func()
+            yield 'ok'
+
+        with (
+            test_app.test_request_context('/features/123'),
+            instrumentation.scope(),
+        ):
+            self.func()
+            response = instrumentation.finish_request(
+                flask.Response(generate())
+            )
+            mock_warning.assert_not_called()
+            self.assertEqual(b'ok', response.get_data())
+            response.close()
+
+        mock_warning.assert_called_once()
+        summary = mock_warning.call_args.kwargs['extra']['json_fields']
+        self.assertEqual(2, summary['redis_calls'])
+
+    def test_finish_request__request_cache(self):
+        """The request cache counters are sent and sampled too."""
+        loader = mock.Mock(return_value='value')
+        with (
+            test_app.test_request_context('/features/123'),
+            request_cache.scope(),
+            instrumentation.scope(),
+        ):
+            request_cache.get_or_load(('Kind', 1), loader)
+            request_cache.get_or_load(('Kind', 1), loader)
+            request_cache.record_rpc('Lookup', mock.Mock())
+            response = instrumentation.finish_request(flask.Response('ok'))
+
+        self.assertIn(
+            'rcache;desc="1 hits, 1 misses, 1 datastore rpcs"',
+            response.headers['Server-Timing'],
+        )
+        route_stats = instrumentation.get_route_percentiles()[
+            'GET /features/<int:feature_id>'
+        ]
+        self.assertEqual(
+            {'p50': 1, 'p90': 1, 'p99': 1}, route_stats['rcache_hits']
+        )
+        self.assertEqual(
+            {'p50': 1, 'p90': 1, 'p99': 1}, route_stats['datastore_rpcs']
+        )
+
+    def test_timed_make_call(self):
+        """The NDB wrapper counts each RPC for the request cache too."""
+        future = mock.Mock()
+        make_call = instrumentation._timed_make_call(
+            mock.Mock(return_value=future)
+        )
+        with request_cache.scope() as cache, instrumentation.scope():
+            self.assertIs(future, make_call('RunQuery', 'request'))
+        self.assertEqual({'RunQuery': 1}, dict(cache.rpc_counts))
+        future.add_done_callback.assert_called_once()
+
+    def test_finish_request__no_scope(self):
+        """Responses outside of a scope are not changed."""
+        with test_app.test_request_context('/features/123'):
+            response = instrumentation.finish_request(flask.Response('ok'))
+        self.assertNotIn('Server-Timing', response.headers)
+
+    def test_percentile(self):
+        """Percentiles use the nearest rank."""
+        values = list(range(1, 101))
+        self.assertEqual(50, instrumentation._percentile(values, 50))
+        self.assertEqual(99, instrumentation._percentile(values, 99))
+        self.assertEqual(7, instrumentation._percentile([7], 90))
@@ -19,9 +19,16 @@ Provides a simplified interface for storing and retrieving values in Redis,
 with fallback support for a fake Redis implementation during testing.
 """
 
+import collections
+import json
 import os
 import pickle
-from typing import Optional
+import random
+import threading
+import time as time_module
+import zlib
+from concurrent import futures
+from typing import Any, Optional
 
 import fakeredis
 import redis
@@ -54,6 +61,101 @@ if settings.UNIT_TEST_MODE:
 elif settings.STAGING or settings.PROD:
     gae_version = os.environ.get('GAE_VERSION', 'Undeployed')
 
+# Keys under these prefixes include a generation number, so that all of them
+# can be made stale with one INCR rather than a SCAN and a DEL for each key.
+# Stale entries are never read again and simply expire.
+generational_prefixes: list[str] = []
+GENERATION_KEY = 'generation'
+# A new generation counter starts at a random point so that an entry from
+# before the counter was lost is not mistaken for a current one.
+MAX_INITIAL_GENERATION = 1 << 40
+
+# Keys are scanned and unlinked in batches of this many.
+BATCH_SIZE = 500
+# Threads that run the *_async() functions.
+MAX_ASYNC_WORKERS = 4
+_executor: Optional[futures.ThreadPoolExecutor] = None
+
+# The first byte of each stored value says how the rest was encoded.
+# Values written before there were codecs are plain pickles, which start
+# with the PROTO opcode of pickle protocol 2 and later.
+CODEC_PICKLE = 0x01
+CODEC_JSON = 0x02
+COMPRESSED = 0x10
+PICKLE_PROTO = 0x80
+# The codec for values under each key prefix, see use_codec().
+codecs_by_prefix: dict[str, int] = {}
+# Encoded values larger than this many bytes are compressed.
+COMPRESSION_THRESHOLD = 1024
+# The fastest zlib level, since most of the gain comes from repeated keys.
+COMPRESSION_LEVEL = 1
+
+# How often an instance checks whether another instance has invalidated a
+# key family that it keeps in a local cache, in seconds.
+LOCAL_CHECK_INTERVAL = 5
+
+
+class LocalCache:
+    """A bounded LRU cache in this instance for one key family.
+
+    It holds encoded values, so each get() returns a new copy that the
+    caller may modify, just like values read from Redis.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        """Initialize an empty cache."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: collections.OrderedDict[str, tuple[float, bytes]] = (
+            collections.OrderedDict()
+        )
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # The generation of the family in Redis when this was last checked.
+        self.generation: Optional[int] = None
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the encoded value of a key, or None if it is missing."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time_module.monotonic():
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(
+        self, key: str, raw_value: bytes, ttl: Optional[float] = None
+    ) -> None:
+        """Store an encoded value, evicting the least recently used."""
+        ttl = min(ttl, self.ttl) if ttl else self.ttl
+        with self.lock:
+            self.entries[key] = (time_module.monotonic() + ttl, raw_value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all values."""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return the size and hit and miss counts."""
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+# Local caches in front of Redis by key prefix, see use_local_cache().
+local_caches: dict[str, LocalCache] = {}
+_last_local_check = 0.0
+
 
 def set(key, value, time=86400):
     """Redis SET sets the str/binary key, value pair, https://redis.io/commands/set/; if
@@ -64,11 +166,15 @@ def set(key, value, time=86400):
     if redis_client is None:
         return
 
-    cache_key = add_gae_prefix(key)
+    cache_key = _full_key(key)
+    raw_value = encode(key, value)
     if time:
-        redis_client.set(cache_key, pickle.dumps(value), ex=time)
+        redis_client.set(cache_key, raw_value, ex=time)
     else:
-        redis_client.set(cache_key, pickle.dumps(value))
+        redis_client.set(cache_key, raw_value)
+    local_cache = _local_cache_for(key)
+    if local_cache:
+        local_cache.put(key, raw_value, time)
 
 
 def get(key):
@@ -78,11 +184,19 @@ def get(key):
     if redis_client is None:
         return None
 
-    cache_key = add_gae_prefix(key)
+    local_cache = _local_cache_for(key)
+    if local_cache:
+        raw_value = local_cache.get(key)
+        if raw_value is not None:
+            return decode(raw_value)
+
+    cache_key = _full_key(key)
     raw_value = redis_client.get(cache_key)
     if raw_value is None:
         return None
-    return pickle.loads(raw_value)
+    if local_cache:
+        local_cache.put(key, raw_value)
+    return decode(raw_value)
 
 
 def get_multi(keys):
@@ -90,10 +204,30 @@ def get_multi(keys):
     if redis_client is None:
         return None
 
-    cache_keys = [add_gae_prefix(k) for k in keys]
-    raw_vals = redis_client.mget(cache_keys)
-    vals = [pickle.loads(v) if v is not None else None for v in raw_vals]
-    return dict(zip(keys, vals))
+    raw_vals_by_key = {}
+    remote_keys = []
+    for key in keys:
+        local_cache = _local_cache_for(key)
+        raw_value = local_cache.get(key) if local_cache else None
+        if raw_value is None:
+            remote_keys.append(key)
+        else:
+            raw_vals_by_key[key] = raw_value
+
+    if remote_keys:
+        raw_vals = redis_client.mget(_full_keys(remote_keys))
+        for key, raw_value in zip(remote_keys, raw_vals):
+            raw_vals_by_key[key] = raw_value
+            local_cache = _local_cache_for(key)
+            if local_cache and raw_value is not None:
+                local_cache.put(key, raw_value)
+
+    return {
+        key: decode(raw_vals_by_key[key])
+        if raw_vals_by_key[key] is not None
+        else None
+        for key in keys
+    }
 
 
 def set_multi(entries, time=86400):
@@ -101,49 +235,365 @@ def set_multi(entries, time=86400):
 
     ``time`` sets the expire time for this key, in seconds.
     """
-    if redis_client is None:
+    if redis_client is None or not entries:
         return
 
+    data_entries = {}
+    # gae prefix is needed for mset.
+    for key, cache_key in zip(entries, _full_keys(entries)):
+        data_entries[cache_key] = encode(key, entries[key])
+        local_cache = _local_cache_for(key)
+        if local_cache:
+            local_cache.put(key, data_entries[cache_key], time)
+
     if time:
-        for key in entries:
-            set(key, entries[key], time)
+        # MSET cannot set expiry times, so send one SET per key in a single
+        # round trip, https://redis.io/docs/manual/pipelining/.
+        pipeline = redis_client.pipeline(transaction=False)
+        for cache_key, value in data_entries.items():
+            pipeline.set(cache_key, value, ex=time)
+        pipeline.execute()
         return
 
-    data_entries = {}
-    for key in entries:
-        # gae prefix is needed for mset.
-        cache_key = add_gae_prefix(key)
-        data_entries[cache_key] = pickle.dumps(entries[key])
-
     # https://redis.io/commands/mset/.
     redis_client.mset(data_entries)
 
 
+def set_multi_if_unchanged(
+    entries, counter_key, expected: Optional[int], time=86400
+) -> bool:
+    """Set the given keys and increment a counter, if it is still as expected.
+
+    The counter is watched, https://redis.io/docs/manual/transactions/, so
+    the keys are only written if no other writer incremented it since the
+    caller read ``expected`` with ``get_counter()``.  Return False if
+    another writer did.
+    """
+    if redis_client is None:
+        return True
+
+    counter_cache_key = add_gae_prefix(counter_key)
+    data_entries = {
+        cache_key: encode(key, entries[key])
+        for key, cache_key in zip(entries, _full_keys(entries))
+    }
+    with redis_client.pipeline(transaction=True) as pipeline:
+        try:
+            pipeline.watch(counter_cache_key)
+            raw_value = pipeline.get(counter_cache_key)
+            current = None if raw_value is None else int(raw_value)
+            if current != expected:
+                return False
+            pipeline.multi()
+            for cache_key, value in data_entries.items():
+                pipeline.set(cache_key, value, ex=time or None)
+            pipeline.incr(counter_cache_key)
+            pipeline.execute()
+        except redis.WatchError:
+            return False
+
+    for key, cache_key in zip(entries, data_entries):
+        local_cache = _local_cache_for(key)
+        if local_cache:
+            local_cache.put(key, data_entries[cache_key], time)
+    return True
+
+
+def incr(key, amount=1) -> Optional[int]:
+    """Redis INCRBY atomically increments an integer counter and returns the
+    new value, https://redis.io/commands/incrby/.  A missing counter starts
+    at zero.  Counters are stored as plain integers, not pickled values, so
+    read them back with ``get_counter()``.
+    """  # noqa: D205
+    if redis_client is None:
+        return None
+
+    cache_key = add_gae_prefix(key)
+    return redis_client.incrby(cache_key, amount)
+
+
+def get_counter(key) -> Optional[int]:
+    """Return the value of an integer counter, or None if it does not exist."""
+    if redis_client is None:
+        return None
+
+    cache_key = add_gae_prefix(key)
+    raw_value = redis_client.get(cache_key)
+    if raw_value is None:
+        return None
+    return int(raw_value)
+
+
+def add_to_set(key, members) -> None:
+    """Redis SADD adds strings to an unordered set of unique strings,
+    https://redis.io/commands/sadd/.  Sets are stored as plain strings,
+    not pickled values, so read them back with ``pop_set()``.
+    """  # noqa: D205
+    if redis_client is None or not members:
+        return
+
+    redis_client.sadd(add_gae_prefix(key), *members)
+
+
+def pop_set(key) -> list[str]:
+    """Return all members of a set and delete it, atomically."""
+    if redis_client is None:
+        return []
+
+    cache_key = add_gae_prefix(key)
+    pipeline = redis_client.pipeline(transaction=True)
+    pipeline.smembers(cache_key)
+    pipeline.delete(cache_key)
+    members, _ = pipeline.execute()
+    return sorted(m.decode() for m in members)
+
+
+def get_set(key) -> list[str]:
+    """Return all members of a set, sorted."""
+    if redis_client is None:
+        return []
+
+    return sorted(
+        m.decode() for m in redis_client.smembers(add_gae_prefix(key))
+    )
+
+
+def push_to_list(key, values, max_len: int, time=86400) -> None:
+    """Append values to a list and keep only the newest max_len of them."""
+    if redis_client is None or not values:
+        return
+
+    cache_key = add_gae_prefix(key)
+    pipeline = redis_client.pipeline(transaction=False)
+    pipeline.rpush(cache_key, *[encode(key, value) for value in values])
+    pipeline.ltrim(cache_key, -max_len, -1)
+    pipeline.expire(cache_key, time)
+    pipeline.execute()
+
+
+def get_list(key) -> list[Any]:
+    """Return all values of a list that push_to_list() appended."""
+    if redis_client is None:
+        return []
+
+    return [
+        decode(raw) for raw in redis_client.lrange(add_gae_prefix(key), 0, -1)
+    ]
+
+
 def delete(key):
     """Redis DEL removes the value to the key, https://redis.io/commands/del/."""
     if redis_client is None:
         return
 
-    cache_key = add_gae_prefix(key)
+    cache_key = _full_key(key)
     redis_client.delete(cache_key)
+    _invalidate_local([key])
+
+
+def delete_multi(keys):
+    """Remove the values of all given keys in one round trip."""
+    if redis_client is None:
+        return
+
+    _unlink(_full_keys(keys))
+    _invalidate_local(keys)
+
+
+def _unlink(cache_keys: list) -> None:
+    """Remove keys in batches, https://redis.io/commands/unlink/.
+
+    UNLINK frees the memory of the values in the background, so large
+    batches do not block the server.
+    """
+    if not cache_keys:
+        return
+    pipeline = redis_client.pipeline(transaction=False)
+    for i in range(0, len(cache_keys), BATCH_SIZE):
+        pipeline.unlink(*cache_keys[i : i + BATCH_SIZE])
+    pipeline.execute()
+
+
+def use_codec(prefix: str, codec: int) -> None:
+    """Encode the values under a key prefix with the given codec.
+
+    Values are pickled by default.  Values under a CODEC_JSON prefix that
+    would not survive a round trip through JSON, e.g., ones with tuples or
+    NDB keys, are still pickled.  See scripts/benchmark_rediscache_codecs.py
+    for how the codecs compare.
+    """
+    codecs_by_prefix[prefix] = codec
+
+
+def _encode_json(value: Any) -> Optional[bytes]:
+    """Return the value as JSON, or None if JSON would change it."""
+    try:
+        data = json.dumps(value, separators=(',', ':')).encode()
+    except (TypeError, ValueError):
+        return None
+    if json.loads(data) != value:
+        return None
+    return data
+
+
+def encode(key: str, value: Any) -> bytes:
+    """Return the bytes to store for a value, starting with a codec byte."""
+    codec = codecs_by_prefix.get(key.partition('|')[0], CODEC_PICKLE)
+    data = None
+    if codec == CODEC_JSON:
+        data = _encode_json(value)
+    if data is None:
+        codec = CODEC_PICKLE
+        data = pickle.dumps(value)
+    if len(data) > COMPRESSION_THRESHOLD:
+        codec |= COMPRESSED
+        data = zlib.compress(data, COMPRESSION_LEVEL)
+    return bytes([codec]) + data
+
+
+def decode(raw_value: bytes) -> Any:
+    """Return the value that encode() stored, or an old pickled value."""
+    header = raw_value[0]
+    if header == PICKLE_PROTO:
+        return pickle.loads(raw_value)
+    data = memoryview(raw_value)[1:]
+    if header & COMPRESSED:
+        data = zlib.decompress(data)
+    if header & ~COMPRESSED == CODEC_JSON:
+        return json.loads(bytes(data))
+    return pickle.loads(data)
+
+
+def use_generations(prefix: str) -> None:
+    """Invalidate the keys under a prefix by generation, not by deletion."""
+    if prefix not in generational_prefixes:
+        generational_prefixes.append(prefix)
+
+
+def _generation_key(namespace: str) -> str:
+    return '%s|%s' % (GENERATION_KEY, namespace)
+
+
+def get_generation(namespace: str) -> int:
+    """Return the current generation number of a namespace."""
+    key = _generation_key(namespace)
+    generation = get_counter(key)
+    if generation is None:
+        generation = incr(key, random.randrange(1, MAX_INITIAL_GENERATION))
+    return generation or 0
+
+
+def bump_generation(namespace: str) -> None:
+    """Make everything stored under the current generation stale."""
+    generation = incr(_generation_key(namespace))
+    if namespace in local_caches:
+        local_caches[namespace].clear()
+        local_caches[namespace].generation = generation
+
+
+def use_local_cache(prefix: str, max_size: int, ttl: float) -> None:
+    """Keep recently used values under a key prefix in this instance too.
+
+    Reads of those keys only go to Redis on a local miss.  Deleting any of
+    the keys increments the generation of the prefix, and each instance
+    drops all of its local values for the prefix when it sees that the
+    generation changed, at most LOCAL_CHECK_INTERVAL seconds later.  A set()
+    does not change the generation, so other instances can keep returning
+    the old value for up to ``ttl`` seconds.  Only use this for keys that
+    are deleted when their values change.
+
+    Args:
+      prefix: The part of the keys before the first '|'.
+      max_size: The most values to keep, dropping the least recently used.
+      ttl: The most seconds to keep a value.
+    """
+    if prefix in generational_prefixes:
+        raise ValueError('Prefix %r already uses generations' % prefix)
+    local_caches[prefix] = LocalCache(max_size, ttl)
+
+
+def get_local_cache_stats() -> dict[str, dict[str, int]]:
+    """Return the size and hit and miss counts of each local cache."""
+    return {
+        prefix: local_cache.stats()
+        for prefix, local_cache in local_caches.items()
+    }
+
+
+def _check_local_generations() -> None:
+    """Drop local values of prefixes that another instance invalidated."""
+    global _last_local_check
+    now = time_module.monotonic()
+    if now - _last_local_check < LOCAL_CHECK_INTERVAL:
+        return
+    _last_local_check = now
+
+    prefixes = list(local_caches)
+    generation_keys = [
+        add_gae_prefix(_generation_key(prefix)) for prefix in prefixes
+    ]
+    for prefix, raw_value in zip(prefixes, redis_client.mget(generation_keys)):
+        generation = int(raw_value) if raw_value is not None else None
+        local_cache = local_caches[prefix]
+        if generation != local_cache.generation:
+            local_cache.clear()
+            local_cache.generation = generation
+
+
+def _local_cache_for(key: str) -> Optional[LocalCache]:
+    """Return the local cache of the key's prefix, if it has one."""
+    local_cache = local_caches.get(key.partition('|')[0])
+    if local_cache:
+        _check_local_generations()
+    return local_cache
+
+
+def _invalidate_local(keys) -> None:
+    """Make every instance drop the local values of the keys' prefixes."""
+    prefixes = {key.partition('|')[0] for key in keys}
+    for prefix in sorted(p for p in prefixes if p in local_caches):
+        bump_generation(prefix)
+
+
+def _full_keys(keys) -> list[str]:
+    """Return the Redis keys for the given cache keys."""
+    generations: dict[str, int] = {}
+    cache_keys = []
+    for key in keys:
+        prefix, sep, rest = key.partition('|')
+        if sep and prefix in generational_prefixes:
+            if prefix not in generations:
+                generations[prefix] = get_generation(prefix)
+            key = '%s|g%d|%s' % (prefix, generations[prefix], rest)
+        cache_keys.append(add_gae_prefix(key))
+    return cache_keys
+
+
+def _full_key(key) -> str:
+    """Return the Redis key for the given cache key."""
+    return _full_keys([key])[0]
 
 
 def delete_keys_with_prefix(prefix: str):
-    """Delete all keys matching a prefix."""
+    """Delete all keys matching a prefix.
+
+    Keys under a prefix that uses generations are made stale instead.
+    """
     pattern = prefix + '|*'
     if redis_client is None:
         return
 
+    if prefix in generational_prefixes:
+        bump_generation(prefix)
+        return
+
+    if prefix in local_caches:
+        bump_generation(prefix)
+
     prefix = add_gae_prefix(pattern)
     # https://redis.io/commands/scan/
-    pos, keys = redis_client.scan(cursor=0, match=prefix)
-    target = keys
-    while pos != 0:
-        pos, keys = redis_client.scan(cursor=pos, match=prefix)
-        target.extend(keys)
-
-    for key in target:
-        redis_client.delete(key)
+    target = list(redis_client.scan_iter(match=prefix, count=BATCH_SIZE))
+    _unlink(target)
 
 
 def flushall():
@@ -152,6 +602,34 @@ def flushall():
         return
 
     redis_client.flushall()
+    for local_cache in local_caches.values():
+        local_cache.clear()
+        local_cache.generation = None
+
+
+def _get_executor() -> futures.ThreadPoolExecutor:
+    """Return the thread pool for async calls, creating it if needed."""
+    global _executor
+    if _executor is None:
+        _executor = futures.ThreadPoolExecutor(
+            max_workers=MAX_ASYNC_WORKERS, thread_name_prefix='rediscache'
+        )
+    return _executor
+
+
+def get_async(key) -> futures.Future:
+    """Start get() and return a future, so a handler can do other work."""
+    return _get_executor().submit(get, key)
+
+
+def get_multi_async(keys) -> futures.Future:
+    """Start get_multi() and return a future of its result."""
+    return _get_executor().submit(get_multi, keys)
+
+
+def set_multi_async(entries, time=86400) -> futures.Future:
+    """Start set_multi() and return a future that is done when it is."""
+    return _get_executor().submit(set_multi, entries, time)
 
 
 def add_gae_prefix(key):
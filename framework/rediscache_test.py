@@ -18,7 +18,12 @@ Tests basic caching operations (set, get, multi-get, delete) using
 the fake Redis client.
 """
 
-import testing_config  # Must be imported before the module under test.
+# Must be imported before the module under test.
+import testing_config  # isort: split
+
+import datetime
+import pickle
+
 from framework import rediscache
 
 PREFIX = 'cache_key|'
@@ -70,6 +75,60 @@ class RedisCacheFunctionTests(testing_config.CustomTestCase):
         rediscache.set_multi({KEY_5: '222'}, 3600)
         self.assertEqual({KEY_5: '222'}, rediscache.get_multi([KEY_5]))
 
+    def test_incr_and_get_counter(self):
+        """We can atomically increment a counter and read it back."""
+        self.assertEqual(None, rediscache.get_counter(KEY_7))
+
+        self.assertEqual(1, rediscache.incr(KEY_7))
+        self.assertEqual(2, rediscache.incr(KEY_7))
+        self.assertEqual(12, rediscache.incr(KEY_7, 10))
+        self.assertEqual(12, rediscache.get_counter(KEY_7))
+
+    def test_set_multi_if_unchanged(self):
+        """Keys are written only if no other writer bumped the counter."""
+        self.assertTrue(
+            rediscache.set_multi_if_unchanged({KEY_1: 'one'}, KEY_7, None)
+        )
+        self.assertEqual(1, rediscache.get_counter(KEY_7))
+        self.assertEqual('one', rediscache.get(KEY_1))
+
+        self.assertFalse(
+            rediscache.set_multi_if_unchanged({KEY_1: 'stale'}, KEY_7, None)
+        )
+        self.assertEqual('one', rediscache.get(KEY_1))
+
+        self.assertTrue(
+            rediscache.set_multi_if_unchanged(
+                {KEY_1: 'two', KEY_2: 'two'}, KEY_7, 1, 3600
+            )
+        )
+        self.assertEqual(2, rediscache.get_counter(KEY_7))
+        self.assertEqual(
+            {KEY_1: 'two', KEY_2: 'two'}, rediscache.get_multi([KEY_1, KEY_2])
+        )
+
+    def test_add_to_set_and_pop_set(self):
+        """Set members are unique and popping them empties the set."""
+        rediscache.add_to_set('set_key', ['b', 'a'])
+        rediscache.add_to_set('set_key', ['a'])
+        self.assertEqual(['a', 'b'], rediscache.pop_set('set_key'))
+        self.assertEqual([], rediscache.pop_set('set_key'))
+
+    def test_get_set(self):
+        """Reading a set does not empty it."""
+        rediscache.add_to_set('set_key', ['b', 'a'])
+        self.assertEqual(['a', 'b'], rediscache.get_set('set_key'))
+        self.assertEqual(['a', 'b'], rediscache.get_set('set_key'))
+
+    def test_push_to_list(self):
+        """Only the newest values of a list are kept."""
+        rediscache.push_to_list('list_key', [{'a': 1}, {'b': 2}], max_len=3)
+        rediscache.push_to_list('list_key', [{'c': 3}, {'d': 4}], max_len=3)
+        self.assertEqual(
+            [{'b': 2}, {'c': 3}, {'d': 4}], rediscache.get_list('list_key')
+        )
+        self.assertEqual([], rediscache.get_list('missing_key'))
+
     def test_delete(self):
         """Test delete."""
         rediscache.set(KEY_6, '606')
@@ -92,3 +151,198 @@ class RedisCacheFunctionTests(testing_config.CustomTestCase):
         self.assertEqual(None, rediscache.get(KEY_2))
         self.assertEqual('303', rediscache.get('random_key'))
         self.assertEqual('404', rediscache.get('random_key1'))
+
+    def test_bump_generation(self):
+        """Keys under a generational prefix become stale together."""
+        rediscache.use_generations('gen_key')
+        rediscache.set('gen_key|1', 'one')
+        rediscache.set_multi({'gen_key|2': 'two', KEY_1: 'other'}, time=None)
+        self.assertEqual(
+            {'gen_key|1': 'one', 'gen_key|2': 'two'},
+            rediscache.get_multi(['gen_key|1', 'gen_key|2']),
+        )
+
+        rediscache.bump_generation('gen_key')
+
+        self.assertEqual(None, rediscache.get('gen_key|1'))
+        self.assertEqual(None, rediscache.get('gen_key|2'))
+        self.assertEqual('other', rediscache.get(KEY_1))
+        rediscache.set('gen_key|1', 'new one')
+        self.assertEqual('new one', rediscache.get('gen_key|1'))
+
+    def test_delete_keys_with_prefix__generations(self):
+        """Deleting a generational prefix does not scan the keys."""
+        rediscache.use_generations('gen_key')
+        rediscache.set('gen_key|1', 'one')
+        generation = rediscache.get_generation('gen_key')
+
+        rediscache.delete_keys_with_prefix('gen_key')
+
+        self.assertEqual(generation + 1, rediscache.get_generation('gen_key'))
+        self.assertEqual(None, rediscache.get('gen_key|1'))
+
+    def test_set_multi__expiry(self):
+        """Values set together with a time to live each expire."""
+        rediscache.set_multi({KEY_1: 'one', KEY_2: 'two'}, time=60)
+        self.assertEqual('one', rediscache.get(KEY_1))
+        self.assertEqual('two', rediscache.get(KEY_2))
+        for key in [KEY_1, KEY_2]:
+            ttl = rediscache.redis_client.ttl(rediscache.add_gae_prefix(key))
+            self.assertTrue(0 < ttl <= 60)
+
+    def test_delete_multi(self):
+        """We can delete several keys at once."""
+        rediscache.set_multi({KEY_1: 'one', KEY_2: 'two', KEY_3: 'three'})
+        rediscache.delete_multi([KEY_1, KEY_2, KEY_4])
+        self.assertEqual(
+            {KEY_1: None, KEY_2: None, KEY_3: 'three'},
+            rediscache.get_multi([KEY_1, KEY_2, KEY_3]),
+        )
+        rediscache.delete_multi([])
+
+    def test_delete_keys_with_prefix__batches(self):
+        """Keys are deleted in several batches."""
+        entries = {
+            PREFIX + str(x): x for x in range(rediscache.BATCH_SIZE * 2 + 1)
+        }
+        rediscache.set_multi(entries)
+        rediscache.set('random_key', '303')
+
+        rediscache.delete_keys_with_prefix('cache_key')
+
+        self.assertEqual(
+            [None] * len(entries),
+            list(rediscache.get_multi(list(entries)).values()),
+        )
+        self.assertEqual('303', rediscache.get('random_key'))
+
+    def test_get_multi_async(self):
+        """We can read values while doing other work."""
+        rediscache.set_multi_async({KEY_1: 'one', KEY_2: 'two'}).result()
+        future = rediscache.get_multi_async([KEY_1, KEY_2])
+        self.assertEqual({KEY_1: 'one', KEY_2: 'two'}, future.result())
+        self.assertEqual('one', rediscache.get_async(KEY_1).result())
+
+    def test_encode__pickle(self):
+        """Values are pickled by default and compressed when large."""
+        small = rediscache.encode(KEY_1, {'a': (1, 2)})
+        self.assertEqual(rediscache.CODEC_PICKLE, small[0])
+        self.assertEqual({'a': (1, 2)}, rediscache.decode(small))
+
+        value = [{'name': 'feature %d' % i} for i in range(100)]
+        large = rediscache.encode(KEY_1, value)
+        self.assertEqual(
+            rediscache.CODEC_PICKLE | rediscache.COMPRESSED, large[0]
+        )
+        self.assertEqual(value, rediscache.decode(large))
+
+    def test_encode__json(self):
+        """JSON is used only for values that it can store exactly."""
+        rediscache.use_codec('json_key', rediscache.CODEC_JSON)
+        value = {'name': 'feature', 'owners': ['a@example.com'], 'n': None}
+        encoded = rediscache.encode('json_key|1', value)
+        self.assertEqual(rediscache.CODEC_JSON, encoded[0])
+        self.assertEqual(value, rediscache.decode(encoded))
+
+        for value in [
+            (1, 2),
+            {1: 'int key'},
+            {'when': datetime.datetime.now()},
+        ]:
+            encoded = rediscache.encode('json_key|1', value)
+            self.assertEqual(rediscache.CODEC_PICKLE, encoded[0])
+            self.assertEqual(value, rediscache.decode(encoded))
+
+        value = [{'name': 'feature %d' % i} for i in range(100)]
+        rediscache.set('json_key|2', value)
+        self.assertEqual(value, rediscache.get('json_key|2'))
+
+    def test_decode__old_pickle(self):
+        """Values written before there were codecs can still be read."""
+        rediscache.redis_client.set(
+            rediscache.add_gae_prefix(KEY_1), pickle.dumps({'old': True})
+        )
+        self.assertEqual({'old': True}, rediscache.get(KEY_1))
+
+
+class LocalCacheTests(testing_config.CustomTestCase):
+    """Tests for the local caches in front of Redis."""
+
+    def setUp(self):
+        """Keep values under 'local_key' locally."""
+        rediscache.use_local_cache('local_key', max_size=2, ttl=60)
+        self.local_cache = rediscache.local_caches['local_key']
+
+    def tearDown(self):
+        """Remove the local cache."""
+        del rediscache.local_caches['local_key']
+        rediscache._last_local_check = 0.0
+
+    def test_get__local_hit(self):
+        """A value read once is then read without going to Redis."""
+        rediscache.redis_client.set(
+            rediscache.add_gae_prefix('local_key|1'),
+            rediscache.encode('local_key|1', ['a']),
+        )
+        self.assertEqual(['a'], rediscache.get('local_key|1'))
+        rediscache.redis_client.flushall()
+
+        value = rediscache.get('local_key|1')
+        self.assertEqual(['a'], value)
+        # Each hit returns a copy.
+        value.append('b')
+        self.assertEqual(['a'], rediscache.get('local_key|1'))
+        self.assertEqual(
+            {'size': 1, 'max_size': 2, 'hits': 2, 'misses': 1},
+            rediscache.get_local_cache_stats()['local_key'],
+        )
+
+    def test_get_multi__local_hit(self):
+        """Only the keys missing locally are read from Redis."""
+        rediscache.set_multi({'local_key|1': 1, KEY_1: 'remote'})
+        rediscache.redis_client.flushall()
+        self.assertEqual(
+            {'local_key|1': 1, KEY_1: None, 'local_key|2': None},
+            rediscache.get_multi([KEY_1, 'local_key|1', 'local_key|2']),
+        )
+
+    def test_put__least_recently_used(self):
+        """The least recently used value is dropped when the cache is full."""
+        rediscache.set('local_key|1', 1)
+        rediscache.set('local_key|2', 2)
+        rediscache.get('local_key|1')
+        rediscache.set('local_key|3', 3)
+        self.assertEqual(
+            ['local_key|1', 'local_key|3'], list(self.local_cache.entries)
+        )
+
+    def test_put__ttl(self):
+        """Values expire locally after the shorter of both TTLs."""
+        self.local_cache.put('local_key|1', b'raw', ttl=-1)
+        self.assertIsNone(self.local_cache.get('local_key|1'))
+        self.local_cache.put('local_key|1', b'raw', ttl=3600)
+        expires_at, _ = self.local_cache.entries['local_key|1']
+        self.assertLess(expires_at, rediscache.time_module.monotonic() + 61)
+
+    def test_delete__invalidates_everywhere(self):
+        """Deleting a key makes every instance drop its local values."""
+        rediscache.set('local_key|1', 1)
+        rediscache.set('local_key|2', 2)
+        rediscache.delete('local_key|1')
+        self.assertEqual({}, self.local_cache.entries)
+
+        # Simulate another instance deleting a key after this one read it.
+        rediscache.set('local_key|2', 2)
+        rediscache.redis_client.incr(
+            rediscache.add_gae_prefix('generation|local_key')
+        )
+        rediscache.redis_client.flushall()
+        self.assertEqual(2, rediscache.get('local_key|2'))
+        rediscache._last_local_check = 0.0
+        self.assertIsNone(rediscache.get('local_key|2'))
+
+    def test_delete_keys_with_prefix__local(self):
+        """Deleting by prefix also drops the local values."""
+        rediscache.set('local_key|1', 1)
+        rediscache.delete_keys_with_prefix('local_key')
+        self.assertIsNone(rediscache.get('local_key|1'))
@@ -0,0 +1,136 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An identity map of Datastore reads that lasts for one request.
+
+NDB's context cache already returns the same entity for repeated gets
+by key within a request, but it runs every query again.  Functions that
+are called several times per request, e.g., the AppUser lookup behind
+each permission check, use get_or_load() or fetch() so that the query
+runs once and later calls return the same objects.
+
+ndb_wsgi_middleware() opens a scope for each request.  Outside of a
+scope, e.g., in unit tests and cron scripts, nothing is cached.  Every
+commit forgets all entries, so a request that saves an entity and then
+reads it again sees its change.  Reads inside a transaction are never
+cached.
+
+The scope also counts the Datastore RPCs that the request made.  The
+counters are logged when the request ends, and instrumentation sends
+them in the Server-Timing header and the request stats.  Both depend on
+instrumentation.install(), which FlaskApplication() calls at startup.
+"""
+
+import collections
+import contextlib
+import contextvars
+import logging
+from typing import Any, Callable, Hashable, Iterator, TypeVar
+
+from google.cloud import ndb  # type: ignore
+
+T = TypeVar('T')
+
+
+class RequestCache:
+    """The entries and counters of one request."""
+
+    def __init__(self):
+        """Start with no entries."""
+        self.entries: dict[Hashable, Any] = {}
+        self.rpc_counts: collections.Counter[str] = collections.Counter()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        """Forget all entries, e.g., because an entity changed."""
+        self.entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return the counters as a JSON dict."""
+        return {
+            'datastore_rpcs': sum(self.rpc_counts.values()),
+            'rpcs_by_name': dict(self.rpc_counts),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+_current: contextvars.ContextVar[RequestCache | None] = contextvars.ContextVar(
+    'request_cache', default=None
+)
+
+
+def current() -> RequestCache | None:
+    """Return the cache of the current request, if any."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def scope() -> Iterator[RequestCache]:
+    """Cache reads until the end of the block, and then log the counters."""
+    cache = RequestCache()
+    token = _current.set(cache)
+    try:
+        yield cache
+    finally:
+        _current.reset(token)
+        if cache.rpc_counts or cache.hits:
+            logging.info('Request cache stats: %r', cache.stats())
+
+
+def get_or_load(key: Hashable, loader: Callable[[], T]) -> T:
+    """Return the value stored for key in this request, or load and store it.
+
+    Args:
+      key: A key that identifies the value, starting with the kind of
+        entity that it depends on.
+      loader: A function that reads the value from Datastore or Redis.
+
+    Returns:
+      The value, which is the same object for every call in a request.
+    """
+    cache = _current.get()
+    if cache is None or ndb.in_transaction():
+        return loader()
+    if key in cache.entries:
+        cache.hits += 1
+        return cache.entries[key]
+    cache.misses += 1
+    value = loader()
+    cache.entries[key] = value
+    return value
+
+
+def fetch(query: ndb.Query, limit: int | None = None, **options) -> list[Any]:
+    """Run a query once per request and return a copy of its results."""
+    key = ('query', repr(query), limit, tuple(sorted(options.items())))
+    return list(get_or_load(key, lambda: query.fetch(limit, **options)))
+
+
+def record_rpc(rpc_name: str, future: ndb.Future) -> None:
+    """Count a Datastore RPC, and forget all entries on each commit.
+
+    instrumentation.install() wraps NDB's make_call(), which all NDB
+    operations, including queries, send their RPCs through, to call this.
+    """
+    cache = _current.get()
+    if cache is None:
+        return
+    cache.rpc_counts[rpc_name] += 1
+    if rpc_name == 'Commit':
+        # A query that runs while the commit is in flight could have
+        # stored results from before it.
+        cache.clear()
+        future.add_done_callback(lambda _: cache.clear())
@@ -0,0 +1,87 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the request-scoped identity map."""
+
+import testing_config  # isort: split
+
+from unittest import mock
+
+from google.cloud import ndb  # type: ignore
+
+from framework import request_cache
+
+
+class RequestCacheTest(testing_config.CustomTestCase):
+    """Tests for get_or_load() and the RPC counters."""
+
+    def setUp(self):
+        """Make a loader that returns a new object for each call."""
+        self.loader = mock.Mock(side_effect=lambda: object())
+
+    def test_get_or_load__no_scope(self):
+        """Outside of a scope, every call loads the value."""
+        first = request_cache.get_or_load(('Kind', 1), self.loader)
+        second = request_cache.get_or_load(('Kind', 1), self.loader)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(2, self.loader.call_count)
+
+    def test_get_or_load__scope(self):
+        """Within a scope, each key is loaded once."""
+        with request_cache.scope() as cache:
+            first = request_cache.get_or_load(('Kind', 1), self.loader)
+            second = request_cache.get_or_load(('Kind', 1), self.loader)
+            other = request_cache.get_or_load(('Kind', 2), self.loader)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(2, self.loader.call_count)
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(2, cache.misses)
+        self.assertIsNone(request_cache.current())
+
+    def test_get_or_load__none(self):
+        """A missing entity is remembered too."""
+        loader = mock.Mock(return_value=None)
+        with request_cache.scope():
+            request_cache.get_or_load(('Kind', 1), loader)
+            self.assertIsNone(request_cache.get_or_load(('Kind', 1), loader))
+        loader.assert_called_once()
+
+    def test_record_rpc(self):
+        """Each RPC is counted, and a commit forgets all entries."""
+        future = ndb.Future()
+        with request_cache.scope() as cache:
+            request_cache.get_or_load(('Kind', 1), self.loader)
+            request_cache.record_rpc('RunQuery', future)
+            request_cache.record_rpc('Lookup', future)
+            self.assertEqual(1, len(cache.entries))
+
+            request_cache.record_rpc('Commit', future)
+            self.assertEqual({}, cache.entries)
+            request_cache.get_or_load(('Kind', 1), self.loader)
+            future.set_result(None)
+            self.assertEqual({}, cache.entries)
+
+        self.assertEqual(
+            {'RunQuery': 1, 'Lookup': 1, 'Commit': 1},
+            cache.stats()['rpcs_by_name'],
+        )
+        self.assertEqual(3, cache.stats()['datastore_rpcs'])
+
+    def test_record_rpc__no_scope(self):
+        """Outside of a scope, RPCs are not counted."""
+        request_cache.record_rpc('Commit', ndb.Future())
+        self.assertIsNone(request_cache.current())
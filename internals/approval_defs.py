@@ -24,6 +24,7 @@ import collections
 import datetime
 import json
 import logging
+from concurrent import futures
 from dataclasses import dataclass
 from typing import Optional
 
@@ -35,7 +36,12 @@ from internals import core_enums, slo
 from internals.review_models import Gate, GateDef, OwnersFile, Vote
 
 APPROVERS_CACHE_KEY = 'approvers'
+APPROVERS_INDEX_CACHE_KEY = APPROVERS_CACHE_KEY + '|by_email'
 CACHE_EXPIRATION = 60 * 60  # One hour
+OWNERS_FETCH_TIMEOUT = 10  # Seconds
+OWNERS_FETCH_WORKERS = 4
+# Approvers are checked for each gate on most feature pages.
+rediscache.use_local_cache(APPROVERS_CACHE_KEY, max_size=100, ttl=5 * 60)
 IN_NDB = 'stored in ndb'
 
 
@@ -298,32 +304,95 @@ APPROVAL_FIELDS_BY_ID = {
 
 
 def fetch_owners(url) -> list[str]:
-    """Load a list of email addresses from an OWNERS file."""
+    """Load a list of email addresses from the stored copy of an OWNERS file.
+
+    The copy is kept up to date by refresh_owners_files(), so requests
+    never wait for googlesource.  A stale copy is used until then.
+    """
     if settings.UNIT_TEST_MODE or settings.PLAYWRIGHT_MODE:
         return ['example@chromium.org']
 
     owners_file = OwnersFile.get_raw_owner_file(url)
-    if owners_file and owners_file.is_fresh():
-        logging.info('Using fresh owners_file')
-        return decode_raw_owner_content(owners_file.raw_content)
+    if not owners_file:
+        logging.warning('No stored owners_file for %r yet.  Using [].', url)
+        return []
+    if not owners_file.is_fresh():
+        logging.warning('Using stale owners_file for %r', url)
+    return decode_raw_owner_content(owners_file.raw_content)
 
-    response = requests.get(url)
-    if response.status_code == 200:
-        content = response.content
-    else:
+
+def get_owners_urls() -> dict[str, list[int]]:
+    """Return the gate types that use each OWNERS file, by URL."""
+    gate_types_by_url = collections.defaultdict(list)
+    for gate_type, afd in APPROVAL_FIELDS_BY_ID.items():
+        if isinstance(afd.approvers, str) and afd.approvers != IN_NDB:
+            gate_types_by_url[afd.approvers].append(gate_type)
+    return dict(gate_types_by_url)
+
+
+def _fetch_owners_content(url) -> bytes | None:
+    """Fetch the raw content of an OWNERS file, or None if that fails."""
+    try:
+        response = requests.get(url, timeout=OWNERS_FETCH_TIMEOUT)
+    except requests.RequestException:
+        logging.exception('Could not fetch %r', url)
+        return None
+    if response.status_code != 200:
         logging.error('Could not fetch %r', url)
         logging.error(
             'Got response %s', repr(response)[: settings.MAX_LOG_LINE]
         )
-        if owners_file:
-            logging.info('Marking stale owners_file as fresh')
-            content = owners_file.raw_content
-        else:
-            logging.info('No stored owners_file available.  Using [].')
-            return []
+        return None
+    return response.content
+
+
+def refresh_owners_files() -> dict[str, int]:
+    """Fetch all OWNERS files at once and store them for fetch_owners().
+
+    The approvers of each gate type that uses an OWNERS file are cached
+    too.  If any owners changed, the approvers index is dropped and other
+    instances stop using their local copies of the approvers.  When
+    a fetch fails, the stored copy of that file is kept.
+
+    Returns:
+      The number of owners in each file that was fetched, by URL.
+    """
+    gate_types_by_url = get_owners_urls()
+    with futures.ThreadPoolExecutor(
+        max_workers=OWNERS_FETCH_WORKERS
+    ) as executor:
+        contents = dict(
+            zip(
+                gate_types_by_url,
+                executor.map(_fetch_owners_content, gate_types_by_url),
+            )
+        )
 
-    OwnersFile(url=url, raw_content=content).add_owner_file()
-    return decode_raw_owner_content(content)
+    owner_counts = {}
+    owners_changed = False
+    for url, content in contents.items():
+        if content is None:
+            continue
+        owners = decode_raw_owner_content(content)
+        owners_file = OwnersFile.get_raw_owner_file(url)
+        if not owners_file or owners != decode_raw_owner_content(
+            owners_file.raw_content
+        ):
+            owners_changed = True
+        OwnersFile(url=url, raw_content=content).add_owner_file()
+        rediscache.set_multi(
+            {
+                '%s|%s' % (APPROVERS_CACHE_KEY, gate_type): owners
+                for gate_type in gate_types_by_url[url]
+            },
+            time=CACHE_EXPIRATION,
+        )
+        owner_counts[url] = len(owners)
+    if owners_changed:
+        # Deleting the index also makes every instance drop its local
+        # copies of the approvers, so do it after they are stored.
+        rediscache.delete(APPROVERS_INDEX_CACHE_KEY)
+    return owner_counts
 
 
 def decode_raw_owner_content(raw_content) -> list[str]:
@@ -420,18 +489,33 @@ def get_approvers(gate_type) -> list[str]:
     return owners
 
 
+def get_approvers_index() -> dict[str, list[int]]:
+    """Return the gate types that each approver can approve, by email.
+
+    The index is built from the approvers of all gate types at once and
+    cached under one key, which is also kept in the local cache of each
+    instance.  It expires along with the approvers lists, and is dropped
+    sooner when refresh_owners_files() finds that an OWNERS file changed.
+    """
+    index = rediscache.get(APPROVERS_INDEX_CACHE_KEY)
+    if index is not None:
+        return index
+
+    index = collections.defaultdict(list)
+    for gate_type in APPROVAL_FIELDS_BY_ID:
+        for email in get_approvers(gate_type):
+            index[email].append(gate_type)
+    index = dict(index)
+    rediscache.set(APPROVERS_INDEX_CACHE_KEY, index, time=CACHE_EXPIRATION)
+    return index
+
+
 def fields_approvable_by(user):
     """Return a set of field IDs that the user is allowed to approve."""
     if permissions.can_admin_site(user):
         return set(APPROVAL_FIELDS_BY_ID.keys())
 
-    email = user.email()
-    approvable_ids = {
-        gate_type
-        for gate_type in APPROVAL_FIELDS_BY_ID
-        if email in get_approvers(gate_type)
-    }
-    return approvable_ids
+    return set(get_approvers_index().get(user.email(), []))
 
 
 def is_valid_gate_type(gate_type):
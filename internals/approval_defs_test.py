@@ -22,8 +22,10 @@ import base64
 import datetime
 from unittest import mock
 
+import requests
+
 import testing_config  # Must be imported before the module under test.
-from framework import rediscache
+from framework import rediscache, users
 from internals import approval_defs, core_enums
 from internals.review_models import Gate, GateDef, OwnersFile, Vote
 
@@ -53,51 +55,47 @@ class FetchOwnersTest(testing_config.CustomTestCase):
         self.mock_unit_test_mode.stop()
         super().tearDown()
 
+    def store_owners_file(self, created_on=None):
+        """Store a copy of FILE_CONTENTS."""
+        OwnersFile(
+            url='https://example.com',
+            raw_content=base64.b64encode(self.FILE_CONTENTS.encode()),
+            created_on=created_on,
+        ).put()
+
     @mock.patch('requests.get')
     def test__normal(self, mock_get):
-        """We can fetch and parse an OWNERS file.  And reuse cached value."""
-        encoded = base64.b64encode(self.FILE_CONTENTS.encode())
-        mock_get.return_value = testing_config.Blank(
-            status_code=200, content=encoded
-        )
+        """We read the stored copy of an OWNERS file without fetching it."""
+        self.store_owners_file()
 
         actual = approval_defs.fetch_owners('https://example.com')
-        again = approval_defs.fetch_owners('https://example.com')
 
-        # Only called once because second call will be an ndb hit.
-        mock_get.assert_called_once_with('https://example.com')
+        mock_get.assert_not_called()
         self.assertEqual(
             actual,
             ['owner1@example.com', 'owner2@example.com', 'owner3@example.com'],
         )
-        self.assertEqual(again, actual)
 
-    @mock.patch('logging.error')
+    @mock.patch('logging.warning')
     @mock.patch('requests.get')
-    def test__error__use_ndb(self, mock_get, mock_err):
-        """If NDB is old and we can't read the OWNERS file, use old value anyway."""
-        encoded = base64.b64encode(self.FILE_CONTENTS.encode())
-        OwnersFile(
-            url='https://example.com',
-            raw_content=encoded,
-            created_on=datetime.datetime(2022, 1, 1),
-        ).put()
-        mock_get.return_value = testing_config.Blank(status_code=404)
+    def test__stale(self, mock_get, mock_warn):
+        """If the stored copy is old, use it anyway until it is refreshed."""
+        self.store_owners_file(created_on=datetime.datetime(2022, 1, 1))
 
         actual = approval_defs.fetch_owners('https://example.com')
+
+        mock_get.assert_not_called()
         self.assertEqual(
             actual,
             ['owner1@example.com', 'owner2@example.com', 'owner3@example.com'],
         )
 
-    @mock.patch('logging.error')
+    @mock.patch('logging.warning')
     @mock.patch('requests.get')
-    def test__error__use_empty_list(self, mock_get, mock_err):
-        """If NDB is missing and we can't read the OWNERS file, use []."""
-        # Don't create any test existing OwnersFile in NDB.
-        mock_get.return_value = testing_config.Blank(status_code=404)
-
+    def test__missing__use_empty_list(self, mock_get, mock_warn):
+        """If no copy is stored yet, use []."""
         actual = approval_defs.fetch_owners('https://example.com')
+        mock_get.assert_not_called()
         self.assertEqual(actual, [])
 
 
@@ -258,6 +256,195 @@ class GetApproversTest(testing_config.CustomTestCase):
         self.assertEqual(['a', 'b'], existing_gate_defs[0].approvers)
 
 
+class FieldsApprovableByTest(testing_config.CustomTestCase):
+    """Tests for fields_approvable_by and the approvers index."""
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        for gate_def in GateDef.query():
+            gate_def.key.delete()
+
+    @mock.patch(
+        'internals.approval_defs.APPROVAL_FIELDS_BY_ID', MOCK_APPROVALS_BY_ID
+    )
+    @mock.patch('internals.approval_defs.fetch_owners')
+    def test__index(self, mock_fetch_owners):
+        """Each approver maps to the gate types that they can approve."""
+        mock_fetch_owners.return_value = ['approver@example.com', 'b@e.com']
+        GateDef(gate_type=3, approvers=['b@e.com']).put()
+
+        self.assertEqual(
+            {'approver@example.com': [1, 2], 'b@e.com': [2, 3]},
+            approval_defs.get_approvers_index(),
+        )
+        self.assertEqual(
+            {1, 2},
+            approval_defs.fields_approvable_by(
+                users.User(email='approver@example.com')
+            ),
+        )
+        self.assertEqual(
+            set(),
+            approval_defs.fields_approvable_by(
+                users.User(email='other@example.com')
+            ),
+        )
+        # The index was only built once.
+        mock_fetch_owners.assert_called_once_with('https://example.com')
+
+    @mock.patch(
+        'internals.approval_defs.APPROVAL_FIELDS_BY_ID', MOCK_APPROVALS_BY_ID
+    )
+    @mock.patch('framework.permissions.can_admin_site')
+    def test__admin(self, mock_can_admin_site):
+        """Site admins can approve every gate type."""
+        mock_can_admin_site.return_value = True
+        self.assertEqual(
+            {1, 2, 3},
+            approval_defs.fields_approvable_by(
+                users.User(email='admin@example.com')
+            ),
+        )
+
+
+@mock.patch(
+    'internals.approval_defs.APPROVAL_FIELDS_BY_ID', MOCK_APPROVALS_BY_ID
+)
+class RefreshOwnersFilesTest(testing_config.CustomTestCase):
+    """Tests for refresh_owners_files."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.mock_unit_test_mode = mock.patch('settings.UNIT_TEST_MODE', False)
+        self.mock_unit_test_mode.start()
+        self.encoded = base64.b64encode(FetchOwnersTest.FILE_CONTENTS.encode())
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        self.mock_unit_test_mode.stop()
+        for owners_file in OwnersFile.query():
+            owners_file.key.delete()
+        super().tearDown()
+
+    def test_get_owners_urls(self):
+        """Only gate types with an OWNERS file URL are refreshed."""
+        self.assertEqual(
+            {'https://example.com': [2]}, approval_defs.get_owners_urls()
+        )
+
+    @mock.patch('requests.get')
+    def test__normal(self, mock_get):
+        """We fetch, store, and cache the owners, and drop the index."""
+        mock_get.return_value = testing_config.Blank(
+            status_code=200, content=self.encoded
+        )
+        rediscache.set(approval_defs.APPROVERS_INDEX_CACHE_KEY, {})
+
+        actual = approval_defs.refresh_owners_files()
+
+        self.assertEqual({'https://example.com': 3}, actual)
+        mock_get.assert_called_once_with(
+            'https://example.com', timeout=approval_defs.OWNERS_FETCH_TIMEOUT
+        )
+        self.assertEqual(
+            ['owner1@example.com', 'owner2@example.com', 'owner3@example.com'],
+            approval_defs.fetch_owners('https://example.com'),
+        )
+        self.assertEqual(
+            ['owner1@example.com', 'owner2@example.com', 'owner3@example.com'],
+            rediscache.get('%s|2' % approval_defs.APPROVERS_CACHE_KEY),
+        )
+        self.assertIsNone(
+            rediscache.get(approval_defs.APPROVERS_INDEX_CACHE_KEY)
+        )
+
+    @mock.patch('requests.get')
+    def test__local_cache(self, mock_get):
+        """Other instances drop their local approvers after the refresh."""
+        mock_get.return_value = testing_config.Blank(
+            status_code=200, content=self.encoded
+        )
+        cache_key = '%s|2' % approval_defs.APPROVERS_CACHE_KEY
+        rediscache.set(cache_key, ['old@example.com'])
+        self.assertEqual(['old@example.com'], rediscache.get(cache_key))
+        generation = rediscache.get_generation(
+            approval_defs.APPROVERS_CACHE_KEY
+        )
+        calls = mock.Mock()
+        with (
+            mock.patch(
+                'framework.rediscache.set_multi', wraps=rediscache.set_multi
+            ) as mock_set_multi,
+            mock.patch(
+                'framework.rediscache.delete', wraps=rediscache.delete
+            ) as mock_delete,
+        ):
+            calls.attach_mock(mock_set_multi, 'set_multi')
+            calls.attach_mock(mock_delete, 'delete')
+            approval_defs.refresh_owners_files()
+
+        # The local copies are dropped after the new owners are stored.
+        self.assertEqual(
+            ['set_multi', 'delete'], [call[0] for call in calls.mock_calls]
+        )
+        self.assertGreater(
+            rediscache.get_generation(approval_defs.APPROVERS_CACHE_KEY),
+            generation,
+        )
+        self.assertEqual(
+            ['owner1@example.com', 'owner2@example.com', 'owner3@example.com'],
+            rediscache.get(cache_key),
+        )
+
+    @mock.patch('requests.get')
+    def test__unchanged(self, mock_get):
+        """If the owners did not change, the index is kept."""
+        OwnersFile(
+            url='https://example.com',
+            raw_content=self.encoded,
+            created_on=datetime.datetime(2022, 1, 1),
+        ).put()
+        mock_get.return_value = testing_config.Blank(
+            status_code=200, content=self.encoded
+        )
+        rediscache.set(approval_defs.APPROVERS_INDEX_CACHE_KEY, {})
+
+        approval_defs.refresh_owners_files()
+
+        self.assertEqual(
+            {}, rediscache.get(approval_defs.APPROVERS_INDEX_CACHE_KEY)
+        )
+        self.assertEqual(1, len(OwnersFile.query().fetch()))
+        self.assertTrue(OwnersFile.query().get().is_fresh())
+
+    @mock.patch('logging.error')
+    @mock.patch('requests.get')
+    def test__error__keep_stored(self, mock_get, mock_err):
+        """If we can't read the OWNERS file, keep the stored copy."""
+        OwnersFile(
+            url='https://example.com',
+            raw_content=self.encoded,
+            created_on=datetime.datetime(2022, 1, 1),
+        ).put()
+        mock_get.return_value = testing_config.Blank(status_code=404)
+
+        actual = approval_defs.refresh_owners_files()
+
+        self.assertEqual({}, actual)
+        self.assertFalse(OwnersFile.query().get().is_fresh())
+
+    @mock.patch('logging.exception')
+    @mock.patch('requests.get')
+    def test__timeout(self, mock_get, mock_exc):
+        """A fetch that times out is skipped."""
+        mock_get.side_effect = requests.Timeout()
+
+        actual = approval_defs.refresh_owners_files()
+
+        self.assertEqual({}, actual)
+        self.assertEqual([], OwnersFile.query().fetch())
+
+
 class IsValidGateTypeTest(testing_config.CustomTestCase):
     """Tests for gate type validation."""
 
@@ -31,7 +31,7 @@ from google.cloud import ndb  # type: ignore
 
 import settings
 from framework import rediscache
-from internals import core_enums
+from internals import core_enums, rank_tables
 
 
 class ReviewResultProperty(ndb.StringProperty):
@@ -272,6 +272,20 @@ class FeatureEntry(ndb.Model):
     FEATURE_NAME_CACHE_KEY = 'FeatureNames'
     # The prefix used when cacheing entire search results.
     SEARCH_CACHE_KEY = 'FeatureSearch'
+    # The key of the token that identifies the cached IDs of all features.
+    ALL_IDS_CACHE_KEY = 'FeatureIds'
+    # A counter that each put() increments, so that a universe fetched
+    # while a feature changed is not stored, see search_bitmaps.py.
+    ALL_IDS_VERSION_KEY = 'FeatureIds|version'
+    # The prefix of rediscache keys for storing the precomputed JSON dicts
+    # of a feature, see feature_snapshots.py.
+    SNAPSHOT_CACHE_KEY = 'FeatureSnapshot'
+    # The rediscache set of IDs of features that changed since the feature
+    # list was last patched, see feature_list.py.
+    LIST_CHANGES_KEY = 'FeatureList|changed'
+    # The prefix of rediscache generations that change when a feature or
+    # its stages change, which are used as HTTP validators.
+    VERSION_KEY = 'FeatureVersion'
 
     def __init__(self, *args, **kwargs):
         """Initialize the Feature model."""
@@ -290,27 +304,71 @@ class FeatureEntry(ndb.Model):
         """Feature cache key."""
         return '%s|%s' % (cache_key, feature_id)
 
+    @classmethod
+    def get_version(cls, feature_id: int | None = None) -> int | None:
+        """Return a number that changes when the feature or its stages do.
+
+        Args:
+          feature_id: The feature, or None for a number that changes when
+            any feature or stage does.
+
+        Returns:
+          The number, or None if it is unavailable because Redis is.
+        """
+        namespace = cls.feature_cache_key(cls.VERSION_KEY, feature_id or 'all')
+        return rediscache.get_generation(namespace) or None
+
+    @classmethod
+    def bump_version(cls, feature_id: int) -> None:
+        """Change the numbers of get_version() for one feature and all."""
+        rediscache.bump_generation(
+            cls.feature_cache_key(cls.VERSION_KEY, feature_id)
+        )
+        rediscache.bump_generation(
+            cls.feature_cache_key(cls.VERSION_KEY, 'all')
+        )
+
     def put(self, **kwargs) -> Any:
         """Save the entity."""
         key = super(FeatureEntry, self).put(**kwargs)
-        # Invalidate rediscache for the individual feature view.
-        cache_key = FeatureEntry.feature_cache_key(
-            FeatureEntry.DEFAULT_CACHE_KEY, self.key.integer_id()
+        # Invalidate rediscache for the individual feature snapshot and name,
+        # and the list of all IDs.
+        rediscache.delete_multi(
+            [
+                FeatureEntry.feature_cache_key(
+                    FeatureEntry.SNAPSHOT_CACHE_KEY, self.key.integer_id()
+                ),
+                FeatureEntry.feature_cache_key(
+                    FeatureEntry.FEATURE_NAME_CACHE_KEY, self.key.integer_id()
+                ),
+                FeatureEntry.ALL_IDS_CACHE_KEY,
+            ]
         )
-        rediscache.delete(cache_key)
-
-        # Invalidate rediscache for the individual feature name.
-        cache_key = FeatureEntry.feature_cache_key(
-            FeatureEntry.FEATURE_NAME_CACHE_KEY, self.key.integer_id()
+        rediscache.incr(FeatureEntry.ALL_IDS_VERSION_KEY)
+        # All cached search results become stale with one INCR.
+        rediscache.bump_generation(FeatureEntry.SEARCH_CACHE_KEY)
+        rediscache.add_to_set(
+            FeatureEntry.LIST_CHANGES_KEY, [str(self.key.integer_id())]
+        )
+        FeatureEntry.bump_version(self.key.integer_id())
+        rank_tables.record_put(
+            self.key.integer_id(),
+            self.key.integer_id(),
+            rank_tables.indexed_values(self),
         )
-        rediscache.delete(cache_key)
-        rediscache.delete_keys_with_prefix(FeatureEntry.SEARCH_CACHE_KEY)
 
         return key
 
     # Note: get_in_milestone will be in a new file legacy_queries.py.
 
 
+rediscache.use_generations(FeatureEntry.SEARCH_CACHE_KEY)
+# Feature dicts and participant lists are deleted when a feature changes.
+rediscache.use_local_cache(
+    FeatureEntry.DEFAULT_CACHE_KEY, max_size=1000, ttl=60
+)
+
+
 class MilestoneSet(ndb.Model):  # copy from milestone fields of Feature
     """Range of milestones during which a feature will be in a certain stage."""
 
@@ -445,6 +503,18 @@ class Stage(ndb.Model):
     archived = ndb.BooleanProperty(default=False)
     created = ndb.DateTimeProperty(auto_now_add=True)
 
+    def _post_put_hook(self, future) -> None:
+        """Invalidate the snapshot of the feature, which includes stages."""
+        rediscache.delete(
+            FeatureEntry.feature_cache_key(
+                FeatureEntry.SNAPSHOT_CACHE_KEY, self.feature_id
+            )
+        )
+        rediscache.add_to_set(
+            FeatureEntry.LIST_CHANGES_KEY, [str(self.feature_id)]
+        )
+        FeatureEntry.bump_version(self.feature_id)
+
 
 class FeatureSummarySuggestion(ndb.Model):
     """An AI-generated summary and documentation link suggestion for a FeatureEntry.
@@ -27,9 +27,49 @@ from internals.core_models import (
     FeatureSummaryProgressStep,
     FeatureSummarySuggestion,
     MilestoneCuration,
+    Stage,
 )
 
 
+class FeatureEntryVersionTest(testing_config.CustomTestCase):
+    """Tests for the version numbers of features."""
+
+    def setUp(self):
+        """Set up two features."""
+        self.fe_1 = FeatureEntry(name='feature 1', summary='sum', category=1)
+        self.fe_1.put()
+        self.fe_2 = FeatureEntry(name='feature 2', summary='sum', category=1)
+        self.fe_2.put()
+
+    def tearDown(self):
+        """Delete the test entities."""
+        for kind in [FeatureEntry, Stage]:
+            for entity in kind.query():
+                entity.key.delete()
+
+    def test_get_version__feature_put(self):
+        """Saving a feature changes its version and the version of all."""
+        id_1 = self.fe_1.key.integer_id()
+        id_2 = self.fe_2.key.integer_id()
+        before = [FeatureEntry.get_version(fid) for fid in [id_1, id_2, None]]
+
+        self.fe_1.put()
+
+        after = [FeatureEntry.get_version(fid) for fid in [id_1, id_2, None]]
+        self.assertNotEqual(before[0], after[0])
+        self.assertEqual(before[1], after[1])
+        self.assertNotEqual(before[2], after[2])
+
+    def test_get_version__stage_put(self):
+        """Saving a stage changes the version of its feature."""
+        feature_id = self.fe_1.key.integer_id()
+        before = FeatureEntry.get_version(feature_id)
+
+        Stage(feature_id=feature_id, stage_type=110).put()
+
+        self.assertNotEqual(before, FeatureEntry.get_version(feature_id))
+
+
 class FeatureSummarySuggestionTest(testing_config.CustomTestCase):
     """Tests for the FeatureSummarySuggestion model."""
 
@@ -20,15 +20,15 @@ import re
 from asyncio import Future
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, TypedDict
+from typing import Any, Iterator, TypedDict
 
 from google.cloud import ndb  # type: ignore
 
 import settings
 from api import converters
-from framework import permissions, rediscache, users
+from framework import permissions, rediscache, request_cache, users
 from framework.utils import get_current_milestone_info
-from internals import core_enums
+from internals import core_enums, feature_list, feature_snapshots
 from internals.core_models import (
     FeatureEntry,
     FeatureSummarySuggestion,
@@ -339,28 +339,19 @@ def get_features_in_release_notes(
     )
     logging.info('Narrowed list of feature IDs to %r', len(feature_ids))
     features_future = get_entries_by_id_async(feature_ids)
-    # Prefetch all stages for all those features, not just the stages that
-    # qualified the features to be considered.
-    prefetched_stages: list[Stage] = []
-    if feature_ids:
-        prefetched_stages = Stage.query(
-            Stage.feature_id.IN(feature_ids),
-            Stage.archived == False,  # noqa: E712
-        ).fetch()
-    prefetched_stages_dict = organize_all_stages_by_feature(prefetched_stages)
-    logging.info(
-        'prefetched %r stages for %r features',
-        len(prefetched_stages),
-        len(feature_ids),
-    )
     features: list[FeatureEntry] = get_future_results(features_future)
     features = _filter_out_wp_features_lacking_enterprise_approval(features)
+    # The snapshots include all stages of those features, not just the
+    # stages that qualified the features to be considered.
+    snapshots = feature_snapshots.get_snapshots(
+        [fe.key.integer_id() for fe in features],
+        {fe.key.integer_id(): fe for fe in features},
+    )
     formatted_features = []
     for fe in features:
-        formatted_feature = converters.feature_entry_to_json_verbose(
-            fe,
-            prefetched_stages=prefetched_stages_dict.get(fe.key.integer_id()),
-        )
+        formatted_feature = snapshots[fe.key.integer_id()][
+            feature_snapshots.VERBOSE
+        ]
         formatted_features.append(dict(formatted_feature))
     logging.info('finished converting features to dicts')
 
@@ -730,6 +721,13 @@ def _set_feature_fields_for_roadmap(
 
 def get_by_participant(email: str) -> list[ndb.Key]:
     """Return NDB keys of FeatureEntrys that the user can edit."""
+    return request_cache.get_or_load(
+        ('FeatureEntry', 'participant', email),
+        lambda: _load_by_participant(email),
+    )
+
+
+def _load_by_participant(email: str) -> list[ndb.Key]:
     CACHE_KEY = '%s|participant|%s' % (FeatureEntry.DEFAULT_CACHE_KEY, email)
     result = rediscache.get(CACHE_KEY)
 
@@ -814,81 +812,16 @@ def get_by_ids(
     procesing a POST to edit data.  For editing use case, load the
     data from NDB directly.
     """
-    result_dict = {}
-
     if update_cache:
-        lookup_keys = [
-            FeatureEntry.feature_cache_key(
-                FeatureEntry.DEFAULT_CACHE_KEY, feature_id
-            )
-            for feature_id in feature_ids
-        ]
-        cached_features = rediscache.get_multi(lookup_keys)
-        if cached_features:
-            result_dict = {
-                f['id']: f
-                for f in cached_features.values()
-                if f is not None and f.get('id')
-            }
-
-    needed_ids = [fid for fid in feature_ids if fid not in result_dict]
-
-    if needed_ids:
-        # Create ndb.Key objects for the batch operation
-        needed_keys = [ndb.Key(FeatureEntry, fid) for fid in needed_ids]
-
-        # Get all features and stages asynchronously.
-        unformatted_features_future: list[ndb.Future] = ndb.get_multi_async(
-            needed_keys
-        )  # noqa: E501
-        stages_futures: list[ndb.Future] = []
-        for f_id in needed_ids:
-            stages_futures.append(
-                Stage.query(
-                    Stage.feature_id == f_id,
-                    Stage.archived == False,  # noqa: E712
-                ).fetch_async()
-            )
-
-        stages_list: list[Stage] = []
-        for stages_future in stages_futures:
-            stages_list.extend(stages_future.get_result())
-        stages_dict = organize_all_stages_by_feature(stages_list)
-
-        unformatted_features = [
-            uf.get_result() for uf in unformatted_features_future
-        ]  # noqa: E501
-        for unformatted_feature in unformatted_features:
-            if unformatted_feature and not unformatted_feature.deleted:
-                feature_id = unformatted_feature.key.integer_id()
-                feature = converters.feature_entry_to_json_verbose(
-                    unformatted_feature,
-                    prefetched_stages=stages_dict.get(feature_id),
-                )
-
-                if unformatted_feature.updated is not None:
-                    feature['updated_display'] = (
-                        unformatted_feature.updated.strftime('%Y-%m-%d')
-                    )
-                else:
-                    feature['updated_display'] = ''
-                result_dict[feature_id] = feature
-
-    if update_cache and needed_ids:
-        to_cache = {}
-        for feature_id in needed_ids:
-            if feature_id in result_dict:
-                store_key = FeatureEntry.feature_cache_key(
-                    FeatureEntry.DEFAULT_CACHE_KEY, feature_id
-                )
-                to_cache[store_key] = result_dict[feature_id]
-        if to_cache:
-            rediscache.set_multi(to_cache)
+        snapshots = feature_snapshots.get_snapshots(feature_ids)
+    else:
+        snapshots = feature_snapshots.build_snapshots(feature_ids)
 
     result_list = [
-        result_dict[feature_id]
+        snapshots[feature_id][feature_snapshots.VERBOSE]
         for feature_id in feature_ids
-        if feature_id in result_dict
+        if feature_id in snapshots
+        and not snapshots[feature_id][feature_snapshots.VERBOSE]['deleted']
     ]
     return filter_confidential_formatted(result_list)
 
@@ -905,59 +838,35 @@ def get_features_by_impl_status(
     procesing a POST to edit data.  For editing use case, load the
     data from NDB directly.
     """
-    cache_key = '%s|%s|%s|%s' % (
-        FeatureEntry.DEFAULT_CACHE_KEY,
-        'impl_order',
-        limit,
-        show_unlisted,
+    return list(
+        iter_features_by_impl_status(
+            update_cache=update_cache, show_unlisted=show_unlisted
+        )
     )
 
-    feature_list = rediscache.get(cache_key)
+
+def iter_features_by_impl_status(
+    update_cache: bool = False, show_unlisted: bool = False
+) -> Iterator[dict]:
+    """Yield the JSON dicts of features, ordered by chrome_impl_status.
+
+    The segments are loaded before this returns, but each section is
+    filtered only as it is reached, so that a streamed response never
+    holds a second list of all features.
+    """
     logging.info('getting feature list, sorted by chrome_impl_status')
+    segments = feature_list.get_segments(force_rebuild=update_cache)
 
-    # On cache miss, do a db query.
-    if not feature_list or update_cache:
-        logging.info('recomputing feature list')
-        # Get features by implementation status.
-        futures: list[Future] = []
-        stages_future = Stage.query(Stage.archived == False).fetch_async()  # noqa: E712
-        for impl_status in core_enums.IMPLEMENTATION_STATUS.keys():
-            q = FeatureEntry.query(
-                FeatureEntry.impl_status_chrome == impl_status
-            )
-            q = q.order(FeatureEntry.impl_status_chrome)
-            q = q.order(FeatureEntry.name)
-            futures.append(q.fetch_async(None))
-        # Put "No active development" at end of list.
-        futures = futures[1:] + futures[0:1]
-        logging.info('Waiting on futures')
-        query_results = [future.result() for future in futures]
-        all_stages = organize_all_stages_by_feature(stages_future.result())
-
-        # Construct the proper ordering.
-        feature_list = []
-        for section in query_results:
-            if len(section) > 0:
-                section = [f for f in section if not f.deleted]
-                section = [
-                    f
-                    for f in section
-                    if f.feature_type != core_enums.FEATURE_TYPE_ENTERPRISE_ID
-                ]  # noqa: E501, F405
-                section = [
-                    converters.feature_entry_to_json_basic(
-                        f, all_stages[f.key.integer_id()]
-                    )
-                    for f in section
-                ]
+    def iter_sections():
+        for impl_status in feature_list.SECTION_ORDER:
+            section = segments.pop(impl_status)
+            if section:
                 section[0]['first_of_section'] = True
                 if not show_unlisted:
                     section = filter_unlisted_formatted(section)
-                feature_list.extend(section)
-
-        rediscache.set(cache_key, feature_list)
+                yield from filter_confidential_formatted(section)
 
-    return filter_confidential_formatted(feature_list)
+    return iter_sections()
 
 
 def _map_relevant_milestones(
@@ -20,7 +20,12 @@ from unittest import mock
 import testing_config  # Must be imported before the module under test.
 from api import converters
 from framework import rediscache
-from internals import core_enums, feature_helpers, stage_helpers
+from internals import (
+    core_enums,
+    feature_helpers,
+    feature_snapshots,
+    stage_helpers,
+)
 from internals.core_models import (
     FeatureEntry,
     FeatureSummarySuggestion,
@@ -207,30 +212,32 @@ class FeatureHelpersTest(testing_config.CustomTestCase):
         self.assertEqual('feature a', actual[0]['name'])
         self.assertEqual('feature b', actual[1]['name'])
 
-        lookup_key_1 = '%s|%s' % (
-            FeatureEntry.DEFAULT_CACHE_KEY,
-            self.feature_1.key.integer_id(),
+        lookup_key_1 = feature_snapshots.snapshot_key(
+            self.feature_1.key.integer_id()
         )
-        lookup_key_2 = '%s|%s' % (
-            FeatureEntry.DEFAULT_CACHE_KEY,
-            self.feature_2.key.integer_id(),
+        lookup_key_2 = feature_snapshots.snapshot_key(
+            self.feature_2.key.integer_id()
+        )
+        self.assertEqual(
+            'feature a', rediscache.get(lookup_key_1)['verbose']['name']
+        )
+        self.assertEqual(
+            'feature b', rediscache.get(lookup_key_2)['verbose']['name']
         )
-        self.assertEqual('feature a', rediscache.get(lookup_key_1)['name'])
-        self.assertEqual('feature b', rediscache.get(lookup_key_2)['name'])
 
     def test_get_by_ids__cache_hit(self):
         """We can load features from rediscache."""
-        cache_key = '%s|%s' % (
-            FeatureEntry.DEFAULT_CACHE_KEY,
-            self.feature_1.key.integer_id(),
+        cache_key = feature_snapshots.snapshot_key(
+            self.feature_1.key.integer_id()
         )
         cached_feature = {
             'name': 'fake cached_feature',
             'id': self.feature_1.key.integer_id(),
             'unlisted': False,
             'confidential': False,
+            'deleted': False,
         }
-        rediscache.set(cache_key, cached_feature)
+        rediscache.set(cache_key, {'verbose': cached_feature})
 
         actual = feature_helpers.get_by_ids([self.feature_1.key.integer_id()])
 
@@ -0,0 +1,192 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The list of all features by implementation status, stored in segments.
+
+Each implementation status has one segment: a rediscache value with the
+basic JSON dicts of its features, ordered by name.  Saving a FeatureEntry
+or Stage adds the feature's ID to a set of changes.  The next read moves
+each changed feature into the segment of its current status and rewrites
+only the segments that changed, so an edit does not cause a query of all
+features.  All segments are rebuilt from Datastore only if one of them
+is missing, e.g., after they expire.
+
+Every write of segments increments a version counter, and is only made
+if the counter still has the value that the writer read before it read
+the segments.  A writer that lost the race puts the changes that it
+took back in the set and tries again from the newer segments.
+"""
+
+import bisect
+import logging
+from typing import Any
+
+from google.cloud import ndb  # type: ignore
+
+from api import converters
+from framework import rediscache
+from internals import core_enums, feature_snapshots
+from internals.core_models import FeatureEntry, Stage
+from internals.stage_helpers import organize_all_stages_by_feature
+
+SEGMENT_KEY = 'FeatureList|section'
+LIST_VERSION_KEY = 'FeatureList|version'
+# Attempts to patch the segments before leaving the changes to a later read.
+MAX_PATCH_ATTEMPTS = 3
+# A full rebuild at least once a day repairs any change that was missed.
+SEGMENT_TTL = 24 * 60 * 60
+
+# Sections are listed in the order of statuses, with "No active
+# development" at the end.
+SECTION_ORDER: list[int] = (
+    list(core_enums.IMPLEMENTATION_STATUS)[1:]
+    + list(core_enums.IMPLEMENTATION_STATUS)[:1]
+)
+
+Segments = dict[int, list[dict[str, Any]]]
+
+
+def _segment_key(impl_status: int) -> str:
+    return '%s|%d' % (SEGMENT_KEY, impl_status)
+
+
+def _sort_key(feature_dict: dict[str, Any]) -> tuple[str, int]:
+    """Sort like a Datastore query ordered by name, then key."""
+    return (feature_dict['name'] or '', feature_dict['id'])
+
+
+def _is_listed(fe: FeatureEntry | None) -> bool:
+    """Return True if the feature belongs in one of the sections."""
+    return (
+        fe is not None
+        and not fe.deleted
+        and fe.feature_type != core_enums.FEATURE_TYPE_ENTERPRISE_ID
+        and fe.impl_status_chrome in core_enums.IMPLEMENTATION_STATUS
+    )
+
+
+def _store(segments: Segments, version: int | None, changes: list[str]) -> bool:
+    """Store segments unless another writer stored some since version.
+
+    If it did, the changes are put back for the next read to apply.
+    """
+    entries = {
+        _segment_key(impl_status): section
+        for impl_status, section in segments.items()
+    }
+    if rediscache.set_multi_if_unchanged(
+        entries, LIST_VERSION_KEY, version, SEGMENT_TTL
+    ):
+        return True
+    rediscache.add_to_set(FeatureEntry.LIST_CHANGES_KEY, changes)
+    return False
+
+
+def rebuild() -> Segments:
+    """Query all features and stages, and store every segment."""
+    logging.info('rebuilding feature list')
+    version = rediscache.get_counter(LIST_VERSION_KEY)
+    # Everything changed until now is included in the rebuild.
+    changes = rediscache.pop_set(FeatureEntry.LIST_CHANGES_KEY)
+    stages_future = Stage.query(Stage.archived == False).fetch_async()  # noqa: E712
+    futures = {}
+    for impl_status in SECTION_ORDER:
+        q = FeatureEntry.query(FeatureEntry.impl_status_chrome == impl_status)
+        q = q.order(FeatureEntry.impl_status_chrome)
+        q = q.order(FeatureEntry.name)
+        futures[impl_status] = q.fetch_async(None)
+    all_stages = organize_all_stages_by_feature(stages_future.result())
+
+    segments: Segments = {}
+    for impl_status, future in futures.items():
+        segments[impl_status] = [
+            converters.feature_entry_to_json_basic(
+                fe, all_stages[fe.key.integer_id()]
+            )
+            for fe in future.result()
+            if _is_listed(fe)
+        ]
+    _store(segments, version, changes)
+    return segments
+
+
+def patch(segments: Segments, feature_ids: list[int]) -> set[int]:
+    """Move changed features into the segments of their current status.
+
+    Returns:
+      The statuses of the segments that were modified.
+    """
+    entities = {
+        fe.key.integer_id(): fe
+        for fe in ndb.get_multi(
+            [ndb.Key(FeatureEntry, fid) for fid in feature_ids]
+        )
+        if _is_listed(fe)
+    }
+    # Build fresh dicts, since a cached snapshot could predate the change.
+    snapshots = feature_snapshots.build_snapshots(list(entities), entities)
+    changed_ids = set(feature_ids)
+    modified = set()
+    for impl_status, section in segments.items():
+        kept = [f for f in section if f['id'] not in changed_ids]
+        if len(kept) != len(section):
+            segments[impl_status] = kept
+            modified.add(impl_status)
+
+    for fid, fe in entities.items():
+        section = segments[fe.impl_status_chrome]
+        basic = snapshots[fid][feature_snapshots.BASIC]
+        bisect.insort(section, basic, key=_sort_key)
+        modified.add(fe.impl_status_chrome)
+    return modified
+
+
+def get_segments(force_rebuild: bool = False) -> Segments:
+    """Return all segments by status, applying any changes to them first."""
+    if force_rebuild:
+        return rebuild()
+
+    keys = [_segment_key(impl_status) for impl_status in SECTION_ORDER]
+    for _ in range(MAX_PATCH_ATTEMPTS):
+        version = rediscache.get_counter(LIST_VERSION_KEY)
+        cached = rediscache.get_multi(keys) or {}
+        if not all(cached.get(key) is not None for key in keys):
+            return rebuild()
+
+        segments = {
+            impl_status: cached[_segment_key(impl_status)]
+            for impl_status in SECTION_ORDER
+        }
+        changes = rediscache.pop_set(FeatureEntry.LIST_CHANGES_KEY)
+        if not changes:
+            return segments
+        try:
+            modified = patch(segments, [int(fid) for fid in changes])
+        except Exception:
+            # Leave the changes for the next request to try again.
+            rediscache.add_to_set(FeatureEntry.LIST_CHANGES_KEY, changes)
+            raise
+        if _store(
+            {status: segments[status] for status in modified}, version, changes
+        ):
+            logging.info(
+                'patched %d features in %d sections',
+                len(changes),
+                len(modified),
+            )
+            return segments
+        logging.info('feature list changed while patching, trying again')
+
+    # This reader's copy has the changes, and the next read stores them.
+    return segments
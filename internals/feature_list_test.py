@@ -0,0 +1,129 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the segmented list of features by implementation status."""
+
+import testing_config  # isort: split
+
+from unittest import mock
+
+from framework import rediscache
+from internals import core_enums, feature_list
+from internals.core_models import FeatureEntry
+
+
+class FeatureListTest(testing_config.CustomTestCase):
+    """Tests for rebuilding and patching segments."""
+
+    def setUp(self):
+        """Set up features in two sections."""
+        self.features = []
+        for name, impl_status in [
+            ('b', core_enums.PROPOSED),
+            ('d', core_enums.PROPOSED),
+            ('a', core_enums.REMOVED),
+        ]:
+            fe = FeatureEntry(
+                name=name,
+                summary='sum',
+                category=1,
+                impl_status_chrome=impl_status,
+            )
+            fe.put()
+            self.features.append(fe)
+
+    def tearDown(self):
+        """Delete the test features."""
+        for fe in FeatureEntry.query():
+            fe.key.delete()
+
+    def names(self, segments, impl_status):
+        """Return the names in one section."""
+        return [f['name'] for f in segments[impl_status]]
+
+    def test_get_segments__rebuild(self):
+        """A missing segment causes a rebuild of all of them."""
+        segments = feature_list.get_segments()
+        self.assertEqual(['b', 'd'], self.names(segments, core_enums.PROPOSED))
+        self.assertEqual(['a'], self.names(segments, core_enums.REMOVED))
+        self.assertEqual([], segments[core_enums.ON_HOLD])
+        self.assertEqual([], rediscache.pop_set(FeatureEntry.LIST_CHANGES_KEY))
+
+    @mock.patch('internals.feature_list.rebuild', wraps=feature_list.rebuild)
+    def test_get_segments__patch(self, mock_rebuild):
+        """Changed features are moved without a rebuild."""
+        feature_list.get_segments()
+        fe_b, fe_d, fe_a = self.features
+        fe_b.impl_status_chrome = core_enums.REMOVED
+        fe_b.put()
+        fe_d.deleted = True
+        fe_d.put()
+        new_fe = FeatureEntry(
+            name='c',
+            summary='sum',
+            category=1,
+            impl_status_chrome=core_enums.REMOVED,
+        )
+        new_fe.put()
+
+        segments = feature_list.get_segments()
+
+        mock_rebuild.assert_called_once()
+        self.assertEqual([], self.names(segments, core_enums.PROPOSED))
+        self.assertEqual(
+            ['a', 'b', 'c'], self.names(segments, core_enums.REMOVED)
+        )
+        # The patched segments were stored.
+        self.assertEqual(segments, feature_list.get_segments())
+
+
+class ConcurrentPatchTest(testing_config.CustomTestCase):
+    """Tests for patching segments that another request also writes."""
+
+    def setUp(self):
+        """Store empty segments and one pending change."""
+        self.segments = {
+            impl_status: [] for impl_status in feature_list.SECTION_ORDER
+        }
+        feature_list._store(self.segments, None, [])
+        rediscache.add_to_set(FeatureEntry.LIST_CHANGES_KEY, ['1'])
+
+    def tearDown(self):
+        """Clear the pending changes."""
+        rediscache.pop_set(FeatureEntry.LIST_CHANGES_KEY)
+
+    @mock.patch('internals.feature_list.patch')
+    def test_get_segments__conflict(self, mock_patch):
+        """A writer that loses the race tries again from the new segments."""
+        other_writes = []
+
+        def fake_patch(segments, feature_ids):
+            if not other_writes:
+                # Another request stores a patched segment in the meantime.
+                version = rediscache.get_counter(feature_list.LIST_VERSION_KEY)
+                other = {core_enums.PROPOSED: [{'id': 2, 'name': 'b'}]}
+                feature_list._store(other, version, [])
+                other_writes.append(other)
+            segments[core_enums.REMOVED] = [{'id': 1, 'name': 'a'}]
+            return {core_enums.REMOVED}
+
+        mock_patch.side_effect = fake_patch
+
+        segments = feature_list.get_segments()
+
+        self.assertEqual(2, mock_patch.call_count)
+        self.assertEqual([2], [f['id'] for f in segments[core_enums.PROPOSED]])
+        self.assertEqual([1], [f['id'] for f in segments[core_enums.REMOVED]])
+        self.assertEqual(segments, feature_list.get_segments())
+        self.assertEqual([], rediscache.pop_set(FeatureEntry.LIST_CHANGES_KEY))
@@ -0,0 +1,162 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Precomputed JSON documents for rendering features.
+
+A snapshot holds the verbose, basic, and tiny JSON dicts of one feature,
+computed from the FeatureEntry and its unarchived stages.  Saving either
+of those deletes the feature's snapshot, and the next read rebuilds it,
+so an edit that saves a feature and several stages rebuilds it once.
+Pages that show many features read all of their snapshots with one
+multi-get and convert only the ones that are missing.
+
+Because a snapshot may rarely be stale, snapshots should only be used
+for displaying data read-only, not for populating forms or processing a
+POST to edit data.
+"""
+
+import logging
+from typing import Any, Iterable
+
+from google.cloud import ndb  # type: ignore
+
+from api import converters
+from framework import rediscache
+from internals import stage_helpers
+from internals.core_models import FeatureEntry, Stage
+
+# Snapshots are deleted when their feature changes, so this only limits
+# how long the snapshots of features that nobody views stay in Redis.
+SNAPSHOT_TTL = 7 * 24 * 60 * 60  # One week
+# Search results and feature pages read the same few hundred features.
+rediscache.use_local_cache(
+    FeatureEntry.SNAPSHOT_CACHE_KEY, max_size=1000, ttl=60
+)
+
+VERBOSE = 'verbose'
+BASIC = 'basic'
+TINY = 'tiny'
+
+
+def snapshot_key(feature_id: int) -> str:
+    """Return the rediscache key of a feature's snapshot."""
+    return FeatureEntry.feature_cache_key(
+        FeatureEntry.SNAPSHOT_CACHE_KEY, feature_id
+    )
+
+
+def make_snapshot(fe: FeatureEntry, stages: list[Stage]) -> dict[str, Any]:
+    """Return the JSON dicts of a feature with the given stages."""
+    verbose: dict[str, Any] = dict(
+        converters.feature_entry_to_json_verbose(fe, prefetched_stages=stages)
+    )
+    if fe.updated is not None:
+        verbose['updated_display'] = fe.updated.strftime('%Y-%m-%d')
+    else:
+        verbose['updated_display'] = ''
+    return {
+        VERBOSE: verbose,
+        BASIC: converters.feature_entry_to_json_basic(fe, stages=stages),
+        TINY: converters.feature_entry_to_json_tiny(fe),
+    }
+
+
+def build_snapshots(
+    feature_ids: Iterable[int],
+    entities: dict[int, FeatureEntry] | None = None,
+) -> dict[int, dict[str, Any]]:
+    """Compute snapshots from Datastore without reading or writing Redis.
+
+    Args:
+      feature_ids: The features to compute.  Missing ones are skipped.
+      entities: Features that the caller already loaded, by ID.
+
+    Returns:
+      A dict of snapshots by feature ID.
+    """
+    entities = dict(entities or {})
+    needed_ids = list(dict.fromkeys(feature_ids))
+    if not needed_ids:
+        return {}
+    stages_future = stage_helpers.get_stages_by_feature_async(needed_ids)
+    unloaded_ids = [fid for fid in needed_ids if fid not in entities]
+    for fe in ndb.get_multi(
+        [ndb.Key(FeatureEntry, fid) for fid in unloaded_ids]
+    ):
+        if fe is not None:
+            entities[fe.key.integer_id()] = fe
+    stages_by_feature = stages_future.get_result()
+
+    return {
+        fid: make_snapshot(entities[fid], stages_by_feature[fid])
+        for fid in needed_ids
+        if fid in entities
+    }
+
+
+def get_snapshots(
+    feature_ids: Iterable[int],
+    entities: dict[int, FeatureEntry] | None = None,
+) -> dict[int, dict[str, Any]]:
+    """Return the snapshots of features, building and storing missing ones.
+
+    Args:
+      feature_ids: The features to return.  Missing ones are skipped.
+      entities: Features that the caller already loaded, by ID, which are
+        used if their snapshots need to be built.
+
+    Returns:
+      A dict of snapshots by feature ID.
+    """
+    feature_ids = list(dict.fromkeys(feature_ids))
+    if not feature_ids:
+        return {}
+    cached = rediscache.get_multi([snapshot_key(fid) for fid in feature_ids])
+    snapshots = {}
+    for fid in feature_ids:
+        snapshot = (cached or {}).get(snapshot_key(fid))
+        if snapshot is not None:
+            snapshots[fid] = snapshot
+
+    missing_ids = [fid for fid in feature_ids if fid not in snapshots]
+    if missing_ids:
+        logging.info('Building %d feature snapshots', len(missing_ids))
+        built = build_snapshots(missing_ids, entities)
+        rediscache.set_multi(
+            {snapshot_key(fid): snapshot for fid, snapshot in built.items()},
+            SNAPSHOT_TTL,
+        )
+        snapshots.update(built)
+    return snapshots
+
+
+def rebuild_all(batch_size: int = 100) -> int:
+    """Store fresh snapshots of all features and return how many there are."""
+    count = 0
+    cursor = None
+    more = True
+    while more:
+        feature_entries, cursor, more = FeatureEntry.query().fetch_page(
+            batch_size, start_cursor=cursor
+        )
+        built = build_snapshots(
+            [fe.key.integer_id() for fe in feature_entries],
+            {fe.key.integer_id(): fe for fe in feature_entries},
+        )
+        rediscache.set_multi(
+            {snapshot_key(fid): snapshot for fid, snapshot in built.items()},
+            SNAPSHOT_TTL,
+        )
+        count += len(built)
+    return count
@@ -0,0 +1,95 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the precomputed JSON documents of features."""
+
+import testing_config  # isort: split
+
+from framework import rediscache
+from internals import core_enums, feature_snapshots
+from internals.core_models import FeatureEntry, Stage
+
+
+class FeatureSnapshotsTest(testing_config.CustomTestCase):
+    """Tests for building, storing, and invalidating snapshots."""
+
+    def setUp(self):
+        """Set up a feature with one stage."""
+        self.fe = FeatureEntry(
+            name='feature a',
+            summary='sum',
+            category=1,
+            feature_type=core_enums.FEATURE_TYPE_INCUBATE_ID,
+        )
+        self.fe.put()
+        self.feature_id = self.fe.key.integer_id()
+        self.stage = Stage(
+            feature_id=self.feature_id,
+            stage_type=core_enums.STAGE_BLINK_SHIPPING,
+        )
+        self.stage.put()
+
+    def tearDown(self):
+        """Delete the test entities."""
+        for kind in [FeatureEntry, Stage]:
+            for entity in kind.query():
+                entity.key.delete()
+
+    def test_get_snapshots__miss_then_hit(self):
+        """Missing snapshots are built once and then read from Redis."""
+        snapshots = feature_snapshots.get_snapshots([self.feature_id, 999])
+
+        self.assertEqual([self.feature_id], list(snapshots))
+        snapshot = snapshots[self.feature_id]
+        self.assertEqual('feature a', snapshot['verbose']['name'])
+        self.assertEqual(1, len(snapshot['verbose']['stages']))
+        self.assertEqual('feature a', snapshot['basic']['name'])
+        self.assertEqual(
+            {'id', 'name', 'confidential'},
+            {'id', 'name', 'confidential'} & set(snapshot['tiny']),
+        )
+        self.assertEqual(
+            snapshot,
+            rediscache.get(feature_snapshots.snapshot_key(self.feature_id)),
+        )
+
+    def test_feature_put__invalidates(self):
+        """Saving the feature deletes its snapshot."""
+        feature_snapshots.get_snapshots([self.feature_id])
+        self.fe.name = 'renamed'
+        self.fe.put()
+
+        self.assertIsNone(
+            rediscache.get(feature_snapshots.snapshot_key(self.feature_id))
+        )
+        snapshots = feature_snapshots.get_snapshots([self.feature_id])
+        self.assertEqual(
+            'renamed', snapshots[self.feature_id]['verbose']['name']
+        )
+
+    def test_stage_put__invalidates(self):
+        """Archiving a stage deletes the snapshot of its feature."""
+        feature_snapshots.get_snapshots([self.feature_id])
+        self.stage.archived = True
+        self.stage.put()
+
+        snapshots = feature_snapshots.get_snapshots([self.feature_id])
+        self.assertEqual([], snapshots[self.feature_id]['verbose']['stages'])
+
+    def test_rebuild_all(self):
+        """The backfill stores a snapshot of every feature."""
+        self.assertEqual(1, feature_snapshots.rebuild_all(batch_size=1))
+        self.assertIsNotNone(
+            rediscache.get(feature_snapshots.snapshot_key(self.feature_id))
+        )
@@ -32,6 +32,10 @@ OMAHA_URL_TEMPLATE = (
     '/v1/chrome/platforms/win/channels/%s/versions/?pageSize=1'
 )
 
+OMAHA_CACHE_KEY = 'omaha_data'
+# Most pages need the channel versions, which change a few times a week.
+rediscache.use_local_cache(OMAHA_CACHE_KEY, max_size=1, ttl=10 * 60)
+
 
 class Channel(StrEnum):
     """Chrome release channel names."""
@@ -90,7 +94,7 @@ def get_omaha_data() -> list[dict[str, list[ChannelVersionMapping]]]:
     Returns:
         A list of dictionaries containing channel and version information.
     """
-    omaha_data = rediscache.get('omaha_data')
+    omaha_data = rediscache.get(OMAHA_CACHE_KEY)
 
     if omaha_data is None:
         win_versions: list[ChannelVersionMapping] = [
@@ -109,7 +113,8 @@ def get_omaha_data() -> list[dict[str, list[ChannelVersionMapping]]]:
         ]
         omaha_info = [{'versions': win_versions}]
         omaha_data = json.dumps(omaha_info)
-        rediscache.set('omaha_data', omaha_data, time=86400)  # cache for 24hrs.
+        # Cache for 24hrs.
+        rediscache.set(OMAHA_CACHE_KEY, omaha_data, time=86400)
 
     return json.loads(omaha_data)
 
@@ -16,18 +16,23 @@
 """Fetches and stores UMA metrics data from the Chromium metrics export server."""
 
 import base64
+import collections
 import datetime
 import json
 import logging
+import threading
+import urllib.parse
+from concurrent import futures
 from xml.dom import minidom
 
 import google.oauth2.id_token
 import requests
 from google.auth.transport import requests as reqs
+from google.cloud import ndb  # type: ignore
 
 import settings
 from framework import basehandlers, rediscache, utils
-from internals import metrics_models, user_models
+from internals import metrics_analytics, metrics_models, user_models
 
 UMA_QUERY_SERVER = 'https://uma-export.appspot.com/chromestatus/'
 
@@ -42,6 +47,51 @@ HISTOGRAMS_URL = (
 # same day again.
 CAPSTONE_BUCKET_ID = -1
 
+# Metrics datapoints are written in batches of this many entities, which is
+# the most that one Datastore commit accepts, with a few batches in flight.
+PUT_BATCH_SIZE = 500
+MAX_PUTS_IN_FLIGHT = 4
+# The LatestMetric backfill reads this many of the newest datapoints at once.
+NEWEST_DATAPOINTS_BATCH = 5000
+
+
+# YesterdayHandler fetches this many (day, query) pairs at once, and at most
+# MAX_FETCHES_PER_HOST of the requests may go to the same host.
+MAX_FETCH_WORKERS = 8
+MAX_FETCHES_PER_HOST = 4
+# ID tokens expire after an hour, so they are reused for a bit less.
+ID_TOKEN_LIFETIME = datetime.timedelta(minutes=55)
+
+_id_tokens: dict[str, tuple[str, datetime.datetime]] = {}
+_id_tokens_lock = threading.Lock()
+_host_semaphores: dict[str, threading.BoundedSemaphore] = (
+    collections.defaultdict(
+        lambda: threading.BoundedSemaphore(MAX_FETCHES_PER_HOST)
+    )
+)
+_host_semaphores_lock = threading.Lock()
+
+
+def _GetIdToken(url):
+    """Return an ID token for the server of url, reusing a recent one."""
+    audience = url.split('?')[0]
+    now = datetime.datetime.now()
+    with _id_tokens_lock:
+        token, expires = _id_tokens.get(audience, (None, now))
+        if token is None or now >= expires:
+            token = google.oauth2.id_token.fetch_id_token(
+                reqs.Request(), audience
+            )
+            logging.info('token is %r', token)
+            _id_tokens[audience] = (token, now + ID_TOKEN_LIFETIME)
+    return token
+
+
+def _GetHostSemaphore(url):
+    """Return the semaphore that limits concurrent requests to url's host."""
+    with _host_semaphores_lock:
+        return _host_semaphores[urllib.parse.urlsplit(url).netloc]
+
 
 @utils.retry(3, delay=30, backoff=2)
 def _FetchMetrics(url):
@@ -50,20 +100,73 @@ def _FetchMetrics(url):
         # https://cloud.google.com/appengine/docs/python/appidentity/#asserting_identity_to_other_app_engine_apps
         # GAE request limit is 60s, but it could go longer due to start-up latency.
         logging.info('Requesting metrics from: %r', url)
-        token = google.oauth2.id_token.fetch_id_token(reqs.Request(), url)
-        logging.info('token is %r', token)
-        return requests.request(
-            'GET',
-            url,
-            timeout=120.0,
-            allow_redirects=False,
-            headers={'Authorization': 'Bearer {}'.format(token)},
-        )
+        token = _GetIdToken(url)
+        with _GetHostSemaphore(url):
+            return requests.request(
+                'GET',
+                url,
+                timeout=120.0,
+                allow_redirects=False,
+                headers={'Authorization': 'Bearer {}'.format(token)},
+            )
     else:
         logging.info('Prod would get metrics from: %r', url)
         return None  # dev instances cannot access uma-export.
 
 
+def _PutInBatches(entities):
+    """Write entities in batches, with a bounded number of them at once.
+
+    Raises the error of the first batch that fails, before any later batch
+    is started.
+    """
+    in_flight = collections.deque()
+    for start in range(0, len(entities), PUT_BATCH_SIZE):
+        if len(in_flight) >= MAX_PUTS_IN_FLIGHT:
+            _WaitForPuts(in_flight.popleft())
+        batch = entities[start : start + PUT_BATCH_SIZE]
+        in_flight.append(ndb.put_multi_async(batch))
+    while in_flight:
+        _WaitForPuts(in_flight.popleft())
+    logging.info('Put %d entities', len(entities))
+
+
+def _WaitForPuts(put_futures):
+    """Wait for the futures of one batch and raise the first error."""
+    ndb.wait_all(put_futures)
+    for future in put_futures:
+        future.check_success()
+
+
+def _AppendToTimelines(model_class, date, entities):
+    """Add the datapoints of one date to the timelines of their buckets.
+
+    Timelines that do not exist yet are skipped, because TimelineHandler
+    builds each one from all of the datapoints of its bucket.  Timelines
+    that already have the date are not written again.
+    """
+    timelines = ndb.get_multi(
+        [
+            metrics_models.MetricsTimeline.make_key(model_class, e.bucket_id)
+            for e in entities
+        ]
+    )
+    updated_timelines = []
+    for entity, timeline in zip(entities, timelines):
+        if timeline is None or entity.day_percentage is None:
+            continue
+        day_numbers = timeline.day_numbers
+        timeline.add_points([(date, entity.day_percentage)])
+        if (
+            timeline.day_numbers == day_numbers
+            and timeline.property_name == entity.property_name
+        ):
+            continue
+        timeline.property_name = entity.property_name
+        updated_timelines.append(timeline)
+    _PutInBatches(updated_timelines)
+
+
 class UmaQuery(object):
     """Reads and stores stats from UMA."""
 
@@ -134,13 +237,13 @@ class UmaQuery(object):
         for existing_datapoint in existing_saved_data:
             existing_saved_bucket_ids.add(existing_datapoint.bucket_id)
 
+        entities = []
         for bucket_str, bucket_dict in data.items():
             bucket_id = int(bucket_str)
 
             # Only add this entity if one doesn't already exist with the same
             # bucket_id and date.
             if bucket_id in existing_saved_bucket_ids:
-                logging.info('Cron data was already fetched for this date')
                 continue
 
             # If the id is not in the map, use 'ERROR' for the name.
@@ -159,8 +262,29 @@ class UmaQuery(object):
                 # low_volume=bucket_dict['low_volume']
                 # rolling_percentage=
             )
-            entity.put()
+            entities.append(entity)
 
+        if len(entities) < len(data):
+            logging.info(
+                'Cron data was already fetched for %d buckets',
+                len(data) - len(entities),
+            )
+        _PutInBatches(entities)
+        # A run that failed part way may have stored some datapoints of
+        # this date without adding them to their timelines and latest
+        # rows, so update those from everything stored for the date.
+        stored_datapoints = [
+            datapoint
+            for datapoint in existing_saved_data
+            if datapoint.bucket_id != CAPSTONE_BUCKET_ID
+        ] + entities
+        _AppendToTimelines(self.model_class, date, stored_datapoints)
+        _PutInBatches(
+            metrics_models.LatestMetric.merge(
+                self.model_class, stored_datapoints
+            )
+        )
+        # Only mark the date as done once every datapoint was written.
         self._SetCapstone(date)
 
     def FetchAndSaveData(self, date):
@@ -172,6 +296,48 @@ class UmaQuery(object):
             self._SaveData(data, date)
         return response_code
 
+    def BackfillLatestMetrics(self):
+        """Store the LatestMetric row of each bucket from its datapoints.
+
+        This sends one query per bucket, so it is only run as a one-time
+        maintenance script for data ingested before LatestMetric existed.
+
+        Returns:
+          The number of rows that were stored.
+        """
+        logging.info('Building LatestMetric rows for %r', self.model_class)
+        buckets_future = self.property_map_class.query().fetch_async(None)
+
+        # Most buckets have a datapoint among the newest ones, so grab a
+        # batch of those first and only query the other buckets one by one.
+        newest_query = self.model_class.query().order(-self.model_class.date)
+        datapoints_by_bucket_id = {}
+        for dp in newest_query.fetch(NEWEST_DATAPOINTS_BATCH):
+            datapoints_by_bucket_id.setdefault(dp.bucket_id, dp)
+
+        futures_by_bucket_id = {}
+        for bucket in buckets_future.get_result():
+            if bucket.bucket_id not in datapoints_by_bucket_id:
+                query = self.model_class.query(
+                    self.model_class.bucket_id == bucket.bucket_id
+                ).order(-self.model_class.date)
+                futures_by_bucket_id[bucket.bucket_id] = query.get_async()
+        for bucket_id, future in futures_by_bucket_id.items():
+            dp = future.result()
+            if dp:
+                datapoints_by_bucket_id[bucket_id] = dp
+
+        latest_metrics = metrics_models.LatestMetric.merge(
+            self.model_class,
+            [
+                dp
+                for dp in datapoints_by_bucket_id.values()
+                if dp.bucket_id != CAPSTONE_BUCKET_ID
+            ],
+        )
+        _PutInBatches(latest_metrics)
+        return len(latest_metrics)
+
 
 UMA_QUERIES = [
     UmaQuery(
@@ -227,26 +393,62 @@ class YesterdayHandler(basehandlers.FlaskHandler):
                 for days_ago in [1, 2, 3, 4, 5]
             ]
 
-        for i, query_day in enumerate(days):
-            for query in UMA_QUERIES:
-                response_code = query.FetchAndSaveData(query_day)
-                if response_code not in (200, 404):
-                    error_message = (
-                        'Got error %d while fetching usage data' % response_code
+        # Each day and query is fetched on its own, so that one slow or
+        # failing request does not hold back the others.  The results are
+        # saved here as they arrive because NDB is not used across threads.
+        fetches_by_pair = {}
+        with futures.ThreadPoolExecutor(
+            max_workers=MAX_FETCH_WORKERS
+        ) as executor:
+            for i, query_day in enumerate(days):
+                for query in UMA_QUERIES:
+                    if not query._HasCapstone(query_day):
+                        fetch = executor.submit(query._FetchData, query_day)
+                        fetches_by_pair[fetch] = (i, query_day, query)
+
+            failures = []
+            updated_model_classes = set()
+            for fetch in futures.as_completed(fetches_by_pair):
+                i, query_day, query = fetches_by_pair[fetch]
+                try:
+                    data, response_code = fetch.result()
+                except Exception:
+                    logging.exception(
+                        'Failed to fetch %s for %s', query.query_name, query_day
                     )
-                    if i > 2:
-                        logging.error(
-                            'WebStatusAlert-1: Failed to get metrics even after 2 days'
-                        )
-                    return error_message, 500
-
-        # The code above calls FetchAndSaveData() which calls _SaveData(),
-        # which calls put() a bunch of times to add a new entity for each metrics datapoint.  # noqa: E501
+                    data, response_code = None, 500
+                if response_code == 200:
+                    query._SaveData(data, query_day)
+                    updated_model_classes.add(query.model_class)
+                elif response_code != 404:
+                    failures.append((i, response_code))
+
+        for model_class in updated_model_classes:
+            try:
+                metrics_analytics.update_summary(model_class)
+            except Exception:
+                logging.exception(
+                    'Failed to summarize %s', model_class._get_kind()
+                )
+
+        # The code above calls _SaveData(),
+        # which adds a new entity for each metrics datapoint.
         # Separately, when a request comes in get get metrics data, the file api/metricsdata.py  # noqa: E501
         # does a query on those datapoints and caches the result. If we don't invalidate when  # noqa: E501
         # we add datapoints, the cached query result will be lacking the new datapoints.  # noqa: E501
         # This is run once every 6 hours.
         rediscache.delete_keys_with_prefix('metrics')
+
+        if failures:
+            if any(i > 2 for i, _ in failures):
+                logging.error(
+                    'WebStatusAlert-1: Failed to get metrics even after 2 days'
+                )
+            error_message = (
+                'Got error %d while fetching usage data' % failures[0][1]
+            )
+            return error_message, 500
+
         return 'Success'
 
 
@@ -332,6 +534,7 @@ class HistogramsHandler(basehandlers.FlaskHandler):
                     all_existing,
                 )
 
+        rediscache.delete_keys_with_prefix(metrics_models.HISTOGRAMS_CACHE_KEY)
         return 'Success'
 
 
@@ -20,6 +20,7 @@ import json
 from unittest import mock
 
 import flask
+from google.cloud import ndb  # type: ignore
 
 import testing_config  # Must be imported before the module under test.
 from internals import fetchmetrics, metrics_models
@@ -30,6 +31,10 @@ test_app = flask.Flask(__name__)
 class FetchMetricsTest(testing_config.CustomTestCase):
     """Tests for fetching metrics."""
 
+    def setUp(self):
+        """Start without any cached ID tokens."""
+        fetchmetrics._id_tokens.clear()
+
     @mock.patch('settings.PROD', True)
     @mock.patch('google.oauth2.id_token.fetch_id_token')
     @mock.patch('requests.request')
@@ -68,6 +73,21 @@ class FetchMetricsTest(testing_config.CustomTestCase):
             headers={'Authorization': 'Bearer fake-token'},
         )
 
+    @mock.patch('settings.PROD', True)
+    @mock.patch('google.oauth2.id_token.fetch_id_token')
+    @mock.patch('requests.request')
+    def test__token_reused(self, mock_fetch, mock_fetch_id_token):
+        """The ID token of a server is fetched once for all of its URLs."""
+        mock_fetch_id_token.return_value = 'fake-token'
+
+        fetchmetrics._FetchMetrics('https://example.com/q?date=20210119')
+        fetchmetrics._FetchMetrics('https://example.com/q?date=20210120')
+
+        mock_fetch_id_token.assert_called_once_with(
+            mock.ANY, 'https://example.com/q'
+        )
+        self.assertEqual(2, mock_fetch.call_count)
+
     @mock.patch('requests.request')
     def test__dev(self, mock_fetch):
         """In Dev, we cannot access uma-export."""
@@ -175,6 +195,177 @@ class UmaQueryTest(testing_config.CustomTestCase):
         self.assertEqual(None, actual_r)
         self.assertEqual(500, actual_status)
 
+    @mock.patch('internals.fetchmetrics.PUT_BATCH_SIZE', 2)
+    def test_SaveData(self):
+        """We add each new bucket in batches, and then the capstone."""
+        query_date = datetime.date(2021, 1, 20)
+        metrics_models.FeatureObserver(
+            property_name='Old', bucket_id=1, date=query_date
+        ).put()
+        data = {str(bucket_id): {'rate': 0.5} for bucket_id in range(1, 6)}
+
+        self.uma_query._SaveData(data, query_date)
+
+        saved = metrics_models.FeatureObserver.query(
+            metrics_models.FeatureObserver.date == query_date
+        ).fetch()
+        self.assertCountEqual(
+            [fetchmetrics.CAPSTONE_BUCKET_ID, 1, 2, 3, 4, 5],
+            [entity.bucket_id for entity in saved],
+        )
+        for entity in saved:
+            entity.key.delete()
+
+    def test_SaveData__timelines(self):
+        """New datapoints are appended to timelines and the latest rows."""
+        query_date = datetime.date(2021, 1, 20)
+        timeline = metrics_models.MetricsTimeline.from_datapoints(
+            metrics_models.FeatureObserver,
+            1,
+            [
+                metrics_models.FeatureObserver(
+                    property_name='Prop',
+                    bucket_id=1,
+                    date=datetime.date(2021, 1, 19),
+                    day_percentage=0.25,
+                )
+            ],
+        )
+        timeline.put()
+        data = {'1': {'rate': 0.5}, '2': {'rate': 0.75}}
+
+        self.uma_query._SaveData(data, query_date)
+
+        self.assertEqual(
+            [(datetime.date(2021, 1, 19), 0.25), (query_date, 0.5)],
+            timeline.key.get().get_points(),
+        )
+        self.assertIsNone(
+            metrics_models.MetricsTimeline.make_key(
+                metrics_models.FeatureObserver, 2
+            ).get()
+        )
+        latest_metrics = metrics_models.LatestMetric.get_all(
+            metrics_models.FeatureObserver
+        )
+        self.assertCountEqual(
+            [(1, 0.5), (2, 0.75)],
+            [(row.bucket_id, row.day_percentage) for row in latest_metrics],
+        )
+        for row in latest_metrics:
+            row.key.delete()
+        timeline.key.delete()
+        for entity in metrics_models.FeatureObserver.query():
+            entity.key.delete()
+
+    def test_SaveData__retry(self):
+        """Datapoints stored by a run that failed are added on the retry."""
+        query_date = datetime.date(2021, 1, 20)
+        timeline = metrics_models.MetricsTimeline.from_datapoints(
+            metrics_models.FeatureObserver,
+            1,
+            [
+                metrics_models.FeatureObserver(
+                    property_name='Prop',
+                    bucket_id=1,
+                    date=datetime.date(2021, 1, 19),
+                    day_percentage=0.25,
+                )
+            ],
+        )
+        timeline.put()
+        # The first run stored this datapoint and then failed.
+        metrics_models.FeatureObserver(
+            property_name='Prop',
+            bucket_id=1,
+            date=query_date,
+            day_percentage=0.5,
+        ).put()
+        data = {'1': {'rate': 0.5}, '2': {'rate': 0.75}}
+
+        self.uma_query._SaveData(data, query_date)
+
+        self.assertEqual(
+            [(datetime.date(2021, 1, 19), 0.25), (query_date, 0.5)],
+            timeline.key.get().get_points(),
+        )
+        latest_metrics = metrics_models.LatestMetric.get_all(
+            metrics_models.FeatureObserver
+        )
+        self.assertCountEqual(
+            [(1, 0.5), (2, 0.75)],
+            [(row.bucket_id, row.day_percentage) for row in latest_metrics],
+        )
+        for row in latest_metrics:
+            row.key.delete()
+        timeline.key.delete()
+        for entity in metrics_models.FeatureObserver.query():
+            entity.key.delete()
+
+    def test_BackfillLatestMetrics(self):
+        """The newest datapoint of each bucket is stored, without capstones."""
+        for bucket_id, day, percentage in [
+            (fetchmetrics.CAPSTONE_BUCKET_ID, 20, None),
+            (1, 19, 0.25),
+            (1, 20, 0.5),
+            (2, 18, 0.75),
+        ]:
+            metrics_models.FeatureObserver(
+                property_name='Prop %d' % bucket_id,
+                bucket_id=bucket_id,
+                date=datetime.date(2021, 1, day),
+                day_percentage=percentage,
+            ).put()
+        metrics_models.FeatureObserverHistogram(
+            bucket_id=2, property_name='Prop 2'
+        ).put()
+
+        # Bucket 2 is not among the newest datapoints, so it is queried.
+        with mock.patch('internals.fetchmetrics.NEWEST_DATAPOINTS_BATCH', 2):
+            self.assertEqual(2, self.uma_query.BackfillLatestMetrics())
+
+        latest_metrics = metrics_models.LatestMetric.get_all(
+            metrics_models.FeatureObserver
+        )
+        self.assertCountEqual(
+            [
+                (1, datetime.date(2021, 1, 20), 0.5),
+                (2, datetime.date(2021, 1, 18), 0.75),
+            ],
+            [
+                (row.bucket_id, row.date, row.day_percentage)
+                for row in latest_metrics
+            ],
+        )
+        for row in latest_metrics:
+            row.key.delete()
+        for entity in metrics_models.FeatureObserver.query():
+            entity.key.delete()
+        for entity in metrics_models.FeatureObserverHistogram.query():
+            entity.key.delete()
+
+    @mock.patch('internals.fetchmetrics.ndb.put_multi_async')
+    @mock.patch('internals.fetchmetrics.MAX_PUTS_IN_FLIGHT', 2)
+    @mock.patch('internals.fetchmetrics.PUT_BATCH_SIZE', 2)
+    def test_PutInBatches(self, mock_put_multi_async):
+        """Entities are written in batches, and a failed batch raises."""
+        future = ndb.Future()
+        future.set_result(None)
+        mock_put_multi_async.side_effect = lambda batch: [future] * len(batch)
+
+        fetchmetrics._PutInBatches(list(range(5)))
+
+        self.assertEqual(
+            [mock.call([0, 1]), mock.call([2, 3]), mock.call([4])],
+            mock_put_multi_async.call_args_list,
+        )
+
+        failed = ndb.Future()
+        failed.set_exception(ValueError('commit failed'))
+        mock_put_multi_async.side_effect = lambda batch: [failed]
+        with self.assertRaises(ValueError):
+            fetchmetrics._PutInBatches(list(range(5)))
+
 
 class YesterdayHandlerTest(testing_config.CustomTestCase):
     """Tests for the YesterdayHandler."""
@@ -184,10 +375,16 @@ class YesterdayHandlerTest(testing_config.CustomTestCase):
         self.request_path = '/cron/metrics'
         self.handler = fetchmetrics.YesterdayHandler()
 
-    @mock.patch('internals.fetchmetrics.UmaQuery.FetchAndSaveData')
-    def test_get__normal(self, mock_FetchAndSaveData):
+    @mock.patch('internals.metrics_analytics.update_summary')
+    @mock.patch('internals.fetchmetrics.UmaQuery._SaveData')
+    @mock.patch('internals.fetchmetrics.UmaQuery._FetchData')
+    @mock.patch('internals.fetchmetrics.UmaQuery._HasCapstone')
+    def test_get__normal(
+        self, mock_has_capstone, mock_fetch, mock_save, mock_update_summary
+    ):
         """When requested with no date, we check the previous 5 days."""
-        mock_FetchAndSaveData.return_value = 200
+        mock_has_capstone.return_value = False
+        mock_fetch.return_value = ({'1': {'rate': 0.5}}, 200)
         today = datetime.date(2021, 1, 20)
 
         with test_app.test_request_context(self.request_path):
@@ -199,12 +396,27 @@ class YesterdayHandlerTest(testing_config.CustomTestCase):
             for day in [19, 18, 17, 16, 15]
             for unused_query in fetchmetrics.UMA_QUERIES
         ]
-        mock_FetchAndSaveData.assert_has_calls(expected_calls)
+        mock_fetch.assert_has_calls(expected_calls, any_order=True)
+        self.assertEqual(len(expected_calls), mock_fetch.call_count)
+        self.assertEqual(len(expected_calls), mock_save.call_count)
+        mock_update_summary.assert_has_calls(
+            [
+                mock.call(query.model_class)
+                for query in fetchmetrics.UMA_QUERIES
+            ],
+            any_order=True,
+        )
 
-    @mock.patch('internals.fetchmetrics.UmaQuery.FetchAndSaveData')
-    def test_get__debugging(self, mock_FetchAndSaveData):
+    @mock.patch('internals.metrics_analytics.update_summary')
+    @mock.patch('internals.fetchmetrics.UmaQuery._SaveData')
+    @mock.patch('internals.fetchmetrics.UmaQuery._FetchData')
+    @mock.patch('internals.fetchmetrics.UmaQuery._HasCapstone')
+    def test_get__debugging(
+        self, mock_has_capstone, mock_fetch, mock_save, mock_update_summary
+    ):
         """We can request that the app get metrics for one specific day."""
-        mock_FetchAndSaveData.return_value = 200
+        mock_has_capstone.return_value = False
+        mock_fetch.return_value = ({'1': {'rate': 0.5}}, 200)
         today = datetime.date(2021, 1, 20)
 
         with test_app.test_request_context(
@@ -217,7 +429,93 @@ class YesterdayHandlerTest(testing_config.CustomTestCase):
             mock.call(datetime.date(2021, 1, 20))
             for unused_query in fetchmetrics.UMA_QUERIES
         ]
-        mock_FetchAndSaveData.assert_has_calls(expected_calls)
+        mock_fetch.assert_has_calls(expected_calls)
+
+    @mock.patch('internals.metrics_analytics.update_summary')
+    @mock.patch('internals.fetchmetrics.UmaQuery._SaveData')
+    @mock.patch('internals.fetchmetrics.UmaQuery._FetchData')
+    @mock.patch('internals.fetchmetrics.UmaQuery._HasCapstone')
+    def test_get__skip_capstones(
+        self, mock_has_capstone, mock_fetch, mock_save, mock_update_summary
+    ):
+        """Days and queries that were already saved are not fetched again."""
+        mock_has_capstone.return_value = True
+        today = datetime.date(2021, 1, 20)
+
+        with test_app.test_request_context(self.request_path):
+            actual_response = self.handler.get_template_data(today=today)
+
+        self.assertEqual('Success', actual_response)
+        mock_fetch.assert_not_called()
+        mock_save.assert_not_called()
+        mock_update_summary.assert_not_called()
+
+    @mock.patch('logging.exception')
+    @mock.patch('internals.metrics_analytics.update_summary')
+    @mock.patch('internals.fetchmetrics.UmaQuery._SaveData')
+    @mock.patch('internals.fetchmetrics.UmaQuery._FetchData')
+    @mock.patch('internals.fetchmetrics.UmaQuery._HasCapstone')
+    def test_get__summary_fails(
+        self,
+        mock_has_capstone,
+        mock_fetch,
+        mock_save,
+        mock_update_summary,
+        mock_logging_exception,
+    ):
+        """A failed summary is logged but does not fail the request."""
+        mock_has_capstone.return_value = False
+        mock_fetch.return_value = ({'1': {'rate': 0.5}}, 200)
+        mock_update_summary.side_effect = ValueError('bad data')
+        today = datetime.date(2021, 1, 20)
+
+        with test_app.test_request_context(self.request_path):
+            actual_response = self.handler.get_template_data(today=today)
+
+        self.assertEqual('Success', actual_response)
+        self.assertEqual(
+            len(fetchmetrics.UMA_QUERIES), mock_logging_exception.call_count
+        )
+
+    @mock.patch('logging.exception')
+    @mock.patch('logging.error')
+    @mock.patch('internals.metrics_analytics.update_summary')
+    @mock.patch('internals.fetchmetrics.UmaQuery._SaveData')
+    @mock.patch('internals.fetchmetrics.UmaQuery._FetchData')
+    @mock.patch('internals.fetchmetrics.UmaQuery._HasCapstone')
+    def test_get__failures(
+        self,
+        mock_has_capstone,
+        mock_fetch,
+        mock_save,
+        mock_update_summary,
+        mock_logging_error,
+        mock_logging_exception,
+    ):
+        """A failed fetch does not stop the others, but fails the request."""
+        mock_has_capstone.return_value = False
+        failing_day = datetime.date(2021, 1, 16)
+
+        def fetch(query_day):
+            if query_day == failing_day:
+                raise ValueError('Exceeded maximum number of retries')
+            return {'1': {'rate': 0.5}}, 200
+
+        mock_fetch.side_effect = fetch
+        today = datetime.date(2021, 1, 20)
+
+        with test_app.test_request_context(self.request_path):
+            actual_response = self.handler.get_template_data(today=today)
+
+        self.assertEqual(
+            ('Got error 500 while fetching usage data', 500), actual_response
+        )
+        num_queries = len(fetchmetrics.UMA_QUERIES)
+        self.assertEqual(5 * num_queries, mock_fetch.call_count)
+        self.assertEqual(4 * num_queries, mock_save.call_count)
+        mock_logging_error.assert_called_once_with(
+            'WebStatusAlert-1: Failed to get metrics even after 2 days'
+        )
 
 
 class HistogramsHandlerTest(testing_config.CustomTestCase):
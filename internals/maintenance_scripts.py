@@ -35,9 +35,21 @@ from webstatus_openapi import (
 
 import settings
 from api import converters
-from framework import cloud_tasks_helpers, origin_trials_client, utils
+from framework import (
+    cloud_tasks_helpers,
+    origin_trials_client,
+    rediscache,
+    utils,
+)
 from framework.basehandlers import FlaskHandler
-from internals import approval_defs, core_enums, feature_helpers, stage_helpers
+from internals import (
+    approval_defs,
+    core_enums,
+    feature_helpers,
+    feature_snapshots,
+    fetchmetrics,
+    stage_helpers,
+)
 from internals.core_models import FeatureEntry, MilestoneSet, Stage
 from internals.feature_links import batch_index_feature_entries
 from internals.review_models import Activity, Amendment, Gate, Vote
@@ -1043,6 +1055,16 @@ class FetchWebdxFeatureId(FlaskHandler):
         return f'{len(feature_ids_list)} feature ids are successfully stored.'
 
 
+class RefreshOwnersFiles(FlaskHandler):
+    """Handler to refresh the stored copies of OWNERS files."""
+
+    def get_template_data(self, **kwargs) -> str:
+        """Fetch the OWNERS files of all gate types and store them."""
+        self.require_cron_header()
+        owner_counts = approval_defs.refresh_owners_files()
+        return f'{len(owner_counts)} OWNERS files are successfully stored.'
+
+
 class SendManualOTCreatedEmail(FlaskHandler):
     """Manually send an email to origin trial contacts that an origin trial has
     been created but not yet activated.
@@ -1795,3 +1817,27 @@ class DeleteWPTCoverageReport(FlaskHandler):
             f'Finished. Deleted a total of {count} old WPT coverage reports.'
         )
         return f'{count} WPT coverage reports deleted.'
+
+
+class RebuildFeatureSnapshots(FlaskHandler):
+    """Backfill the precomputed JSON dicts of all features."""
+
+    def get_template_data(self, **kwargs) -> str:
+        """Rebuild and store the snapshot of every feature."""
+        self.require_cron_header()
+        count = feature_snapshots.rebuild_all()
+        return f'{count} feature snapshots rebuilt.'
+
+
+class BackfillLatestMetrics(FlaskHandler):
+    """Backfill the LatestMetric rows that popularity lists are read from."""
+
+    def get_template_data(self, **kwargs) -> str:
+        """Store the latest datapoint of each bucket of each UMA query."""
+        self.require_cron_header()
+        count = sum(
+            query.BackfillLatestMetrics() for query in fetchmetrics.UMA_QUERIES
+        )
+        # Popularity lists that were cached before the backfill are empty.
+        rediscache.delete_keys_with_prefix('metrics')
+        return f'{count} latest metrics stored.'
@@ -1346,6 +1346,22 @@ class FetchWebdxFeatureIdTest(testing_config.CustomTestCase):
         self.assertEqual('Running FetchWebdxFeatureId() job failed.', result)
 
 
+class RefreshOwnersFilesTest(testing_config.CustomTestCase):
+    """Tests for the RefreshOwnersFiles handler."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.handler = maintenance_scripts.RefreshOwnersFiles()
+
+    @mock.patch('internals.approval_defs.refresh_owners_files')
+    def test_get_template_data(self, mock_refresh):
+        """The handler refreshes the stored OWNERS files."""
+        mock_refresh.return_value = {'https://example.com': 3}
+        result = self.handler.get_template_data()
+        mock_refresh.assert_called_once_with()
+        self.assertEqual('1 OWNERS files are successfully stored.', result)
+
+
 class SendManualOTCreatedEmailTest(testing_config.CustomTestCase):
     """Tests for the SendManualOTCreatedEmail handler."""
 
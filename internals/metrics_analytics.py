@@ -0,0 +1,204 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rolling means, week-over-week deltas, and top movers of UMA metrics.
+
+update_summary() runs after the metrics cron job saves new datapoints.
+It loads the bucket, date, and percentage of the recent datapoints of
+one metrics model with a projection query, and sorts them into flat
+columns by bucket and day, with one running sum over all of them.  The mean of any bucket over any range of days is then two binary
+searches and a subtraction, so all buckets are summarized in one pass.
+The results are stored in a MetricsSummary for the /data/summary and
+/data/movers endpoints.
+"""
+
+import array
+import bisect
+import datetime
+import itertools
+import logging
+from typing import Any, Optional
+
+import requests
+
+from internals import fetchchannels, metrics_models
+
+WEEK = 7
+MONTH = 28
+# Days of datapoints to load, enough for the longest window.
+HISTORY_DAYS = 2 * MONTH
+# Buckets to keep in each of the lists of risers and fallers.
+MAX_MOVERS = 100
+
+
+class Columns:
+    """Datapoints of many buckets as flat arrays sorted by bucket and day."""
+
+    def __init__(self, datapoints):
+        """Sort the datapoints into columns and sum the percentages."""
+        rows = sorted(
+            (dp.bucket_id, dp.date.toordinal(), dp.day_percentage)
+            for dp in datapoints
+            if dp.bucket_id >= 0 and dp.day_percentage is not None
+        )
+        self.bucket_ids = array.array('q', [row[0] for row in rows])
+        self.day_numbers = array.array('I', [row[1] for row in rows])
+        self.percentages = array.array('d', [row[2] for row in rows])
+        self.running_sums = array.array(
+            'd', itertools.accumulate(self.percentages, initial=0.0)
+        )
+
+    def bucket_ranges(self):
+        """Yield (bucket_id, start, end) for the rows of each bucket."""
+        start = 0
+        for bucket_id, group in itertools.groupby(self.bucket_ids):
+            end = start + sum(1 for _ in group)
+            yield bucket_id, start, end
+            start = end
+
+    def mean(
+        self, start: int, end: int, first_day: int, last_day: int
+    ) -> Optional[float]:
+        """Return the mean of rows[start:end] from first_day to last_day.
+
+        Days without a datapoint are left out, and None is returned if the
+        range has none.
+        """
+        lo = bisect.bisect_left(self.day_numbers, first_day, start, end)
+        hi = bisect.bisect_right(self.day_numbers, last_day, lo, end)
+        if lo == hi:
+            return None
+        return (self.running_sums[hi] - self.running_sums[lo]) / (hi - lo)
+
+
+def summarize(
+    datapoints,
+    as_of: datetime.date,
+    milestone_start: Optional[datetime.date] = None,
+    names: Optional[dict[int, str]] = None,
+) -> list[dict[str, Any]]:
+    """Return the rolling means and weekly delta of each bucket.
+
+    Args:
+      datapoints: StableInstance-like entities of one metrics model, which
+        only need their bucket_id, date, and day_percentage.
+      as_of: The last day of each window.
+      milestone_start: The stable date of the current milestone, if known.
+      names: The property name of each bucket.  By default, the names are
+        taken from the datapoints.
+
+    Returns:
+      One dict per bucket that has a datapoint in the last MONTH days.
+    """
+    columns = Columns(datapoints)
+    if names is None:
+        names = {dp.bucket_id: dp.property_name for dp in datapoints}
+    last_day = as_of.toordinal()
+    summaries = []
+    for bucket_id, start, end in columns.bucket_ranges():
+        mean_7 = columns.mean(start, end, last_day - WEEK + 1, last_day)
+        mean_28 = columns.mean(start, end, last_day - MONTH + 1, last_day)
+        if mean_28 is None:
+            continue
+        previous_mean_7 = columns.mean(
+            start, end, last_day - 2 * WEEK + 1, last_day - WEEK
+        )
+        delta = None
+        if mean_7 is not None and previous_mean_7 is not None:
+            delta = mean_7 - previous_mean_7
+        milestone_mean = None
+        if milestone_start:
+            milestone_mean = columns.mean(
+                start, end, milestone_start.toordinal(), last_day
+            )
+        summaries.append(
+            {
+                'bucket_id': bucket_id,
+                'property_name': names.get(bucket_id),
+                'date': str(
+                    datetime.date.fromordinal(columns.day_numbers[end - 1])
+                ),
+                'day_percentage': columns.percentages[end - 1],
+                'mean_7': mean_7,
+                'mean_28': mean_28,
+                'milestone_mean': milestone_mean,
+                'week_over_week_delta': delta,
+            }
+        )
+    return summaries
+
+
+def rank_movers(
+    summaries: list[dict[str, Any]], num: int = MAX_MOVERS
+) -> dict[str, list[int]]:
+    """Return the bucket IDs with the largest weekly rises and falls."""
+    moved = [s for s in summaries if s['week_over_week_delta']]
+    moved.sort(key=lambda s: s['week_over_week_delta'])
+    fallers = [s['bucket_id'] for s in moved if s['week_over_week_delta'] < 0]
+    risers = [s['bucket_id'] for s in moved if s['week_over_week_delta'] > 0]
+    return {'risers': risers[::-1][:num], 'fallers': fallers[:num]}
+
+
+def get_milestone_start() -> Optional[datetime.date]:
+    """Return the stable date of the current stable milestone, if known."""
+    try:
+        milestone = fetchchannels.get_current_stable_milestone()
+        release_info = fetchchannels.fetch_chrome_release_info(milestone)
+    except (requests.RequestException, KeyError, ValueError):
+        logging.exception('Could not get the current milestone schedule')
+        return None
+    stable_date = release_info.get('stable_date')
+    if not stable_date:
+        return None
+    return datetime.date.fromisoformat(stable_date[:10])
+
+
+def update_summary(model_class) -> Optional[metrics_models.MetricsSummary]:
+    """Recompute and store the analytics of the recent datapoints."""
+    query = model_class.query().order(-model_class.date)
+    newest = query.get(projection=[model_class.date])
+    if newest is None:
+        return None
+    as_of = newest.date
+    since = as_of - datetime.timedelta(days=HISTORY_DAYS - 1)
+    # Only read the indexed values that the columns need, rather than
+    # whole entities.  The names come from the much smaller LatestMetric
+    # rows, one per bucket.
+    datapoints = model_class.query(model_class.date >= since).fetch(
+        None,
+        projection=[
+            model_class.date,
+            model_class.bucket_id,
+            model_class.day_percentage,
+        ],
+    )
+    names = {
+        row.bucket_id: row.property_name
+        for row in metrics_models.LatestMetric.get_all(model_class)
+    }
+    milestone_start = get_milestone_start()
+
+    summaries = summarize(datapoints, as_of, milestone_start, names)
+    summary = metrics_models.MetricsSummary(
+        id=model_class._get_kind(),
+        as_of=as_of,
+        milestone_start=milestone_start,
+        summaries=summaries,
+        movers=rank_movers(summaries),
+    )
+    summary.put()
+    logging.info(
+        'Summarized %d buckets of %s', len(summaries), model_class._get_kind()
+    )
+    return summary
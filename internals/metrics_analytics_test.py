@@ -0,0 +1,200 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the rolling means and movers of UMA metrics."""
+
+import testing_config  # isort: split
+
+import datetime
+from unittest import mock
+
+import requests
+
+from internals import metrics_analytics
+from internals.metrics_models import (
+    LatestMetric,
+    MetricsSummary,
+    StableInstance,
+)
+
+AS_OF = datetime.date(2026, 3, 31)
+
+
+def make_datapoints(bucket_id, percentages):
+    """Return one datapoint per day, ending on AS_OF."""
+    return [
+        StableInstance(
+            bucket_id=bucket_id,
+            property_name='prop%d' % bucket_id,
+            date=AS_OF - datetime.timedelta(days=days_ago),
+            day_percentage=percentage,
+        )
+        for days_ago, percentage in enumerate(reversed(percentages))
+    ]
+
+
+class SummarizeTest(testing_config.CustomTestCase):
+    """Tests for summarize() and rank_movers()."""
+
+    def setUp(self):
+        """Make 28 days of buckets that rose, stayed, and fell."""
+        self.rising = make_datapoints(1, [0.1] * 14 + [0.3] * 14)
+        self.steady = make_datapoints(2, [0.2] * 28)
+        self.falling = make_datapoints(3, [0.4] * 21 + [0.2] * 7)
+
+    def test_summarize(self):
+        """Each bucket gets its rolling means and weekly delta."""
+        summaries = metrics_analytics.summarize(
+            self.steady + self.rising, AS_OF
+        )
+        self.assertEqual([1, 2], [s['bucket_id'] for s in summaries])
+        rising = summaries[0]
+        self.assertEqual('prop1', rising['property_name'])
+        self.assertEqual('2026-03-31', rising['date'])
+        self.assertAlmostEqual(0.3, rising['day_percentage'])
+        self.assertAlmostEqual(0.3, rising['mean_7'])
+        self.assertAlmostEqual(0.2, rising['mean_28'])
+        self.assertAlmostEqual(0.0, rising['week_over_week_delta'])
+        self.assertIsNone(rising['milestone_mean'])
+        self.assertAlmostEqual(0.0, summaries[1]['week_over_week_delta'])
+
+    def test_summarize__delta_and_milestone(self):
+        """The delta compares the last week to the one before it."""
+        summaries = metrics_analytics.summarize(
+            self.falling, AS_OF, milestone_start=AS_OF - datetime.timedelta(9)
+        )
+        falling = summaries[0]
+        self.assertAlmostEqual(0.2, falling['mean_7'])
+        self.assertAlmostEqual(0.35, falling['mean_28'])
+        self.assertAlmostEqual(-0.2, falling['week_over_week_delta'])
+        self.assertAlmostEqual(
+            (0.4 * 3 + 0.2 * 7) / 10, falling['milestone_mean']
+        )
+
+    def test_summarize__gaps(self):
+        """Missing days and empty datapoints are left out of the means."""
+        datapoints = make_datapoints(1, [0.5] * 7)
+        del datapoints[2:5]
+        datapoints.append(
+            StableInstance(
+                bucket_id=1,
+                property_name='prop1',
+                date=AS_OF - datetime.timedelta(days=3),
+                day_percentage=None,
+            )
+        )
+        # The capstone and old buckets are not summarized.
+        datapoints += make_datapoints(-1, [0.5])
+        old = make_datapoints(4, [0.5])
+        old[0].date = AS_OF - datetime.timedelta(days=40)
+        datapoints += old
+
+        summaries = metrics_analytics.summarize(datapoints, AS_OF)
+        self.assertEqual(1, len(summaries))
+        self.assertAlmostEqual(0.5, summaries[0]['mean_7'])
+        self.assertIsNone(summaries[0]['week_over_week_delta'])
+
+    def test_summarize__names(self):
+        """Names can be given for datapoints that do not have them."""
+        summaries = metrics_analytics.summarize(
+            self.steady, AS_OF, names={2: 'renamed'}
+        )
+        self.assertEqual('renamed', summaries[0]['property_name'])
+
+    def test_rank_movers(self):
+        """Buckets are ranked by the size of their weekly change."""
+        summaries = [
+            {'bucket_id': bucket_id, 'week_over_week_delta': delta}
+            for bucket_id, delta in [
+                (1, 0.2),
+                (2, 0.0),
+                (3, -0.2),
+                (4, None),
+                (5, 0.05),
+                (6, -0.01),
+            ]
+        ]
+        self.assertEqual(
+            {'risers': [1, 5], 'fallers': [3, 6]},
+            metrics_analytics.rank_movers(summaries),
+        )
+        self.assertEqual(
+            {'risers': [1], 'fallers': [3]},
+            metrics_analytics.rank_movers(summaries, num=1),
+        )
+
+
+class GetMilestoneStartTest(testing_config.CustomTestCase):
+    """Tests for get_milestone_start()."""
+
+    @mock.patch('internals.fetchchannels.fetch_chrome_release_info')
+    @mock.patch('internals.fetchchannels.get_current_stable_milestone')
+    def test_get_milestone_start(self, mock_milestone, mock_release_info):
+        """The stable date of the current milestone is used."""
+        mock_milestone.return_value = 135
+        mock_release_info.return_value = {'stable_date': '2026-03-03T00:00:00'}
+        self.assertEqual(
+            datetime.date(2026, 3, 3), metrics_analytics.get_milestone_start()
+        )
+        mock_release_info.assert_called_once_with(135)
+
+    @mock.patch('logging.exception')
+    @mock.patch('internals.fetchchannels.get_current_stable_milestone')
+    def test_get_milestone_start__error(self, mock_milestone, mock_exception):
+        """Without a schedule, there is no milestone mean."""
+        mock_milestone.side_effect = requests.ConnectionError()
+        self.assertIsNone(metrics_analytics.get_milestone_start())
+        mock_exception.assert_called_once()
+
+
+class UpdateSummaryTest(testing_config.CustomTestCase):
+    """Tests for update_summary()."""
+
+    def setUp(self):
+        """Store eight weeks of datapoints and a stale one."""
+        self.datapoints = make_datapoints(1, [0.1] * 49 + [0.2] * 7)
+        stale = make_datapoints(1, [0.9])
+        stale[0].date = AS_OF - datetime.timedelta(days=100)
+        self.datapoints += stale
+        for dp in self.datapoints:
+            dp.put()
+        for row in LatestMetric.merge(StableInstance, self.datapoints):
+            row.put()
+
+    def tearDown(self):
+        """Delete the datapoints and summaries."""
+        for kind in (StableInstance, LatestMetric, MetricsSummary):
+            for entity in kind.query():
+                entity.key.delete()
+
+    @mock.patch('internals.metrics_analytics.get_milestone_start')
+    def test_update_summary(self, mock_milestone_start):
+        """The summary of the newest datapoints is stored."""
+        mock_milestone_start.return_value = None
+        metrics_analytics.update_summary(StableInstance)
+
+        summary = MetricsSummary.make_key(StableInstance).get()
+        self.assertEqual(AS_OF, summary.as_of)
+        self.assertIsNone(summary.milestone_start)
+        self.assertEqual(1, len(summary.summaries))
+        self.assertEqual('prop1', summary.summaries[0]['property_name'])
+        self.assertAlmostEqual(0.2, summary.summaries[0]['mean_7'])
+        self.assertAlmostEqual(0.125, summary.summaries[0]['mean_28'])
+        self.assertEqual({'risers': [1], 'fallers': []}, summary.movers)
+
+    def test_update_summary__no_data(self):
+        """Nothing is stored before the first datapoint."""
+        self.tearDown()
+        self.assertIsNone(metrics_analytics.update_summary(StableInstance))
+        self.assertIsNone(MetricsSummary.make_key(StableInstance).get())
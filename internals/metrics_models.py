@@ -15,8 +15,21 @@
 
 """NDB models for storing UMA metrics, histograms, and feature usage statistics."""
 
+from __future__ import annotations
+
+import array
+import datetime
+import sys
+
 from google.cloud import ndb  # type: ignore
 
+from framework import rediscache
+
+HISTOGRAMS_CACHE_KEY = 'histograms'
+# The bucket names only change when the daily HistogramsHandler cron job
+# adds new ones, and then it deletes the cached copies.
+rediscache.use_local_cache(HISTOGRAMS_CACHE_KEY, max_size=10, ttl=10 * 60)
+
 
 # UMA metrics.
 class StableInstance(ndb.Model):
@@ -52,6 +65,171 @@ class WebDXFeature(StableInstance):
     pass
 
 
+def _array_from_bytes(typecode: str, data: bytes | None) -> array.array:
+    """Decode a little-endian array."""
+    values = array.array(typecode)
+    values.frombytes(data or b'')
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _array_to_bytes(values: array.array) -> bytes:
+    """Encode an array as little-endian."""
+    if sys.byteorder != 'little':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class MetricsTimeline(ndb.Model):
+    """The daily percentages of one bucket of one metrics model, by column.
+
+    The key name is '<model kind>|<bucket_id>'.  day_numbers holds the
+    ordinal of each date as little-endian uint32 values in increasing
+    order, and percentages holds the day_percentage of the same date as a
+    little-endian float32 value.
+    """
+
+    property_name = ndb.StringProperty()
+    day_numbers = ndb.BlobProperty(compressed=True)
+    percentages = ndb.BlobProperty(compressed=True)
+    updated = ndb.DateTimeProperty(auto_now=True)
+
+    @classmethod
+    def make_key(cls, model_class, bucket_id: int) -> ndb.Key:
+        """Return the key of the timeline of a bucket of model_class."""
+        return ndb.Key(cls, '%s|%d' % (model_class._get_kind(), bucket_id))
+
+    def get_columns(self) -> tuple[array.array, array.array]:
+        """Return the arrays of day numbers and percentages."""
+        return (
+            _array_from_bytes('I', self.day_numbers),
+            _array_from_bytes('f', self.percentages),
+        )
+
+    def set_columns(
+        self, day_numbers: array.array, percentages: array.array
+    ) -> None:
+        """Store the arrays of day numbers and percentages."""
+        self.day_numbers = _array_to_bytes(day_numbers)
+        self.percentages = _array_to_bytes(percentages)
+
+    def get_points(self) -> list[tuple[datetime.date, float]]:
+        """Return (date, day_percentage) pairs in date order."""
+        day_numbers, percentages = self.get_columns()
+        return [
+            (datetime.date.fromordinal(day_number), percentage)
+            for day_number, percentage in zip(day_numbers, percentages)
+        ]
+
+    def add_points(self, points: list[tuple[datetime.date, float]]) -> None:
+        """Merge in (date, day_percentage) pairs, keeping existing dates."""
+        by_day_number = {
+            date.toordinal(): percentage for date, percentage in points
+        }
+        by_day_number.update(zip(*self.get_columns()))
+        day_numbers = sorted(by_day_number)
+        self.set_columns(
+            array.array('I', day_numbers),
+            array.array('f', [by_day_number[d] for d in day_numbers]),
+        )
+
+    @classmethod
+    def from_datapoints(cls, model_class, bucket_id: int, datapoints):
+        """Make a timeline from StableInstance-like entities."""
+        timeline = cls(key=cls.make_key(model_class, bucket_id))
+        timeline.add_points(
+            [
+                (dp.date, dp.day_percentage)
+                for dp in datapoints
+                if dp.day_percentage is not None
+            ]
+        )
+        if datapoints:
+            timeline.property_name = datapoints[-1].property_name
+        return timeline
+
+
+class LatestMetric(ndb.Model):
+    """The most recent datapoint of one bucket of one metrics model.
+
+    The key name is '<model kind>|<bucket_id>', and metric_kind is the
+    model kind, so that all of the rows for a popularity list can be read
+    with one query.
+    """
+
+    metric_kind = ndb.StringProperty(required=True)
+    bucket_id = ndb.IntegerProperty(required=True)
+    property_name = ndb.StringProperty()
+    date = ndb.DateProperty(required=True)
+    day_percentage = ndb.FloatProperty()
+
+    @classmethod
+    def make_key(cls, model_class, bucket_id: int) -> ndb.Key:
+        """Return the key of the latest datapoint of a bucket."""
+        return ndb.Key(cls, '%s|%d' % (model_class._get_kind(), bucket_id))
+
+    @classmethod
+    def get_all(cls, model_class) -> list[LatestMetric]:
+        """Return the latest datapoint of each bucket of model_class."""
+        query = cls.query(cls.metric_kind == model_class._get_kind())
+        return query.fetch(None)
+
+    @classmethod
+    def merge(cls, model_class, datapoints) -> list[LatestMetric]:
+        """Return the rows that newer StableInstance-like entities change.
+
+        The caller is expected to put() the returned rows.
+        """
+        newest_by_bucket_id = {}
+        for dp in datapoints:
+            newest = newest_by_bucket_id.get(dp.bucket_id)
+            if newest is None or newest.date < dp.date:
+                newest_by_bucket_id[dp.bucket_id] = dp
+
+        bucket_ids = list(newest_by_bucket_id)
+        existing_rows = ndb.get_multi(
+            [cls.make_key(model_class, bucket_id) for bucket_id in bucket_ids]
+        )
+        changed_rows = []
+        for bucket_id, row in zip(bucket_ids, existing_rows):
+            dp = newest_by_bucket_id[bucket_id]
+            if row is not None and row.date > dp.date:
+                continue
+            changed_rows.append(
+                cls(
+                    key=cls.make_key(model_class, bucket_id),
+                    metric_kind=model_class._get_kind(),
+                    bucket_id=bucket_id,
+                    property_name=dp.property_name,
+                    date=dp.date,
+                    day_percentage=dp.day_percentage,
+                )
+            )
+        return changed_rows
+
+
+class MetricsSummary(ndb.Model):
+    """Rolling means, weekly deltas, and top movers of one metrics model.
+
+    The key name is the model kind.  summaries holds one dict per bucket,
+    as computed by metrics_analytics.summarize(), and movers holds the
+    bucket IDs with the largest weekly rises and falls.
+    """
+
+    as_of = ndb.DateProperty(required=True)
+    milestone_start = ndb.DateProperty()
+    summaries = ndb.JsonProperty(compressed=True)
+    movers = ndb.JsonProperty()
+    updated = ndb.DateTimeProperty(auto_now=True)
+
+    @classmethod
+    def make_key(cls, model_class) -> ndb.Key:
+        """Return the key of the summary of model_class."""
+        return ndb.Key(cls, model_class._get_kind())
+
+
 class HistogramModel(ndb.Model):
     """Container for a histogram."""
 
@@ -61,10 +239,16 @@ class HistogramModel(ndb.Model):
     @classmethod
     def get_all(cls):
         """Get all."""
+        cache_key = '%s|%s' % (HISTOGRAMS_CACHE_KEY, cls.__name__)
+        output = rediscache.get(cache_key)
+        if output is not None:
+            return output
+
         output = {}
         buckets = cls.query().fetch(None)
         for bucket in buckets:
             output[bucket.bucket_id] = bucket.property_name
+        rediscache.set(cache_key, output)
         return output
 
 
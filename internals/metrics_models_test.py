@@ -0,0 +1,161 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the metrics models."""
+
+import testing_config  # isort: split
+
+import datetime
+
+from internals import metrics_models
+
+
+class MetricsTimelineTest(testing_config.CustomTestCase):
+    """Tests for the columnar timeline of a metrics bucket."""
+
+    def setUp(self):
+        """Make a timeline with two days."""
+        self.timeline = metrics_models.MetricsTimeline(
+            key=metrics_models.MetricsTimeline.make_key(
+                metrics_models.FeatureObserver, 123
+            )
+        )
+        self.timeline.add_points(
+            [
+                (datetime.date(2024, 1, 3), 0.25),
+                (datetime.date(2024, 1, 1), 0.5),
+            ]
+        )
+
+    def test_make_key(self):
+        """Each model and bucket has its own timeline."""
+        self.assertEqual('FeatureObserver|123', self.timeline.key.string_id())
+
+    def test_columns(self):
+        """Days and percentages are stored as packed little-endian arrays."""
+        self.assertEqual(8, len(self.timeline.day_numbers))
+        self.assertEqual(8, len(self.timeline.percentages))
+        self.assertEqual(
+            datetime.date(2024, 1, 1).toordinal().to_bytes(4, 'little'),
+            self.timeline.day_numbers[:4],
+        )
+
+    def test_add_points(self):
+        """Points are kept in date order, and existing dates are kept."""
+        self.timeline.add_points(
+            [
+                (datetime.date(2024, 1, 2), 0.125),
+                (datetime.date(2024, 1, 3), 0.75),
+            ]
+        )
+        self.assertEqual(
+            [
+                (datetime.date(2024, 1, 1), 0.5),
+                (datetime.date(2024, 1, 2), 0.125),
+                (datetime.date(2024, 1, 3), 0.25),
+            ],
+            self.timeline.get_points(),
+        )
+
+    def test_from_datapoints(self):
+        """A timeline can be built from the datapoints of a bucket."""
+        datapoints = [
+            metrics_models.FeatureObserver(
+                property_name='Old',
+                bucket_id=1,
+                date=datetime.date(2024, 1, 1),
+                day_percentage=0.5,
+            ),
+            metrics_models.FeatureObserver(
+                property_name='New',
+                bucket_id=1,
+                date=datetime.date(2024, 1, 2),
+                day_percentage=0.25,
+            ),
+        ]
+        timeline = metrics_models.MetricsTimeline.from_datapoints(
+            metrics_models.FeatureObserver, 1, datapoints
+        )
+        self.assertEqual('New', timeline.property_name)
+        self.assertEqual(
+            [
+                (datetime.date(2024, 1, 1), 0.5),
+                (datetime.date(2024, 1, 2), 0.25),
+            ],
+            timeline.get_points(),
+        )
+
+
+class LatestMetricTest(testing_config.CustomTestCase):
+    """Tests for the latest datapoint of each bucket."""
+
+    def tearDown(self):
+        """Delete the stored rows."""
+        for row in metrics_models.LatestMetric.query():
+            row.key.delete()
+
+    def make_datapoint(self, bucket_id, day, day_percentage):
+        """Make a FeatureObserver datapoint on a day of January 2024."""
+        return metrics_models.FeatureObserver(
+            property_name='Prop%d' % bucket_id,
+            bucket_id=bucket_id,
+            date=datetime.date(2024, 1, day),
+            day_percentage=day_percentage,
+        )
+
+    def test_merge(self):
+        """Only datapoints newer than the stored row change it."""
+        metrics_models.LatestMetric(
+            key=metrics_models.LatestMetric.make_key(
+                metrics_models.FeatureObserver, 1
+            ),
+            metric_kind='FeatureObserver',
+            bucket_id=1,
+            date=datetime.date(2024, 1, 5),
+            day_percentage=0.5,
+        ).put()
+
+        changed = metrics_models.LatestMetric.merge(
+            metrics_models.FeatureObserver,
+            [
+                self.make_datapoint(1, 4, 0.25),
+                self.make_datapoint(2, 3, 0.25),
+                self.make_datapoint(2, 4, 0.75),
+            ],
+        )
+
+        self.assertEqual(1, len(changed))
+        self.assertEqual(2, changed[0].bucket_id)
+        self.assertEqual(datetime.date(2024, 1, 4), changed[0].date)
+        self.assertEqual(0.75, changed[0].day_percentage)
+        self.assertEqual('FeatureObserver', changed[0].metric_kind)
+
+    def test_get_all(self):
+        """The rows of one metrics model can be read together."""
+        for model_class in (
+            metrics_models.FeatureObserver,
+            metrics_models.StableInstance,
+        ):
+            metrics_models.LatestMetric(
+                key=metrics_models.LatestMetric.make_key(model_class, 1),
+                metric_kind=model_class._get_kind(),
+                bucket_id=1,
+                date=datetime.date(2024, 1, 5),
+            ).put()
+
+        actual = metrics_models.LatestMetric.get_all(
+            metrics_models.FeatureObserver
+        )
+
+        self.assertEqual(['FeatureObserver'], [r.metric_kind for r in actual])
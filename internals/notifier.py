@@ -32,7 +32,13 @@ from markupsafe import escape
 import settings
 from api import converters
 from framework import basehandlers, cloud_tasks_helpers, permissions, users
-from internals import approval_defs, core_enums, fetchchannels, stage_helpers
+from internals import (
+    approval_defs,
+    core_enums,
+    fetchchannels,
+    search_cache,
+    stage_helpers,
+)
 from internals.core_models import FeatureEntry, MilestoneSet, Stage
 from internals.data_types import StageDict
 from internals.review_models import Gate
@@ -536,6 +542,12 @@ class FeatureStar(ndb.Model):
     # This is so that we do not sync a bell to a star that the user has removed.
     starred = ndb.BooleanProperty(default=True)
 
+    def put(self, **kwargs) -> ndb.Key:
+        """Save the star and update the user's starred-by:me results."""
+        key = super(FeatureStar, self).put(**kwargs)
+        search_cache.invalidate(search_cache.starred_by(self.email))
+        return key
+
     @classmethod
     def get_star(self, email, feature_id):
         """If that user starred that feature, return the model or None."""
@@ -0,0 +1,382 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Precomputed sort orders of all features, used to sort search results.
+
+A RankTable holds the values of one indexed property for every entity
+that has it, e.g., FeatureEntry.name or Gate.requested_on, along with
+the ID of the feature that each entity belongs to.  From those it keeps
+every feature in the same order that a Datastore query ordered by that
+property would return, so sorting search results only needs a lookup
+of each result's rank rather than a scan of all features.
+
+Tables are loaded lazily, shared between instances as snapshots in
+rediscache, and patched whenever FeatureEntry, Gate, or Vote entities are
+put, using the same versioned deltas as the fulltext index.
+"""
+
+import bisect
+import logging
+import random
+import threading
+from typing import Any, Callable, Iterable, Iterator
+
+from google.cloud import ndb  # type: ignore
+
+from framework import rediscache
+
+# The values of one entity: the ID of the feature it belongs to and the
+# sort keys of all of its values of the property.
+RankEntry = tuple[int, tuple[tuple, ...]]
+RankEntries = dict[int, RankEntry]
+
+# The rediscache keys used to share rank tables between instances.  All
+# tables share one version counter, and each put adds one delta that
+# patches every table that the entity is in.
+RANKS_CACHE_KEY = 'RankTables'
+RANKS_VERSION_KEY = RANKS_CACHE_KEY + '|version'
+RANKS_DELTA_KEY = RANKS_CACHE_KEY + '|delta'
+RANKS_SNAPSHOT_KEY = RANKS_CACHE_KEY + '|snapshot'
+# An instance that is further behind than this reloads the snapshot.
+MAX_RANK_DELTAS = 100
+# A table's snapshot is rewritten after this many deltas have accumulated.
+SNAPSHOT_INTERVAL = 50
+# Snapshots expire so that deleted entities are eventually dropped.
+SNAPSHOT_TTL = 6 * 60 * 60  # Six hours
+# A new version counter starts at a random point so that an instance never
+# mistakes a table from before the counter was lost for a current one.
+MAX_INITIAL_VERSION = 1 << 40
+
+
+def sort_key(value: Any) -> tuple:
+    """Return a key that orders values like Datastore, with nulls first."""
+    if value is None:
+        return (0,)
+    return (1, value)
+
+
+def table_name(model_class: type[ndb.Model], prop: ndb.Property) -> str:
+    """Return the name of the rank table of a model property."""
+    return '%s.%s' % (model_class._get_kind(), prop._name)
+
+
+def indexed_values(entity: ndb.Model) -> dict[str, tuple]:
+    """Return the values of each indexed property of the entity by table."""
+    result = {}
+    for prop in entity._properties.values():
+        if not prop._indexed or isinstance(prop, ndb.StructuredProperty):
+            continue
+        value = prop._get_value(entity)
+        values = tuple(value) if prop._repeated else (value,)
+        result[table_name(type(entity), prop)] = values
+    return result
+
+
+class RankTable:
+    """The order of all features by the values of one property.
+
+    Each feature is ranked by the lowest of its values when sorting in
+    ascending order and the highest when sorting in descending order,
+    which is the position at which a Datastore query would first return
+    it.  Ties are broken by feature ID, like Datastore breaks them by key.
+    """
+
+    def __init__(self, name: str, version: int = 0):
+        """Initialize an empty table at the given version."""
+        self.name = name
+        self.version = version
+        self.snapshot_version = version
+        self.entries: RankEntries = {}
+        self.entity_ids_by_feature: dict[int, set[int]] = {}
+        # Each feature's lowest and highest sort keys across its entities.
+        self.feature_keys: dict[int, tuple[tuple, tuple]] = {}
+        # Sorted lists of (low key, feature ID) and (high key, -feature ID).
+        self._ascending: list[tuple[tuple, int]] = []
+        self._descending: list[tuple[tuple, int]] = []
+        self._ranks: dict[bool, dict[int, int]] = {}
+        # Held by updates, by copies of the order, and while catching up
+        # with the deltas of other instances.
+        self.lock = threading.RLock()
+
+    @classmethod
+    def build(
+        cls, name: str, entries: RankEntries, version: int = 0
+    ) -> 'RankTable':
+        """Return a new table of the given entries."""
+        table = cls(name, version)
+        table.entries = dict(entries)
+        for entity_id, (feature_id, keys) in table.entries.items():
+            table.entity_ids_by_feature.setdefault(feature_id, set()).add(
+                entity_id
+            )
+            table._merge_keys(feature_id, keys)
+        table._ascending = sorted(
+            (low, f_id) for f_id, (low, _) in table.feature_keys.items()
+        )
+        table._descending = sorted(
+            (high, -f_id) for f_id, (_, high) in table.feature_keys.items()
+        )
+        return table
+
+    def _merge_keys(self, feature_id: int, keys: tuple[tuple, ...]) -> None:
+        """Widen the range of a feature's keys to include the given keys."""
+        if not keys:
+            return
+        low, high = min(keys), max(keys)
+        existing = self.feature_keys.get(feature_id)
+        if existing is not None:
+            low, high = min(low, existing[0]), max(high, existing[1])
+        self.feature_keys[feature_id] = (low, high)
+
+    def update(
+        self, entity_id: int, feature_id: int, values: Iterable[Any]
+    ) -> None:
+        """Replace the values of one entity, or remove it if it has none."""
+        keys = tuple(sort_key(v) for v in values)
+        with self.lock:
+            affected_ids = {feature_id}
+            old_entry = self.entries.pop(entity_id, None)
+            if old_entry is not None:
+                affected_ids.add(old_entry[0])
+                self.entity_ids_by_feature[old_entry[0]].discard(entity_id)
+            if keys:
+                self.entries[entity_id] = (feature_id, keys)
+                self.entity_ids_by_feature.setdefault(feature_id, set()).add(
+                    entity_id
+                )
+
+            for f_id in affected_ids:
+                old_range = self.feature_keys.pop(f_id, None)
+                if old_range is not None:
+                    low, high = old_range
+                    _remove_sorted(self._ascending, (low, f_id))
+                    _remove_sorted(self._descending, (high, -f_id))
+                for e_id in self.entity_ids_by_feature.get(f_id, ()):
+                    self._merge_keys(f_id, self.entries[e_id][1])
+                new_range = self.feature_keys.get(f_id)
+                if new_range is not None:
+                    low, high = new_range
+                    bisect.insort(self._ascending, (low, f_id))
+                    bisect.insort(self._descending, (high, -f_id))
+                else:
+                    self.entity_ids_by_feature.pop(f_id, None)
+            self._ranks.clear()
+
+    def iter_ids(self, descending: bool = False) -> Iterator[int]:
+        """Yield the IDs of all features in the table in sorted order.
+
+        The order is copied under the lock, so updates made by other
+        threads while the caller iterates do not affect it.
+        """
+        with self.lock:
+            sorted_keys = list(
+                self._descending if descending else self._ascending
+            )
+        if descending:
+            return (-neg_id for _, neg_id in reversed(sorted_keys))
+        return (f_id for _, f_id in sorted_keys)
+
+    def ordered_ids(self, descending: bool = False) -> list[int]:
+        """Return the IDs of all features in the table in sorted order."""
+        return list(self.iter_ids(descending))
+
+    def ranks(self, descending: bool = False) -> dict[int, int]:
+        """Return the rank of each feature in the sorted order.
+
+        Features with equal values share a rank so that another sort
+        column can break the tie.
+        """
+        ranks = self._ranks.get(descending)
+        if ranks is None:
+            with self.lock:
+                sorted_keys = (
+                    self._descending if descending else self._ascending
+                )
+                if descending:
+                    sorted_keys = sorted_keys[::-1]
+                ranks = {}
+                rank = -1
+                prev_key = None
+                for key, f_id in sorted_keys:
+                    if key != prev_key:
+                        rank += 1
+                        prev_key = key
+                    ranks[abs(f_id)] = rank
+                self._ranks[descending] = ranks
+        return ranks
+
+    def __len__(self) -> int:
+        """Return the number of features in the table."""
+        return len(self.feature_keys)
+
+    def __contains__(self, feature_id: int) -> bool:
+        """Return True if the given feature has a value in the table."""
+        return feature_id in self.feature_keys
+
+
+def _remove_sorted(sorted_list: list, item: Any) -> None:
+    """Remove an item from a sorted list, if it is present."""
+    i = bisect.bisect_left(sorted_list, item)
+    if i < len(sorted_list) and sorted_list[i] == item:
+        del sorted_list[i]
+
+
+def sort_feature_ids(
+    feature_ids: Iterable[int], columns: list[tuple[RankTable, bool]]
+) -> list[int]:
+    """Sort feature IDs by each (table, descending) column in turn.
+
+    Features that are not in a table sort after all those that are,
+    and any remaining ties are broken by feature ID.
+    """
+    rank_columns = [
+        (table.ranks(descending), len(table)) for table, descending in columns
+    ]
+    if len(rank_columns) == 1:
+        ranks, missing = rank_columns[0]
+        return sorted(
+            feature_ids, key=lambda f_id: (ranks.get(f_id, missing), f_id)
+        )
+    return sorted(
+        feature_ids,
+        key=lambda f_id: (
+            tuple(ranks.get(f_id, missing) for ranks, missing in rank_columns),
+            f_id,
+        ),
+    )
+
+
+# The tables held by this instance.  Each is kept up-to-date with the
+# latest version shared in rediscache when it is used.
+_local_tables: dict[str, RankTable] = {}
+_local_tables_lock = threading.Lock()
+
+
+def _delta_key(version: int) -> str:
+    return '%s|%d' % (RANKS_DELTA_KEY, version)
+
+
+def _snapshot_key(name: str) -> str:
+    return '%s|%s' % (RANKS_SNAPSHOT_KEY, name)
+
+
+def _get_latest_version() -> int:
+    """Return the current version, starting a new counter if needed."""
+    latest_version = rediscache.get_counter(RANKS_VERSION_KEY)
+    if latest_version is None:
+        latest_version = rediscache.incr(
+            RANKS_VERSION_KEY, random.randrange(1, MAX_INITIAL_VERSION)
+        )
+    return latest_version or 0
+
+
+def _store_snapshot(table: RankTable) -> None:
+    """Share the given table as the starting point for other instances."""
+    rediscache.set(
+        _snapshot_key(table.name),
+        {'version': table.version, 'entries': table.entries},
+        SNAPSHOT_TTL,
+    )
+    table.snapshot_version = table.version
+
+
+def _catch_up(table: RankTable, latest_version: int) -> bool:
+    """Apply newer deltas to the table.  Return False if it must be reloaded.
+
+    The table lock is held throughout so that a delta is never applied
+    twice by threads that catch up at the same time.
+    """
+    with table.lock:
+        if (
+            table.version > latest_version
+            or latest_version - table.version > MAX_RANK_DELTAS
+        ):
+            return False
+
+        versions = range(table.version + 1, latest_version + 1)
+        deltas = rediscache.get_multi([_delta_key(v) for v in versions]) or {}
+        for version in versions:
+            delta = deltas.get(_delta_key(version))
+            if delta is None:
+                # The newest delta might still be being written.
+                return version == latest_version
+            entity_id, feature_id, table_values = delta
+            if table.name in table_values:
+                table.update(entity_id, feature_id, table_values[table.name])
+            table.version = version
+        return True
+
+
+def get_rank_table(
+    name: str, load_entries: Callable[[], RankEntries]
+) -> RankTable:
+    """Return this instance's table, loading it or catching up if needed."""
+    if rediscache.redis_client is None:
+        # Without a shared cache, this instance maintains its own tables.
+        with _local_tables_lock:
+            if name not in _local_tables:
+                _local_tables[name] = RankTable.build(name, load_entries())
+            return _local_tables[name]
+
+    latest_version = _get_latest_version()
+    table = _local_tables.get(name)
+    if table is not None and _catch_up(table, latest_version):
+        return table
+
+    snapshot = rediscache.get(_snapshot_key(name))
+    if snapshot is not None:
+        table = RankTable.build(name, snapshot['entries'], snapshot['version'])
+        if _catch_up(table, latest_version):
+            with _local_tables_lock:
+                _local_tables[name] = table
+            return table
+
+    # Any deltas written while loading are applied on the next call.
+    table = RankTable.build(name, load_entries(), latest_version)
+    _store_snapshot(table)
+    with _local_tables_lock:
+        _local_tables[name] = table
+    logging.info('Built rank table %s of %r features', name, len(table))
+    return table
+
+
+def record_put(
+    entity_id: int, feature_id: int, table_values: dict[str, tuple]
+) -> None:
+    """Share the new values of an entity that was put with all instances.
+
+    An entity that no longer belongs in a table, e.g., a gate that is no
+    longer pending, should map that table to an empty tuple.
+    """
+    with _local_tables_lock:
+        tables = dict(_local_tables)
+    if rediscache.redis_client is None:
+        for name, values in table_values.items():
+            if name in tables:
+                tables[name].update(entity_id, feature_id, values)
+        return
+
+    _get_latest_version()
+    version = rediscache.incr(RANKS_VERSION_KEY) or 0
+    rediscache.set(_delta_key(version), (entity_id, feature_id, table_values))
+    for name, table in tables.items():
+        # Another thread may be catching up with this delta already.
+        with table.lock:
+            if table.version != version - 1:
+                continue
+            if name in table_values:
+                table.update(entity_id, feature_id, table_values[name])
+            table.version = version
+            if version - table.snapshot_version >= SNAPSHOT_INTERVAL:
+                _store_snapshot(table)
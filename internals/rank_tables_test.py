@@ -0,0 +1,216 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the rank tables used to sort search results."""
+
+import testing_config  # isort: split
+
+import datetime
+import threading
+from unittest import mock
+
+from internals import rank_tables
+from internals.rank_tables import sort_key
+
+
+def make_entries(values_by_id):
+    """Return rank entries for features that each have one entity."""
+    return {
+        f_id: (f_id, tuple(sort_key(v) for v in values))
+        for f_id, values in values_by_id.items()
+    }
+
+
+class RankTableTest(testing_config.CustomTestCase):
+    """Tests for ordering features within one rank table."""
+
+    def setUp(self):
+        """Set up a table with ties, nulls, and repeated values."""
+        self.table = rank_tables.RankTable.build(
+            'FeatureEntry.name',
+            make_entries(
+                {
+                    1: ['b'],
+                    2: ['a'],
+                    3: [None],
+                    4: ['b'],
+                    5: ['a', 'c'],
+                }
+            ),
+        )
+
+    def test_ordered_ids__ascending(self):
+        """Nulls sort first, then features by their lowest value and ID."""
+        self.assertEqual([3, 2, 5, 1, 4], self.table.ordered_ids())
+        self.assertEqual(
+            {3: 0, 2: 1, 5: 1, 1: 2, 4: 2}, self.table.ranks(False)
+        )
+
+    def test_ordered_ids__descending(self):
+        """Features sort by their highest value, with ties still by ID."""
+        self.assertEqual([5, 1, 4, 2, 3], self.table.ordered_ids(True))
+
+    def test_update__patches_order(self):
+        """Updating an entity moves its feature without a rebuild."""
+        self.table.ranks(False)
+        self.table.update(1, 1, ['0'])
+        self.table.update(6, 6, ['z'])
+        self.assertEqual([3, 1, 2, 5, 4, 6], self.table.ordered_ids())
+        self.assertEqual(1, self.table.ranks(False)[1])
+        self.assertEqual(2, self.table.ranks(False)[5])
+
+        # An entity with no values is removed from the table.
+        self.table.update(5, 5, [])
+        self.assertEqual([3, 1, 2, 4, 6], self.table.ordered_ids())
+        self.assertEqual(5, len(self.table))
+
+    def test_iter_ids__snapshot(self):
+        """Updates made while iterating do not change the order being read."""
+        ids = self.table.iter_ids()
+        first_id = next(ids)
+        self.table.update(6, 6, ['0'])
+        self.table.update(2, 2, [])
+        self.assertEqual([3, 2, 5, 1, 4], [first_id] + list(ids))
+        self.assertEqual([3, 6, 5, 1, 4], self.table.ordered_ids())
+
+    def test_update__joined_entities(self):
+        """A feature with several entities is ranked by all of them."""
+        table = rank_tables.RankTable('Gate.requested_on')
+        table.update(101, 1, [datetime.datetime(2024, 3, 1)])
+        table.update(102, 1, [datetime.datetime(2024, 1, 1)])
+        table.update(201, 2, [datetime.datetime(2024, 2, 1)])
+        self.assertEqual([1, 2], table.ordered_ids())
+        self.assertEqual([1, 2], table.ordered_ids(True))
+
+        # Gate 102 is no longer pending.
+        table.update(102, 1, [])
+        self.assertEqual([2, 1], table.ordered_ids())
+
+    def test_sort_feature_ids__one_column(self):
+        """Features missing from the table sort last, by ID."""
+        actual = rank_tables.sort_feature_ids(
+            [9, 4, 2, 8, 3], [(self.table, False)]
+        )
+        self.assertEqual([3, 2, 4, 8, 9], actual)
+
+    def test_sort_feature_ids__multiple_columns(self):
+        """Later columns break ties in earlier ones."""
+        category = rank_tables.RankTable.build(
+            'FeatureEntry.category',
+            make_entries({1: [2], 2: [1], 3: [2], 4: [1], 5: [1]}),
+        )
+        actual = rank_tables.sort_feature_ids(
+            [1, 2, 3, 4, 5], [(category, False), (self.table, True)]
+        )
+        self.assertEqual([5, 4, 2, 1, 3], actual)
+
+
+class SharedRankTableTest(testing_config.CustomTestCase):
+    """Tests for sharing rank tables between instances."""
+
+    def setUp(self):
+        """Start each test without any local tables."""
+        rank_tables._local_tables.clear()
+        self.loader = mock.Mock(return_value=make_entries({1: ['b'], 2: ['a']}))
+
+    def tearDown(self):
+        """Do not leave tables for other tests."""
+        rank_tables._local_tables.clear()
+
+    def test_get_rank_table__loads_once(self):
+        """A table is loaded once and then shared through a snapshot."""
+        table = rank_tables.get_rank_table('FeatureEntry.name', self.loader)
+        self.assertEqual([2, 1], table.ordered_ids())
+        self.assertIs(
+            table, rank_tables.get_rank_table('FeatureEntry.name', self.loader)
+        )
+
+        # Another instance starts from the snapshot.
+        rank_tables._local_tables.clear()
+        other = rank_tables.get_rank_table('FeatureEntry.name', self.loader)
+        self.assertIsNot(table, other)
+        self.assertEqual([2, 1], other.ordered_ids())
+        self.loader.assert_called_once()
+
+    def test_record_put__patches_all_instances(self):
+        """Deltas from a put are applied by other instances."""
+        table = rank_tables.get_rank_table('FeatureEntry.name', self.loader)
+        rank_tables.record_put(
+            3, 3, {'FeatureEntry.name': ('0',), 'FeatureEntry.category': (1,)}
+        )
+        self.assertEqual([3, 2, 1], table.ordered_ids())
+
+        # Simulate another instance that has a table from before the put.
+        rank_tables._local_tables['FeatureEntry.name'] = (
+            rank_tables.RankTable.build(
+                'FeatureEntry.name',
+                make_entries({1: ['b'], 2: ['a']}),
+                table.version - 1,
+            )
+        )
+        other = rank_tables.get_rank_table('FeatureEntry.name', self.loader)
+        self.assertEqual([3, 2, 1], other.ordered_ids())
+        self.loader.assert_called_once()
+
+    def test_record_put__other_tables(self):
+        """Deltas for other tables only advance the version."""
+        table = rank_tables.get_rank_table('FeatureEntry.name', self.loader)
+        version = table.version
+        rank_tables.record_put(7, 3, {'Gate.requested_on': (None,)})
+        self.assertEqual(version + 1, table.version)
+        self.assertEqual([2, 1], table.ordered_ids())
+
+    def test_record_put__waits_for_catch_up(self):
+        """A delta is not applied while another thread holds the table."""
+        table = rank_tables.get_rank_table('FeatureEntry.name', self.loader)
+        version = table.version
+        with table.lock:
+            thread = threading.Thread(
+                target=rank_tables.record_put,
+                args=(3, 3, {'FeatureEntry.name': ('0',)}),
+            )
+            thread.start()
+            thread.join(0.1)
+            self.assertEqual(version, table.version)
+        thread.join()
+        self.assertEqual(version + 1, table.version)
+        self.assertEqual([3, 2, 1], table.ordered_ids())
+
+    def test_record_put__concurrent(self):
+        """Threads that put and catch up at once end with every feature."""
+        # Puts are saved here before they are recorded, like in Datastore.
+        saved = {1: ['b'], 2: ['a']}
+        self.loader.side_effect = lambda: make_entries(dict(saved))
+        rank_tables.get_rank_table('FeatureEntry.name', self.loader)
+
+        def put(first_id):
+            for feature_id in range(first_id, first_id + 100, 2):
+                saved[feature_id] = ['c']
+                rank_tables.record_put(
+                    feature_id, feature_id, {'FeatureEntry.name': ('c',)}
+                )
+                rank_tables.get_rank_table('FeatureEntry.name', self.loader)
+
+        threads = [
+            threading.Thread(target=put, args=(first_id,))
+            for first_id in (100, 101)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        table = rank_tables.get_rank_table('FeatureEntry.name', self.loader)
+        self.assertEqual(rank_tables._get_latest_version(), table.version)
+        self.assertEqual([2, 1] + list(range(100, 200)), table.ordered_ids())
@@ -25,6 +25,8 @@ from typing import Optional
 
 from google.cloud import ndb  # type: ignore
 
+from internals import rank_tables, search_cache
+
 
 class OwnersFile(ndb.Model):
     """Describes the properties to store raw API_OWNERS content."""
@@ -173,6 +175,22 @@ class Vote(ndb.Model):
         """Return true if new_state is valid."""
         return new_state in cls.VOTE_VALUES
 
+    def put(self, **kwargs) -> ndb.Key:
+        """Save the vote and update search results that depend on votes."""
+        key = super(Vote, self).put(**kwargs)
+        search_cache.invalidate(search_cache.VOTES)
+        is_final = self.state in Gate.FINAL_STATES
+        rank_tables.record_put(
+            key.integer_id(),
+            self.feature_id,
+            {
+                rank_tables.table_name(Vote, Vote.set_on): (
+                    (self.set_on,) if is_final else ()
+                )
+            },
+        )
+        return key
+
     # Note: set_vote() moved to approval_defs.py
 
 
@@ -262,6 +280,22 @@ class Gate(ndb.Model):
             gates_dict[gate.gate_type].append(gate)
         return gates_dict
 
+    def put(self, **kwargs) -> ndb.Key:
+        """Save the gate and update search results that depend on gates."""
+        key = super(Gate, self).put(**kwargs)
+        search_cache.invalidate(search_cache.GATES)
+        is_pending = self.state in Gate.PENDING_STATES
+        rank_tables.record_put(
+            key.integer_id(),
+            self.feature_id,
+            {
+                rank_tables.table_name(Gate, Gate.requested_on): (
+                    (self.requested_on,) if is_pending else ()
+                )
+            },
+        )
+        return key
+
 
 class Amendment(ndb.Model):
     """Activity log entries can record changes to fields."""
@@ -21,7 +21,7 @@ import logging
 import re
 from typing import Any, Optional, Self, Union
 
-from google.cloud.ndb import Key
+from google.cloud.ndb import Key, get_multi
 from google.cloud.ndb.tasklets import Future  # for type checking only
 
 from framework import permissions, rediscache, users
@@ -31,7 +31,11 @@ from internals import (
     feature_helpers,
     fetchchannels,
     notifier,
+    rank_tables,
+    search_bitmaps,
+    search_cache,
     search_fulltext,
+    search_planner,
     search_queries,
 )
 from internals.core_models import FeatureEntry
@@ -41,6 +45,7 @@ MAX_TERMS = 6
 DEFAULT_RESULTS_PER_PAGE = 100
 MAX_RESULTS_PER_PAGE = 1000
 SEARCH_CACHE_TTL = 60 * 60  # One hour
+SEARCH_IDS_CACHE_TTL = 60 * 60  # One hour
 
 
 def process_exclude_deleted_unlisted_query() -> Future:
@@ -226,6 +231,62 @@ def parse_query_value_list(
     ]  # noqa: E501
 
 
+def resolve_relative_value(val_str: str, context: QueryContext) -> str:
+    """Return the value with a relative date or milestone made concrete.
+
+    Dates are resolved to the day, so that a query like created.when>now-7d
+    has the same ID cache key for the whole day.  The query itself still
+    runs on the exact values.
+    """
+    unquoted = val_str
+    if val_str.startswith('"') and val_str.endswith('"'):
+        unquoted = val_str[1:-1]
+    if not (
+        NOW_RELATIVE_DATE.fullmatch(unquoted)
+        or MILESTONE_RELATIVE_TO_STABLE.fullmatch(unquoted)
+    ):
+        return val_str
+
+    value = parse_query_value(val_str, context)
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, int):
+        return str(value)
+    return val_str
+
+
+def seconds_until_tomorrow(now: datetime.datetime) -> int:
+    """Return the whole seconds until the start of the day after now."""
+    tomorrow = datetime.datetime.combine(
+        now.date() + datetime.timedelta(days=1), datetime.time()
+    )
+    return max(1, int((tomorrow - now).total_seconds()))
+
+
+def resolve_relative_terms(terms: list, context: QueryContext) -> list:
+    """Return the terms with relative values replaced by concrete ones."""
+    resolved_terms = []
+    for logical_op, field_name, op_str, vals_str, textterm in terms:
+        if vals_str:
+            resolved_parts = []
+            for part in vals_str.split(','):
+                try_interval = part.split('..')
+                if len(try_interval) == 2:
+                    resolved_parts.append(
+                        '..'.join(
+                            resolve_relative_value(v, context)
+                            for v in try_interval
+                        )
+                    )
+                else:
+                    resolved_parts.append(resolve_relative_value(part, context))
+            vals_str = ','.join(resolved_parts)
+        resolved_terms.append(
+            (logical_op, field_name, op_str, vals_str, textterm)
+        )
+    return resolved_terms
+
+
 # A full-text query term consisting of a single word or quoted string.
 # The single word case cannot contain an operator.
 # We do not support any kind of escaped quotes in quoted strings.
@@ -271,6 +332,13 @@ SIMPLE_QUERY_TERMS = [
     'pending-review-by:me',
 ]
 
+# Predefined terms with results that depend on entities other than features.
+TERM_DEPENDENCIES = {
+    'pending-approval-by:me': search_cache.GATES,
+    'pending-review-by:me': search_cache.GATES,
+    'is:recently-reviewed': search_cache.VOTES,
+}
+
 
 def process_query_term(
     is_negation: bool,
@@ -389,6 +457,64 @@ def _sort_by_total_order(
     return sorted_id_list
 
 
+def plan_top_k(
+    terms: list, sort_columns: list[tuple[rank_tables.RankTable, bool]] | None
+) -> tuple[rank_tables.RankTable, bool] | None:
+    """Return the sort column to walk if sorting all results is not needed.
+
+    A query without user terms matches most features, so it is cheaper to
+    walk the precomputed order until a page of results is found than to
+    sort all of them.  Multi-column sorts still sort the whole result set.
+    """
+    if terms or sort_columns is None or len(sort_columns) != 1:
+        return None
+    return sort_columns[0]
+
+
+def _first_ids_in_order(
+    result_ids: Union[search_bitmaps.FeatureIdBitmap, set[int]],
+    table: rank_tables.RankTable,
+    descending: bool,
+    limit: int,
+) -> list[int]:
+    """Return the first result IDs in the table's order, up to limit.
+
+    This gives the same IDs as sort_feature_ids() followed by a slice.
+    """
+    first_ids: list[int] = []
+    if limit <= 0:
+        return first_ids
+    for f_id in table.iter_ids(descending):
+        if f_id in result_ids:
+            first_ids.append(f_id)
+            if len(first_ids) >= limit:
+                return first_ids
+
+    # Features that have no value in the table sort last, by ID.
+    unranked_ids = sorted(f_id for f_id in result_ids if f_id not in table)
+    first_ids.extend(unranked_ids[: limit - len(first_ids)])
+    return first_ids
+
+
+def get_access_level(user) -> str:
+    """Return the partition of the search cache that the user can share."""
+    if not user:
+        return 'no_access'
+    if permissions.is_google_or_chromium_account(
+        user
+    ) or permissions.can_admin_site(user):
+        return 'global_access'
+
+    # Regular authenticated user.
+    user_email = user.email()
+    participant_keys = feature_helpers.get_by_participant(user_email)
+    if participant_keys:
+        # They might own a confidential feature, so they get their own cache partition.
+        return user_email
+    # They don't own any features, so they share the cache with unauthenticated users.
+    return 'no_access'
+
+
 def make_cache_key(
     user_query: str,
     sort_spec: str | None,
@@ -400,24 +526,7 @@ def make_cache_key(
     name_only: bool,
 ) -> str:
     """Return a redis key string to store cached search results."""
-    user = users.get_current_user()
-    if not user:
-        access_level = 'no_access'
-    elif permissions.is_google_or_chromium_account(
-        user
-    ) or permissions.can_admin_site(user):
-        access_level = 'global_access'
-    else:
-        # Regular authenticated user.
-        user_email = user.email()
-        participant_keys = feature_helpers.get_by_participant(user_email)
-        if participant_keys:
-            # They might own a confidential feature, so they get their own cache partition.
-            access_level = user_email
-        else:
-            # They don't own any features, so they share the cache with unauthenticated users.
-            access_level = 'no_access'
-
+    access_level = get_access_level(users.get_current_user())
     return '|'.join(
         [
             FeatureEntry.SEARCH_CACHE_KEY,
@@ -434,6 +543,64 @@ def make_cache_key(
     )
 
 
+def make_id_cache_key(
+    terms: list,
+    context: QueryContext,
+    show_unlisted: bool,
+    show_deleted: bool,
+    show_enterprise: bool,
+    user,
+) -> str:
+    """Return a redis key string to store the IDs that match resolved terms.
+
+    Personalized terms put the result in a partition for the user, and
+    terms that depend on gates, votes, or stars add the generations of
+    those dependencies to the key.
+    """
+    term_strs = []
+    dependencies = set()
+    is_personalized = False
+    is_time_based = False
+    for logical_op, field_name, op_str, vals_str, textterm in terms:
+        term_strs.append(
+            logical_op + (textterm or field_name + op_str + vals_str)
+        )
+        if not is_predefined_query_term(field_name, op_str, vals_str):
+            continue
+        query_term = field_name + op_str + vals_str
+        if vals_str == 'me':
+            is_personalized = True
+        if query_term in TERM_DEPENDENCIES:
+            dependencies.add(TERM_DEPENDENCIES[query_term])
+        if query_term == 'starred-by:me' and user:
+            dependencies.add(search_cache.starred_by(user.email()))
+        if query_term == 'is:recently-reviewed':
+            is_time_based = True
+
+    parts = [
+        'q=' + ' '.join(term_strs),
+        'show_unlisted=' + str(show_unlisted),
+        'show_deleted=' + str(show_deleted),
+        'show_enterprise=' + str(show_enterprise),
+    ]
+    if is_time_based:
+        parts.append('day=' + context.now.strftime('%Y-%m-%d'))
+    if is_personalized and user:
+        parts.append('user=' + user.email())
+    else:
+        parts.append('user=' + get_access_level(user))
+    return search_cache.make_key(parts, dependencies)
+
+
+def is_time_based(user_query: str) -> bool:
+    """Return True if the results of a query can change as time passes."""
+    return (
+        'is:recently-reviewed' in user_query
+        or 'now' in user_query
+        or 'current_stable' in user_query
+    )
+
+
 def is_cacheable(user_query: str, name_only: bool):
     """Return True if this user query can be stored and viewed by other users."""
     if not name_only:
@@ -444,11 +611,7 @@ def is_cacheable(user_query: str, name_only: bool):
         logging.info('Search query not cached: personalized')
         return False
 
-    if (
-        'is:recently-reviewed' in user_query
-        or 'now' in user_query
-        or 'current_stable' in user_query
-    ):
+    if is_time_based(user_query):
         logging.info('Search query not cached: time-based')
         return False
 
@@ -497,6 +660,7 @@ def process_query_using_cache(
         num=num,
         context=context,
         name_only=name_only,
+        use_id_cache=True,
     )
 
     if is_cacheable(user_query, name_only):
@@ -516,8 +680,14 @@ def process_query(
     num=DEFAULT_RESULTS_PER_PAGE,
     context: Optional[QueryContext] = None,
     name_only=False,
+    use_id_cache=False,
 ) -> tuple[list[dict[str, Any]], int]:
-    """Parse the user's query, run it, and return a list of features."""
+    """Parse the user's query, run it, and return a list of features.
+
+    If use_id_cache is True, the IDs that match the query are cached under
+    a key with relative dates and milestones resolved to concrete values,
+    so that personalized and time-based queries can reuse them.
+    """
     if context is None:
         context = QueryContext.current()
 
@@ -553,20 +723,117 @@ def process_query(
     # 1c. Parse the sort directive.
     sort_spec = sort_spec or '-created.when'
 
-    # 2a. Create parallel queries for each term.  Each yields a future.
-    logging.info('creating parallel queries for %r', terms)
-    feature_id_future_ops = create_future_operations_from_queries(
-        terms, context
+    # 1d. Get the rank tables used to sort.  Fields that have none need
+    # a parallel query for total sort order.
+    logging.info('getting sort columns for %r', sort_spec)
+    sort_columns = search_queries.rank_table_columns(sort_spec)
+    if sort_columns is None:
+        logging.info('creating total sort order for %r', sort_spec)
+        total_order_promise = search_queries.total_order_query_async(sort_spec)
+
+    # 1e. Resolve relative values and check the cache of result IDs.
+    universe = search_bitmaps.get_universe()
+    user = users.get_current_user()
+    result_ids = None
+    if use_id_cache:
+        key_terms = resolve_relative_terms(terms, context)
+        id_cache_key = make_id_cache_key(
+            key_terms,
+            context,
+            show_unlisted,
+            show_deleted,
+            show_enterprise,
+            user,
+        )
+        id_cache_ttl = SEARCH_IDS_CACHE_TTL
+        if key_terms != terms:
+            # The key names the day, so the IDs must not outlive it.
+            id_cache_ttl = min(
+                id_cache_ttl, seconds_until_tomorrow(context.now)
+            )
+        cached_ids = rediscache.get(id_cache_key)
+        if cached_ids is not None:
+            logging.info('Found cached result IDs for %r', id_cache_key)
+            result_ids = universe.bitmap(cached_ids)
+
+    if result_ids is None:
+        result_ids = find_result_ids(
+            terms, permission_terms, context, universe, user
+        )
+        if use_id_cache:
+            logging.info('Storing result IDs in cache: %r', id_cache_key)
+            rediscache.set(id_cache_key, list(result_ids), id_cache_ttl)
+
+    total_count = len(result_ids)
+
+    # 4. Sort the IDs by their ranks in each sort column.  Or, finish
+    # getting the total sort order and sort the IDs according to their
+    # position in the complete sorted list.  When the query only has
+    # permission terms, walk the sort order and stop once the page is full.
+    top_k_column = plan_top_k(terms, sort_columns)
+    if top_k_column is not None:
+        table, descending = top_k_column
+        logging.info('taking the first %r IDs in sorted order', start + num)
+        first_ids = _first_ids_in_order(
+            result_ids, table, descending, start + num
+        )
+        paginated_id_list = first_ids[start:]
+    else:
+        logging.info('sorting')
+        if sort_columns is not None:
+            sorted_id_list = rank_tables.sort_feature_ids(
+                result_ids, sort_columns
+            )
+        else:
+            total_order_ids = _resolve_promise_to_id_list(total_order_promise)
+            sorted_id_list = _sort_by_total_order(
+                set(result_ids), total_order_ids
+            )
+        logging.info('sorted %r result IDs', len(sorted_id_list))
+
+        # 5. Paginate
+        paginated_id_list = sorted_id_list[start : start + num]
+
+    # 6. Fetch the actual issues that have those IDs in the sorted results.
+    if name_only:
+        features_on_page = feature_helpers.get_feature_names_by_ids(
+            paginated_id_list
+        )  # noqa: E501
+    else:
+        features_on_page = feature_helpers.get_by_ids(paginated_id_list)
+
+    logging.info(
+        'features_on_page is %r', [f['name'] for f in features_on_page]
     )
+    return features_on_page, total_count
+
+
+def find_result_ids(
+    terms: list,
+    permission_terms: list,
+    context: QueryContext,
+    universe: search_bitmaps.FeatureIdUniverse,
+    user,
+) -> search_bitmaps.FeatureIdBitmap:
+    """Run the user query and permission terms, and return the viewable IDs."""
+    # 2a. Plan the user query, then create parallel queries for each term
+    # except those deferred until the others have narrowed down the
+    # candidates.  Terms that have cached bitmaps in the universe need
+    # no query.
+    plan = plan_query_terms(terms, universe)
+    logging.info('creating parallel queries for %r', terms)
+    eager_step_ops = [
+        create_future_operations_from_queries([step.term], context, universe)
+        for step in plan.eager_steps
+    ]
 
     # 2b. Create parallel queries for each permission queries.
     logging.info('creating parallel queries for %r', permission_terms)
     permissions_future_ops = create_future_operations_from_queries(
-        permission_terms, context
+        permission_terms, context, universe
     )
 
     # 2c. Create a parallel query for confidential features.
-    user = users.get_current_user()
     can_view_all_confidential = user and (
         permissions.is_google_or_chromium_account(user)
         or permissions.can_admin_site(user)
@@ -575,41 +842,41 @@ def process_query(
     if not can_view_all_confidential:
         logging.info('creating parallel queries for confidential features')
         confidential_future_ops = create_future_operations_from_queries(
-            [('', 'confidential', '=', 'true', None)], context
+            [('', 'confidential', '=', 'true', None)], context, universe
         )
 
-    # 2d. Create a parallel query for total sort order.
-    logging.info('creating total sort order for %r', sort_spec)
-    total_order_promise = search_queries.total_order_query_async(sort_spec)
-
     # 3. Get the result of each future and combine them into a result ID set.
     logging.info('now waiting on futures')
 
     # 3a. Process user query: negation, AND, and OR.
-    query_clauses = process_and_operations(feature_id_future_ops)
+    query_clauses = finish_query_plan(plan, eager_step_ops, context, universe)
 
     # 3b. Process all permission ops.
-    permission_clauses = process_and_operations(permissions_future_ops)
+    permission_clauses = process_and_operations(
+        permissions_future_ops, universe
+    )
 
     # Apply permissions without unnecessarily fetching all keys
     if not query_clauses and not permission_clauses:
-        result_id_set = fetch_all_feature_ids_set()
+        result_ids = universe.all_bitmap()
     elif not query_clauses:
-        result_id_set = process_or_operations(permission_clauses)
+        result_ids = process_or_operations(permission_clauses, universe)
     elif not permission_clauses:
-        result_id_set = process_or_operations(query_clauses)
+        result_ids = process_or_operations(query_clauses, universe)
     else:
-        result_id_set = process_or_operations(query_clauses)
-        permission_ids = process_or_operations(permission_clauses)
-        result_id_set.intersection_update(permission_ids)
+        result_ids = process_or_operations(
+            query_clauses, universe
+        ) & process_or_operations(permission_clauses, universe)
 
-    logging.info('got %r result IDs with permissions', len(result_id_set))
+    logging.info('got %r result IDs with permissions', len(result_ids))
 
     # 3c. Filter out confidential features that the user cannot view.
     if not can_view_all_confidential:
-        confidential_clauses = process_and_operations(confidential_future_ops)
-        confidential_ids = process_or_operations(confidential_clauses)
-        confidential_results = result_id_set.intersection(confidential_ids)
+        confidential_clauses = process_and_operations(
+            confidential_future_ops, universe
+        )
+        confidential_ids = process_or_operations(confidential_clauses, universe)
+        confidential_results = result_ids & confidential_ids
 
         if confidential_results:
             if not user:
@@ -618,50 +885,36 @@ def process_query(
                 participant_keys = feature_helpers.get_by_participant(
                     user.email()
                 )
-                viewable_ids = {k.integer_id() for k in participant_keys}
-                unviewable_ids = confidential_results.difference(viewable_ids)
+                viewable_ids = universe.bitmap(
+                    k.integer_id() for k in participant_keys
+                )
+                unviewable_ids = confidential_results - viewable_ids
 
             if unviewable_ids:
-                result_id_set.difference_update(unviewable_ids)
+                result_ids = result_ids - unviewable_ids
                 logging.info(
                     'filtered out %r unviewable confidential features',
                     len(unviewable_ids),
                 )
 
-    total_count = len(result_id_set)
-
-    # 4. Finish getting the total sort order. Then, sort the IDs according
-    # to their position in the complete sorted list.
-    total_order_ids = _resolve_promise_to_id_list(total_order_promise)
-    logging.info('sorting')
-    sorted_id_list = _sort_by_total_order(result_id_set, total_order_ids)
-    logging.info('sorted %r result IDs', len(sorted_id_list))
-
-    # 5. Paginate
-    paginated_id_list = sorted_id_list[start : start + num]
-
-    # 6. Fetch the actual issues that have those IDs in the sorted results.
-    if name_only:
-        features_on_page = feature_helpers.get_feature_names_by_ids(
-            paginated_id_list
-        )  # noqa: E501
-    else:
-        features_on_page = feature_helpers.get_by_ids(paginated_id_list)
-
-    logging.info(
-        'features_on_page is %r', [f['name'] for f in features_on_page]
-    )
-    return features_on_page, total_count
+    return result_ids
 
 
-def create_future_operations_from_queries(terms, context: QueryContext):
+def create_future_operations_from_queries(
+    terms,
+    context: QueryContext,
+    universe: search_bitmaps.FeatureIdUniverse | None = None,
+):
     """Create parallel queries for each term. Each yields a future operation"""  # noqa: D415
     feature_id_future_ops = []
     for logical_op, field_name, op_str, vals_str, textterm in terms:
         is_negation = logical_op.strip() == '-'
         is_normal_query = False
+        query_term = field_name + op_str + vals_str
         if textterm:
             future = search_fulltext.search_fulltext(textterm)
+        elif universe and query_term in universe.term_bitmaps:
+            future = universe.term_bitmaps[query_term]
         elif is_predefined_query_term(field_name, op_str, vals_str):
             logging.info(
                 'Running predefined query term: %r %r %r',
@@ -687,19 +940,189 @@ def create_future_operations_from_queries(terms, context: QueryContext):
     return feature_id_future_ops
 
 
-def process_or_operations(or_clauses):
-    """Process OR operations for all id sets."""
+def term_strategy(
+    term: search_planner.Term, universe: search_bitmaps.FeatureIdUniverse
+) -> str:
+    """Return how the given term would be evaluated on its own."""
+    logical_op, field_name, op_str, vals_str, textterm = term
+    if textterm:
+        return search_planner.STRATEGY_FULLTEXT
+    if field_name + op_str + vals_str in universe.term_bitmaps:
+        return search_planner.STRATEGY_CACHED
+    if is_predefined_query_term(field_name, op_str, vals_str):
+        return search_planner.STRATEGY_PREDEFINED
+    if op_str == ':':
+        if field_name.lower() in search_fulltext.FULLTEXT_FIELDS:
+            return search_planner.STRATEGY_FULLTEXT
+        op_str = '='
+    if search_planner.can_check_in_memory(field_name, op_str):
+        return search_planner.STRATEGY_DEFERRED
+    return search_planner.STRATEGY_QUERY
+
+
+def plan_query_terms(
+    terms: list[search_planner.Term],
+    universe: search_bitmaps.FeatureIdUniverse,
+) -> search_planner.QueryPlan:
+    """Choose the order and strategy for evaluating the user query terms."""
+    strategies = [term_strategy(term, universe) for term in terms]
+    cached_counts = {
+        i: len(universe.term_bitmaps[field_name + op_str + vals_str])
+        for i, (_, field_name, op_str, vals_str, _) in enumerate(terms)
+        if strategies[i] == search_planner.STRATEGY_CACHED
+    }
+    return search_planner.plan_query(
+        terms, strategies, cached_counts, len(universe.all_bitmap())
+    )
+
+
+def explain_query(
+    user_query: str,
+    show_unlisted=False,
+    show_deleted=False,
+    show_enterprise=False,
+) -> dict[str, Any]:
+    """Return the plan that process_query() would use for the user query."""
+    terms = TERM_RE.findall(user_query + ' ')[:MAX_TERMS] or []
+    universe = search_bitmaps.get_universe()
+    plan = plan_query_terms(terms, universe)
+    result = plan.to_dict()
+    result['num_features'] = len(universe.all_bitmap())
+    return result
+
+
+def _record_step_count(step: search_planner.TermPlan, count: int) -> None:
+    """Keep the statistics used to estimate the cost of future queries."""
+    if step.strategy == search_planner.STRATEGY_CACHED:
+        return  # Those counts are always known exactly.
+    if step.is_recorded_count and step.estimated_count == count:
+        return
+    search_planner.record_result_count(step.term, count)
+
+
+def _check_deferred_step(
+    step: search_planner.TermPlan,
+    candidate_ids: list[int],
+    entities: list[FeatureEntry | None],
+    context: QueryContext,
+) -> list[int]:
+    """Return the candidate IDs that match a field term, without a query."""
+    logical_op, field_name, op_str, vals_str, _ = step.term
+    val_list = parse_query_value_list(vals_str, context)
+    if op_str == ':':
+        op_str = '='
+    if logical_op.strip() == '-':
+        op_str = search_queries.negate_operator(op_str)
+    if not val_list or val_list == ['']:
+        logging.warning('No values were provided when searching %r', field_name)
+        return []
+
+    # Follow the same steps as single_field_query_async().
+    field_name = field_name.lower()
+    field = search_queries.QUERIABLE_FIELDS[field_name]
+    if core_enums.is_enum_field(field_name):
+        enum_val_list = []
+        for val in val_list:
+            enum_val = core_enums.convert_enum_string_to_int(field_name, val)
+            if enum_val < 0:
+                logging.warning('Cannot find enum %r:%r', field_name, val)
+                return []
+            enum_val_list.append(enum_val)
+        val_list = enum_val_list
+    # Raise the same ValueErrors that building a query would.
+    search_queries.build_filter(field, op_str, val_list)
+
+    return [
+        f_id
+        for f_id, fe in zip(candidate_ids, entities)
+        if search_planner.matches(fe, field, op_str, val_list)
+    ]
+
+
+def finish_query_plan(
+    plan: search_planner.QueryPlan,
+    eager_step_ops: list[list[tuple[str, Any]]],
+    context: QueryContext,
+    universe: search_bitmaps.FeatureIdUniverse,
+) -> list[search_bitmaps.FeatureIdBitmap]:
+    """Combine the results of the eager steps, then run the deferred ones.
+
+    Deferred terms are checked against the candidate entities if there are
+    few enough of them, otherwise they are run as queries.
+    """
+    ops = []
+    for step, step_ops in zip(plan.eager_steps, eager_step_ops):
+        for logical_op, future in step_ops:
+            feature_ids = _to_bitmap(future, universe)
+            _record_step_count(step, len(feature_ids))
+            ops.append((logical_op, feature_ids))
+
+    deferred_steps = plan.deferred_steps
+    if not deferred_steps:
+        return process_and_operations(ops, universe)
+
+    clauses = process_and_operations(ops, universe)
+    candidates = clauses[0] if clauses else universe.all_bitmap()
+    if len(candidates) <= search_planner.IN_MEMORY_LIMIT:
+        logging.info(
+            'checking %r deferred terms against %r candidates',
+            len(deferred_steps),
+            len(candidates),
+        )
+        candidate_ids = list(candidates)
+        entities = get_multi(
+            [Key('FeatureEntry', f_id) for f_id in candidate_ids]
+        )
+        for step in deferred_steps:
+            matching_ids = _check_deferred_step(
+                step, candidate_ids, entities, context
+            )
+            candidates = candidates & universe.bitmap(matching_ids)
+        return [candidates]
+
+    logging.info('running %r deferred terms as queries', len(deferred_steps))
+    ops = [('', candidates)]
+    for step in deferred_steps:
+        for logical_op, future in create_future_operations_from_queries(
+            [step.term], context, universe
+        ):
+            feature_ids = _to_bitmap(future, universe)
+            _record_step_count(step, len(feature_ids))
+            ops.append((logical_op, feature_ids))
+    return process_and_operations(ops, universe)
+
+
+def _to_bitmap(
+    future: Union[search_bitmaps.FeatureIdBitmap, set, list, Future],
+    universe: search_bitmaps.FeatureIdUniverse,
+) -> search_bitmaps.FeatureIdBitmap:
+    """Return the feature IDs of a term's results as a bitmap."""
+    if isinstance(future, search_bitmaps.FeatureIdBitmap):
+        return future
+    elif type(future) == set:  # noqa: E721
+        return universe.bitmap(future)
+    else:
+        return universe.bitmap(_resolve_promise_to_id_list(future))
+
+
+def process_or_operations(
+    or_clauses: list[search_bitmaps.FeatureIdBitmap],
+    universe: search_bitmaps.FeatureIdUniverse,
+) -> search_bitmaps.FeatureIdBitmap:
+    """Process OR operations for all id bitmaps."""
     # If there were no conditions, all features match.
     if not or_clauses:
-        return fetch_all_feature_ids_set()
+        return universe.all_bitmap()
 
-    result_id_set = set()
-    for id_set in or_clauses:
-        result_id_set.update(id_set)
-    return result_id_set
+    result_ids = or_clauses[0]
+    for id_bitmap in or_clauses[1:]:
+        result_ids = result_ids | id_bitmap
+    return result_ids
 
 
-def process_and_operations(feature_id_future_ops):
+def process_and_operations(
+    feature_id_future_ops, universe: search_bitmaps.FeatureIdUniverse
+) -> list[search_bitmaps.FeatureIdBitmap]:
     """Process all AND operations in between OR clauses."""
     or_clauses = []
 
@@ -723,39 +1146,29 @@ def process_and_operations(feature_id_future_ops):
         # Using a boolean as a sort key: False (0) for positive, True (1) for negative.
         group.sort(key=lambda op_and_future: op_and_future[0] == '-')
 
-        current_result_set = None
+        current_result = None
         for logical_op, future in group:
-            if type(future) == set:  # noqa: E721
-                feature_ids = future
-            else:
-                feature_ids = _resolve_promise_to_id_list(future)
+            feature_ids = _to_bitmap(future, universe)
 
-            # Handle negation in-place using set difference
+            # Handle negation using bitmap difference.
             if logical_op == '-':
-                # If negation is the very first term, we MUST fetch all IDs to subtract from.
-                if current_result_set is None:
-                    current_result_set = fetch_all_feature_ids_set()
-                current_result_set.difference_update(feature_ids)
+                # If negation is the very first term, subtract from all IDs.
+                if current_result is None:
+                    current_result = universe.all_bitmap()
+                current_result = current_result - feature_ids
                 continue
 
-            if current_result_set is None:
+            if current_result is None:
                 logging.info('first term yields %d items', len(feature_ids))
-                current_result_set = set(feature_ids)
+                current_result = feature_ids
                 continue
 
             logging.info(
                 'combining result so far with %d items', len(feature_ids)
             )
-            current_result_set.intersection_update(feature_ids)
+            current_result = current_result & feature_ids
 
-        if current_result_set is not None:
-            or_clauses.append(current_result_set)
+        if current_result is not None:
+            or_clauses.append(current_result)
 
     return or_clauses
-
-
-def fetch_all_feature_ids_set():
-    """Fetch all FeatureEntry ids."""
-    all_feature_keys = FeatureEntry.query().fetch(keys_only=True)
-    feature_ids_set = set(key.integer_id() for key in all_feature_keys)
-    return feature_ids_set
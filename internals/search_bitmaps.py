@@ -0,0 +1,227 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compact bitmaps of feature IDs used to combine search results.
+
+Feature IDs are large and sparse, so each ID is mapped to a small ordinal
+in a FeatureIdUniverse and a set of features is stored as the bits of a
+Python integer.  AND, OR, and NOT then become single integer operations.
+"""
+
+import collections
+import itertools
+import logging
+import threading
+import uuid
+from typing import Iterable, Iterator, Optional
+
+from google.cloud import ndb  # type: ignore
+
+from framework import rediscache
+from internals import core_enums
+from internals.core_models import FeatureEntry
+
+UNIVERSE_CACHE_TTL = 60 * 60  # One hour
+
+# Search terms used for permissions whose results are cached with the
+# universe rather than queried on each search.
+CACHED_TERMS = {
+    'deleted_unlisted=false': [
+        FeatureEntry.deleted == False,  # noqa: E712
+        FeatureEntry.unlisted == False,  # noqa: E712
+    ],
+    'deleted_unlisted_enterprise=false': [
+        FeatureEntry.deleted == False,  # noqa: E712
+        FeatureEntry.unlisted == False,  # noqa: E712
+        FeatureEntry.feature_type <= core_enums.FEATURE_TYPE_DEPRECATION_ID,
+    ],
+    'confidential=true': [FeatureEntry.confidential == True],  # noqa: E712
+}
+
+_ZERO = b'0'
+_ONE = ord('1')
+_DIGIT_VALUES = bytes.maketrans(b'01', b'\x00\x01')
+
+
+class FeatureIdBitmap:
+    """A set of feature IDs stored as the bits of an integer."""
+
+    __slots__ = ('universe', 'bits')
+
+    def __init__(self, universe: 'FeatureIdUniverse', bits: int = 0):
+        """Initialize a bitmap of the given ordinals in the universe."""
+        self.universe = universe
+        self.bits = bits
+
+    def __and__(self, other: 'FeatureIdBitmap') -> 'FeatureIdBitmap':
+        """Return the features that are in both bitmaps."""
+        return FeatureIdBitmap(self.universe, self.bits & other.bits)
+
+    def __or__(self, other: 'FeatureIdBitmap') -> 'FeatureIdBitmap':
+        """Return the features that are in either bitmap."""
+        return FeatureIdBitmap(self.universe, self.bits | other.bits)
+
+    def __sub__(self, other: 'FeatureIdBitmap') -> 'FeatureIdBitmap':
+        """Return the features that are in this bitmap but not the other."""
+        return FeatureIdBitmap(self.universe, self.bits & ~other.bits)
+
+    def __len__(self) -> int:
+        """Return the number of features in the bitmap."""
+        return self.bits.bit_count()
+
+    def __bool__(self) -> bool:
+        """Return True if the bitmap has any features."""
+        return self.bits != 0
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate over the feature IDs in the bitmap."""
+        return iter(self.universe.to_ids(self.bits))
+
+    def __contains__(self, feature_id: int) -> bool:
+        """Return True if the given feature is in the bitmap."""
+        ordinal = self.universe.ordinals.get(feature_id)
+        return ordinal is not None and bool(self.bits >> ordinal & 1)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the bitmap."""
+        return 'FeatureIdBitmap(%r)' % sorted(self)
+
+
+class FeatureIdUniverse:
+    """A mapping between the IDs of all features and small ordinals.
+
+    It also holds bitmaps for the CACHED_TERMS, which only depend on
+    FeatureEntry fields and so are invalidated along with the universe.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        feature_ids: Iterable[int],
+        term_ids: dict[str, list[int]] | None = None,
+    ):
+        """Assign ordinals to the given IDs in sorted order."""
+        self.token = token
+        self.ids: list[int] = sorted(feature_ids)
+        self.ordinals: dict[int, int] = {
+            f_id: ordinal for ordinal, f_id in enumerate(self.ids)
+        }
+        self.all_bits = (1 << len(self.ids)) - 1
+        self._lock = threading.Lock()
+        self.term_bitmaps: dict[str, FeatureIdBitmap] = {
+            term: self.bitmap(ids) for term, ids in (term_ids or {}).items()
+        }
+
+    def _add_ordinal(self, feature_id: int) -> int:
+        """Assign an ordinal to an ID that was not in the universe."""
+        with self._lock:
+            ordinal = self.ordinals.get(feature_id)
+            if ordinal is None:
+                ordinal = len(self.ids)
+                self.ids.append(feature_id)
+                self.ordinals[feature_id] = ordinal
+            return ordinal
+
+    def bitmap(self, feature_ids: Iterable[int]) -> FeatureIdBitmap:
+        """Return a bitmap of the given feature IDs."""
+        feature_ids = list(feature_ids)
+        ordinals = list(map(self.ordinals.get, feature_ids))
+        if None in ordinals:
+            # E.g., a Gate of a feature that has since been deleted.
+            ordinals = [
+                self._add_ordinal(f_id) if ordinal is None else ordinal
+                for f_id, ordinal in zip(feature_ids, ordinals)
+            ]
+        if not ordinals:
+            return FeatureIdBitmap(self)
+
+        # Write one ASCII digit per ordinal, with the loop running in C.
+        digits = bytearray(_ZERO) * (max(ordinals) + 1)
+        collections.deque(
+            map(digits.__setitem__, ordinals, itertools.repeat(_ONE)),
+            maxlen=0,
+        )
+        digits.reverse()
+        return FeatureIdBitmap(self, int(digits, 2))
+
+    def all_bitmap(self) -> FeatureIdBitmap:
+        """Return a bitmap of every feature in the universe."""
+        return FeatureIdBitmap(self, self.all_bits)
+
+    def to_ids(self, bits: int) -> list[int]:
+        """Return the feature IDs of the bits that are set."""
+        if not bits:
+            return []
+        selectors = format(bits, 'b')[::-1].encode().translate(_DIGIT_VALUES)
+        return list(itertools.compress(self.ids, selectors))
+
+
+# The universe held by this instance, reused until FeatureEntry.put()
+# deletes the token that identifies it in rediscache.
+_local_universe: Optional[FeatureIdUniverse] = None
+
+
+def _ids_cache_key(token: str) -> str:
+    return '%s|%s' % (FeatureEntry.ALL_IDS_CACHE_KEY, token)
+
+
+def fetch_all_feature_ids() -> tuple[list[int], dict[str, list[int]]]:
+    """Fetch all FeatureEntry ids, and the ids that match each cached term."""
+    all_future = FeatureEntry.query().fetch_async(keys_only=True)
+    term_futures = {
+        term: FeatureEntry.query(ndb.AND(*filters)).fetch_async(keys_only=True)
+        for term, filters in CACHED_TERMS.items()
+    }
+    all_ids = [key.integer_id() for key in all_future.get_result()]
+    term_ids = {
+        term: [key.integer_id() for key in future.get_result()]
+        for term, future in term_futures.items()
+    }
+    return all_ids, term_ids
+
+
+def get_universe() -> FeatureIdUniverse:
+    """Return the universe of all features, using a cached copy if possible."""
+    global _local_universe
+    token = rediscache.get(FeatureEntry.ALL_IDS_CACHE_KEY)
+    if token is not None:
+        if _local_universe is not None and _local_universe.token == token:
+            return _local_universe
+        cached = rediscache.get(_ids_cache_key(token))
+        if cached is not None:
+            _local_universe = FeatureIdUniverse(token, *cached)
+            return _local_universe
+
+    # The cached terms include confidential=true, which the permission
+    # filter uses, so a universe fetched while a feature changed must not
+    # be stored for other requests.
+    version = rediscache.get_counter(FeatureEntry.ALL_IDS_VERSION_KEY)
+    all_ids, term_ids = fetch_all_feature_ids()
+    token = uuid.uuid4().hex
+    universe = FeatureIdUniverse(token, all_ids, term_ids)
+    stored = rediscache.set_multi_if_unchanged(
+        {
+            _ids_cache_key(token): (all_ids, term_ids),
+            FeatureEntry.ALL_IDS_CACHE_KEY: token,
+        },
+        FeatureEntry.ALL_IDS_VERSION_KEY,
+        version,
+        time=UNIVERSE_CACHE_TTL,
+    )
+    if stored:
+        logging.info('Cached universe of %r feature IDs', len(all_ids))
+        _local_universe = universe
+    else:
+        logging.info('A feature changed while fetching the universe')
+    return universe
@@ -0,0 +1,136 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the feature ID bitmaps used to combine search results."""
+
+import testing_config  # isort: split
+
+from unittest import mock
+
+from framework import rediscache
+from internals import search_bitmaps
+from internals.core_models import FeatureEntry
+
+
+class FeatureIdBitmapTest(testing_config.CustomTestCase):
+    """Tests for bitmap set operations."""
+
+    def setUp(self):
+        """Set up a small universe of sparse feature IDs."""
+        self.universe = search_bitmaps.FeatureIdUniverse(
+            'token', [5000, 10, 300, 7_000_000_000, 42]
+        )
+
+    def test_universe__ordinals(self):
+        """IDs are assigned ordinals in sorted order."""
+        self.assertEqual([10, 42, 300, 5000, 7_000_000_000], self.universe.ids)
+        self.assertEqual(0, self.universe.ordinals[10])
+        self.assertEqual(4, self.universe.ordinals[7_000_000_000])
+
+    def test_bitmap__round_trip(self):
+        """We can convert IDs to a bitmap and back."""
+        bitmap = self.universe.bitmap([300, 10, 7_000_000_000])
+        self.assertEqual(3, len(bitmap))
+        self.assertEqual([10, 300, 7_000_000_000], list(bitmap))
+        self.assertIn(300, bitmap)
+        self.assertNotIn(42, bitmap)
+        self.assertNotIn(999, bitmap)
+
+        self.assertFalse(self.universe.bitmap([]))
+        self.assertEqual([], list(self.universe.bitmap([])))
+
+    def test_bitmap__unknown_ids(self):
+        """IDs that are not in the universe are given new ordinals."""
+        bitmap = self.universe.bitmap([42, 999])
+        self.assertEqual([42, 999], list(bitmap))
+        # The universe of all features does not grow.
+        self.assertNotIn(999, self.universe.all_bitmap())
+
+    def test_set_operations(self):
+        """AND, OR, and NOT work like the equivalent set operations."""
+        a = self.universe.bitmap([10, 42, 300])
+        b = self.universe.bitmap([42, 300, 5000])
+        self.assertEqual([42, 300], list(a & b))
+        self.assertEqual([10, 42, 300, 5000], list(a | b))
+        self.assertEqual([10], list(a - b))
+        self.assertEqual(
+            [5000, 7_000_000_000], list(self.universe.all_bitmap() - a)
+        )
+
+    def test_term_bitmaps(self):
+        """The universe holds bitmaps for cached search terms."""
+        universe = search_bitmaps.FeatureIdUniverse(
+            'token', [1, 2, 3], {'confidential=true': [2]}
+        )
+        self.assertEqual([2], list(universe.term_bitmaps['confidential=true']))
+
+
+class GetUniverseTest(testing_config.CustomTestCase):
+    """Tests for caching the universe of all feature IDs."""
+
+    def setUp(self):
+        """Start each test without a cached universe."""
+        search_bitmaps._local_universe = None
+
+    @mock.patch('internals.search_bitmaps.fetch_all_feature_ids')
+    def test_get_universe__cached(self, mock_fetch_all):
+        """We only fetch all feature IDs once."""
+        mock_fetch_all.return_value = ([1, 2, 3], {})
+        universe = search_bitmaps.get_universe()
+        self.assertEqual([1, 2, 3], universe.ids)
+
+        self.assertIs(universe, search_bitmaps.get_universe())
+        mock_fetch_all.assert_called_once()
+
+        # Another instance can use the copy stored in rediscache.
+        search_bitmaps._local_universe = None
+        self.assertEqual([1, 2, 3], search_bitmaps.get_universe().ids)
+        mock_fetch_all.assert_called_once()
+
+    @mock.patch('internals.search_bitmaps.fetch_all_feature_ids')
+    def test_get_universe__invalidated(self, mock_fetch_all):
+        """Deleting the token forces the universe to be fetched again."""
+        mock_fetch_all.return_value = ([1, 2, 3], {})
+        search_bitmaps.get_universe()
+
+        mock_fetch_all.return_value = ([1, 2, 3, 4], {})
+        rediscache.delete(FeatureEntry.ALL_IDS_CACHE_KEY)
+        self.assertEqual([1, 2, 3, 4], search_bitmaps.get_universe().ids)
+        self.assertEqual(2, len(mock_fetch_all.mock_calls))
+
+    @mock.patch('internals.search_bitmaps.fetch_all_feature_ids')
+    def test_get_universe__put_during_fetch(self, mock_fetch_all):
+        """A universe fetched while a feature changed is not stored."""
+
+        def fetch_during_put():
+            # Simulate a FeatureEntry.put() that commits during the fetch.
+            rediscache.delete(FeatureEntry.ALL_IDS_CACHE_KEY)
+            rediscache.incr(FeatureEntry.ALL_IDS_VERSION_KEY)
+            return [1, 2, 3], {'confidential=true': []}
+
+        mock_fetch_all.side_effect = fetch_during_put
+        universe = search_bitmaps.get_universe()
+        self.assertEqual([1, 2, 3], universe.ids)
+        self.assertIsNone(rediscache.get(FeatureEntry.ALL_IDS_CACHE_KEY))
+        self.assertIsNone(search_bitmaps._local_universe)
+
+        # The next search fetches the features again and stores them.
+        mock_fetch_all.side_effect = None
+        mock_fetch_all.return_value = ([1, 2, 3], {'confidential=true': [3]})
+        universe = search_bitmaps.get_universe()
+        self.assertEqual([3], list(universe.term_bitmaps['confidential=true']))
+        self.assertEqual(
+            universe.token, rediscache.get(FeatureEntry.ALL_IDS_CACHE_KEY)
+        )
+        self.assertIs(universe, search_bitmaps._local_universe)
@@ -0,0 +1,65 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Keys of the second-tier search cache of result feature IDs.
+
+The first tier in search.process_query_using_cache() stores pages of
+rendered results, so it cannot be shared by queries that depend on the
+current user or the current time.  The second tier stores only the IDs
+that match a query, which are then sorted and paginated per request.
+
+Results that depend on Gates, Votes, or one user's FeatureStars have the
+generation numbers of those dependencies in their keys.  Saving one of
+those entities increments its generation, so older entries are never
+read again and simply expire.  Like the first tier, all entries become
+stale when a FeatureEntry is saved.
+"""
+
+from framework import rediscache
+
+# This shares the prefix whose generation FeatureEntry.put() increments.
+ID_CACHE_KEY = 'FeatureSearch|ids'
+DEPENDENCY_KEY = 'SearchDependency'
+
+# Dependencies of search results other than FeatureEntry.
+GATES = 'Gate'
+VOTES = 'Vote'
+
+
+def starred_by(email: str) -> str:
+    """Return the dependency on the FeatureStars of one user."""
+    return 'FeatureStar|' + email
+
+
+def _namespace(dependency: str) -> str:
+    return '%s|%s' % (DEPENDENCY_KEY, dependency)
+
+
+def get_generation(dependency: str) -> int:
+    """Return the current generation of a dependency."""
+    return rediscache.get_generation(_namespace(dependency))
+
+
+def invalidate(dependency: str) -> None:
+    """Make all cached results that depend on the dependency stale."""
+    rediscache.bump_generation(_namespace(dependency))
+
+
+def make_key(parts: list[str], dependencies: set[str]) -> str:
+    """Return the key of cached result IDs, including dependency generations."""
+    generations = [
+        '%s@%d' % (dependency, get_generation(dependency))
+        for dependency in sorted(dependencies)
+    ]
+    return '|'.join([ID_CACHE_KEY] + parts + generations)
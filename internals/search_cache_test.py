@@ -0,0 +1,58 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the keys of the second-tier search cache."""
+
+import testing_config  # isort: split
+
+from framework import rediscache
+from internals import search_cache
+
+
+class SearchCacheTest(testing_config.CustomTestCase):
+    """Tests for dependency generations."""
+
+    def test_get_generation__stable(self):
+        """A generation only changes when its dependency is invalidated."""
+        generation = search_cache.get_generation(search_cache.GATES)
+        self.assertGreater(generation, 0)
+        self.assertEqual(
+            generation, search_cache.get_generation(search_cache.GATES)
+        )
+
+        search_cache.invalidate(search_cache.GATES)
+        self.assertEqual(
+            generation + 1, search_cache.get_generation(search_cache.GATES)
+        )
+
+    def test_make_key(self):
+        """Keys list the generation of each dependency in a fixed order."""
+        starred = search_cache.starred_by('a@example.com')
+        key = search_cache.make_key(['q=x'], {starred, search_cache.VOTES})
+        self.assertEqual(
+            'FeatureSearch|ids|q=x|FeatureStar|a@example.com@%d|Vote@%d'
+            % (
+                search_cache.get_generation(starred),
+                search_cache.get_generation(search_cache.VOTES),
+            ),
+            key,
+        )
+
+    def test_make_key__lost_counters(self):
+        """A lost counter restarts at a new generation."""
+        key = search_cache.make_key(['q=x'], {search_cache.VOTES})
+        rediscache.flushall()
+        self.assertNotEqual(
+            key, search_cache.make_key(['q=x'], {search_cache.VOTES})
+        )
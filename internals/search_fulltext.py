@@ -15,13 +15,19 @@
 
 """Manages full-text search indexing and retrieval for FeatureEntry models."""
 
+import array
+import bisect
 import collections
 import logging
+import random
 import re
+import sys
+import threading
 from typing import Optional
 
 from google.cloud import ndb  # type: ignore
 
+from framework import cloud_tasks_helpers, rediscache
 from framework.basehandlers import FlaskHandler
 from internals.core_models import FeatureEntry
 from internals.feature_helpers import (
@@ -124,6 +130,11 @@ def get_strings(fe: FeatureEntry, field_name: str | None = None) -> list[str]:
 
 
 FULLTEXT_FIELDS = frozenset(_get_strings_dict(FeatureEntry()).keys())
+# Each fulltext field gets a stable ordinal that is encoded into word positions.
+FULLTEXT_FIELD_ORDINALS = {
+    field_name: ordinal
+    for ordinal, field_name in enumerate(_get_strings_dict(FeatureEntry()))
+}
 
 
 def parse_words(strings: list[str]) -> tuple[set[str], int]:
@@ -170,13 +181,19 @@ def index_feature(fe: FeatureEntry) -> None:
     existing_fw_list = query.fetch(None)
     updated_fw_list = batch_index_features([fe], existing_fw_list)
     updated_fw_list[0].put()
+    update_fulltext_index(feature_id, make_feature_doc(fe))
 
 
-def canonicalize_string(s: str) -> str:
-    """Return a string of lowercase words separated by single spaces."""
+def canonical_words(s: str) -> list[str]:
+    """Return the lowercase words of the given string in order, minus stop words."""
     lower_s = s.lower().replace("'", '')
     words = WORD_RE.findall(lower_s)
-    canonicalized = ' '.join(w for w in words if w not in STOP_WORDS)
+    return [w for w in words if w not in STOP_WORDS]
+
+
+def canonicalize_string(s: str) -> str:
+    """Return a string of lowercase words separated by single spaces."""
+    canonicalized = ' '.join(canonical_words(s))
     return ' ' + canonicalized + ' '  # Avoids matching partial words.
 
 
@@ -199,6 +216,396 @@ def post_process_phrase(
     return result
 
 
+# A FeatureDoc lists the canonical words of each non-empty string value
+# of a feature, tagged with the fulltext field that the value came from.
+FeatureDoc = list[tuple[str, tuple[str, ...]]]
+
+# Word positions are encoded as (field ordinal << FIELD_SHIFT) + offset so that
+# a phrase match can be limited to one field without loading the entity.
+FIELD_SHIFT = 20
+MAX_FIELD_OFFSET = (1 << FIELD_SHIFT) - 1
+
+# The rediscache keys used to share the index between instances.  The index
+# itself is stored as a versioned snapshot and each call to index_feature()
+# adds a delta for the next version number.
+INDEX_CACHE_KEY = 'FulltextIndex'
+INDEX_VERSION_KEY = INDEX_CACHE_KEY + '|version'
+INDEX_SNAPSHOT_KEY = INDEX_CACHE_KEY + '|snapshot'
+INDEX_DELTA_KEY = INDEX_CACHE_KEY + '|delta'
+# An instance that is further behind than this reloads the snapshot.
+MAX_INDEX_DELTAS = 100
+# The snapshot is rewritten after this many deltas have accumulated.
+SNAPSHOT_INTERVAL = 50
+# Rebuilding skips far ahead so that every instance discards its old index.
+REBUILD_VERSION_STEP = 1_000_000
+# A new version counter starts at a random point so that an instance never
+# mistakes an index from before the counter was lost for a current one.
+MAX_INITIAL_VERSION = 1 << 40
+# While this key is set, a rebuild task is pending and searches that find
+# no usable index read FeatureWords from Datastore instead.
+INDEX_REBUILD_PENDING_KEY = INDEX_CACHE_KEY + '|rebuild_pending'
+REBUILD_PENDING_TTL = 10 * 60  # Ten minutes
+REBUILD_TASK_PATH = '/tasks/rebuild-fulltext-index'
+
+
+def make_feature_doc(fe: FeatureEntry) -> FeatureDoc:
+    """Return the canonical words of each string in the given feature entry."""
+    doc = []
+    for field_name, strings in _get_strings_dict(fe).items():
+        for s in strings:
+            if not s:
+                continue
+            words = canonical_words(s)
+            if words:
+                doc.append((field_name, tuple(words)))
+    return doc
+
+
+def _word_positions(doc: FeatureDoc) -> dict[str, list[int]]:
+    """Return the encoded positions of each word in the given doc."""
+    positions: dict[str, list[int]] = collections.defaultdict(list)
+    next_offsets: collections.Counter = collections.Counter()
+    for field_name, words in doc:
+        base = FULLTEXT_FIELD_ORDINALS[field_name] << FIELD_SHIFT
+        offset = next_offsets[field_name]
+        for word in words:
+            if offset > MAX_FIELD_OFFSET:
+                break
+            positions[word].append(base + offset)
+            offset += 1
+        # Skip one position so that a phrase cannot span two values.
+        next_offsets[field_name] = offset + 1
+    return positions
+
+
+def _intern_doc(doc: FeatureDoc) -> FeatureDoc:
+    """Share one copy of each word string across all docs in the index."""
+    return [
+        (sys.intern(field_name), tuple(sys.intern(w) for w in words))
+        for field_name, words in doc
+    ]
+
+
+def _contains(sorted_ids: array.array, feature_id: int) -> bool:
+    """Return True if the sorted array contains the given feature ID."""
+    i = bisect.bisect_left(sorted_ids, feature_id)
+    return i < len(sorted_ids) and sorted_ids[i] == feature_id
+
+
+class _Postings:
+    """The sorted IDs of features that have one word, and its positions.
+
+    The positions of the word in feature_ids[i] are stored in
+    positions[offsets[i]:offsets[i + 1]].
+    """
+
+    __slots__ = ('feature_ids', 'offsets', 'positions')
+
+    def __init__(self):
+        """Initialize an empty postings list."""
+        self.feature_ids = array.array('q')
+        self.offsets = array.array('I', [0])
+        self.positions = array.array('I')
+
+    def get_positions(self, feature_id: int) -> array.array:
+        """Return the positions of this word in the given feature."""
+        i = bisect.bisect_left(self.feature_ids, feature_id)
+        if i == len(self.feature_ids) or self.feature_ids[i] != feature_id:
+            return array.array('I')
+        return self.positions[self.offsets[i] : self.offsets[i + 1]]
+
+    def append(self, feature_id: int, positions: list[int]) -> None:
+        """Add a feature that has a higher ID than all existing ones."""
+        self.feature_ids.append(feature_id)
+        self.positions.extend(positions)
+        self.offsets.append(len(self.positions))
+
+    def insert(self, feature_id: int, positions: list[int]) -> None:
+        """Add a feature, keeping feature_ids sorted."""
+        i = bisect.bisect_left(self.feature_ids, feature_id)
+        start = self.offsets[i]
+        self.positions[start:start] = array.array('I', positions)
+        self.feature_ids.insert(i, feature_id)
+        self.offsets.insert(i + 1, start + len(positions))
+        for j in range(i + 2, len(self.offsets)):
+            self.offsets[j] += len(positions)
+
+    def remove(self, feature_id: int) -> None:
+        """Remove a feature, if it is present."""
+        i = bisect.bisect_left(self.feature_ids, feature_id)
+        if i == len(self.feature_ids) or self.feature_ids[i] != feature_id:
+            return
+        start, end = self.offsets[i], self.offsets[i + 1]
+        del self.positions[start:end]
+        del self.feature_ids[i]
+        del self.offsets[i + 1]
+        for j in range(i + 1, len(self.offsets)):
+            self.offsets[j] -= end - start
+
+
+class FulltextIndex:
+    """An in-memory inverted index of the words in all features.
+
+    Multi-word queries are answered by intersecting sorted arrays of
+    feature IDs, and phrases are checked against positional postings,
+    so no entities need to be fetched.
+
+    The index is shared by all threads of the instance.  Updates and
+    lookups hold its lock, and so does a search that checks phrases in
+    the results of a lookup.
+    """
+
+    def __init__(self, version: int = 0):
+        """Initialize an empty index at the given version."""
+        self.version = version
+        self.snapshot_version = version
+        self.docs: dict[int, FeatureDoc] = {}
+        self.postings: dict[str, _Postings] = {}
+        self.lock = threading.RLock()
+
+    @classmethod
+    def build(
+        cls, docs: dict[int, FeatureDoc], version: int = 0
+    ) -> 'FulltextIndex':
+        """Return a new index of the given docs."""
+        index = cls(version)
+        for feature_id in sorted(docs):
+            doc = _intern_doc(docs[feature_id])
+            index.docs[feature_id] = doc
+            for word, positions in _word_positions(doc).items():
+                postings = index.postings.setdefault(word, _Postings())
+                postings.append(feature_id, positions)
+        return index
+
+    def update(self, feature_id: int, doc: FeatureDoc) -> None:
+        """Replace the words indexed for one feature."""
+        doc = _intern_doc(doc)
+        with self.lock:
+            old_doc = self.docs.get(feature_id)
+            if old_doc is not None:
+                for word in _word_positions(old_doc):
+                    postings = self.postings[word]
+                    postings.remove(feature_id)
+                    if not postings.feature_ids:
+                        del self.postings[word]
+
+            self.docs[feature_id] = doc
+            for word, positions in _word_positions(doc).items():
+                postings = self.postings.setdefault(word, _Postings())
+                postings.insert(feature_id, positions)
+
+    def lookup(self, words: set[str]) -> list[int]:
+        """Return the sorted IDs of features that have all the given words."""
+        with self.lock:
+            id_arrays = []
+            for word in words:
+                postings = self.postings.get(word)
+                if postings is None:
+                    return []
+                id_arrays.append(postings.feature_ids)
+            if not id_arrays:
+                return []
+
+            # Start with the rarest word and probe the others by bisection.
+            id_arrays.sort(key=len)
+            result = list(id_arrays[0])
+            for sorted_ids in id_arrays[1:]:
+                result = [
+                    f_id for f_id in result if _contains(sorted_ids, f_id)
+                ]
+                if not result:
+                    break
+            return result
+
+    def has_phrase(
+        self, feature_id: int, words: list[str], field_name: str | None = None
+    ) -> bool:
+        """Return True if the feature has the words consecutively.
+
+        If field_name is specified, check only within that field.
+        """
+        if not words:
+            return False
+        field_ordinal = FULLTEXT_FIELD_ORDINALS.get(field_name or '')
+        with self.lock:
+            later_positions = []
+            for word in words[1:]:
+                postings = self.postings.get(word)
+                if postings is None:
+                    return False
+                later_positions.append(set(postings.get_positions(feature_id)))
+
+            first_postings = self.postings.get(words[0])
+            if first_postings is None:
+                return False
+            first_positions = first_postings.get_positions(feature_id)
+
+        for pos in first_positions:
+            if (
+                field_ordinal is not None
+                and pos >> FIELD_SHIFT != field_ordinal
+            ):
+                continue
+            if all(
+                pos + i + 1 in positions
+                for i, positions in enumerate(later_positions)
+            ):
+                return True
+        return False
+
+
+# The index held by this instance.  It is kept up-to-date with
+# the latest version shared in rediscache.  Replacing it holds the lock.
+_local_index: Optional[FulltextIndex] = None
+_local_index_lock = threading.Lock()
+
+
+def _delta_key(version: int) -> str:
+    return '%s|%d' % (INDEX_DELTA_KEY, version)
+
+
+def _load_docs_from_datastore() -> dict[int, FeatureDoc]:
+    """Return docs for all features, reading them in pages."""
+    docs = {}
+    cursor = None
+    while True:
+        feature_entries, cursor, more = FeatureEntry.query().fetch_page(
+            100, start_cursor=cursor
+        )
+        for fe in feature_entries:
+            docs[fe.key.integer_id()] = make_feature_doc(fe)
+        if not more or not cursor:
+            break
+    return docs
+
+
+def _get_latest_version() -> int:
+    """Return the current version, starting a new counter if needed."""
+    latest_version = rediscache.get_counter(INDEX_VERSION_KEY)
+    if latest_version is None:
+        latest_version = rediscache.incr(
+            INDEX_VERSION_KEY, random.randrange(1, MAX_INITIAL_VERSION)
+        )
+    return latest_version or 0
+
+
+def _store_snapshot(index: FulltextIndex) -> None:
+    """Share the given index as the starting point for other instances."""
+    rediscache.set(
+        INDEX_SNAPSHOT_KEY, {'version': index.version, 'docs': index.docs}
+    )
+    index.snapshot_version = index.version
+
+
+def rebuild_fulltext_index(
+    docs: dict[int, FeatureDoc] | None = None,
+) -> FulltextIndex:
+    """Build a new index from scratch and share it as the latest snapshot."""
+    global _local_index
+    if docs is None:
+        docs = _load_docs_from_datastore()
+    _get_latest_version()
+    version = rediscache.incr(INDEX_VERSION_KEY, REBUILD_VERSION_STEP) or 0
+    index = FulltextIndex.build(docs, version)
+    _store_snapshot(index)
+    with _local_index_lock:
+        _local_index = index
+    logging.info('Rebuilt fulltext index of %r features', len(docs))
+    return index
+
+
+def _catch_up(index: FulltextIndex, latest_version: int) -> bool:
+    """Apply newer deltas to the index.  Return False if it must be reloaded.
+
+    The index lock is held throughout so that a delta is never applied
+    twice by threads that catch up at the same time.
+    """
+    with index.lock:
+        if (
+            index.version > latest_version
+            or latest_version - index.version > MAX_INDEX_DELTAS
+        ):
+            return False
+
+        versions = range(index.version + 1, latest_version + 1)
+        deltas = rediscache.get_multi([_delta_key(v) for v in versions]) or {}
+        for version in versions:
+            delta = deltas.get(_delta_key(version))
+            if delta is None:
+                # The newest delta might still be being written.
+                return version == latest_version
+            feature_id, doc = delta
+            index.update(feature_id, doc)
+            index.version = version
+        return True
+
+
+def _request_rebuild() -> None:
+    """Ask for the shared index to be rebuilt by a task, at most once."""
+    if rediscache.get(INDEX_REBUILD_PENDING_KEY):
+        return
+    rediscache.set(INDEX_REBUILD_PENDING_KEY, True, time=REBUILD_PENDING_TTL)
+    try:
+        cloud_tasks_helpers.enqueue_task(REBUILD_TASK_PATH, {})
+    except Exception:
+        logging.exception('Could not request a fulltext index rebuild')
+        rediscache.delete(INDEX_REBUILD_PENDING_KEY)
+
+
+def get_fulltext_index() -> Optional[FulltextIndex]:
+    """Return this instance's index, bringing it up-to-date if needed.
+
+    If neither this instance's index nor the shared snapshot can be
+    brought up-to-date, a rebuild is requested and None is returned.
+    """
+    global _local_index
+    if rediscache.redis_client is None:
+        # Without a shared cache, this instance maintains its own index.
+        with _local_index_lock:
+            if _local_index is None:
+                _local_index = FulltextIndex.build(_load_docs_from_datastore())
+            return _local_index
+
+    latest_version = rediscache.get_counter(INDEX_VERSION_KEY)
+    if latest_version is not None:
+        index = _local_index
+        if index is not None and _catch_up(index, latest_version):
+            return index
+
+        snapshot = rediscache.get(INDEX_SNAPSHOT_KEY)
+        if snapshot is not None:
+            index = FulltextIndex.build(snapshot['docs'], snapshot['version'])
+            if _catch_up(index, latest_version):
+                with _local_index_lock:
+                    _local_index = index
+                return index
+
+    _request_rebuild()
+    return None
+
+
+def update_fulltext_index(feature_id: int, doc: FeatureDoc) -> None:
+    """Share an update to the words of one feature with all instances."""
+    index = _local_index
+    if rediscache.redis_client is None:
+        if index is not None:
+            index.update(feature_id, doc)
+        return
+
+    _get_latest_version()
+    version = rediscache.incr(INDEX_VERSION_KEY) or 0
+    rediscache.set(_delta_key(version), (feature_id, doc))
+    if index is None:
+        return
+    with index.lock:
+        if index.version != version - 1:
+            return
+        index.update(feature_id, doc)
+        index.version = version
+        if version - index.snapshot_version >= SNAPSHOT_INTERVAL:
+            _store_snapshot(index)
+
+
 def search_fulltext(
     textterm: str, field_name: str | None = None
 ) -> Optional[list[int]]:
@@ -211,6 +618,26 @@ def search_fulltext(
         return None  # user is searching for stop words.
 
     logging.info('looking for words: %r', word_set)
+    index = get_fulltext_index()
+    if index is None:
+        return _search_datastore(textterm, word_set, num_words, field_name)
+
+    with index.lock:
+        feature_ids = index.lookup(word_set)
+        if num_words > 1 or field_name:
+            phrase_words = canonical_words(textterm)
+            return [
+                f_id
+                for f_id in feature_ids
+                if index.has_phrase(f_id, phrase_words, field_name=field_name)
+            ]
+    return feature_ids
+
+
+def _search_datastore(
+    textterm: str, word_set: set[str], num_words: int, field_name: str | None
+) -> list[int]:
+    """Search the FeatureWords entities while the index is being rebuilt."""
     query = FeatureWords.query()
     for search_word in word_set:
         query = query.filter(FeatureWords.words == search_word)
@@ -218,8 +645,20 @@ def search_fulltext(
     feature_ids = [proj.feature_id for proj in feature_projections]
     if num_words > 1 or field_name:
         return post_process_phrase(textterm, feature_ids, field_name=field_name)
-    else:
-        return feature_ids
+    return feature_ids
+
+
+class RebuildFulltextIndex(FlaskHandler):
+    """Task handler that rebuilds the shared fulltext index."""
+
+    IS_INTERNAL_HANDLER = True
+
+    def process_post_data(self, **kwargs):
+        """Rebuild the index from all features."""
+        self.require_task_header()
+        rebuild_fulltext_index()
+        rediscache.delete(INDEX_REBUILD_PENDING_KEY)
+        return {'message': 'Done'}
 
 
 class ReindexAllFeatures(FlaskHandler):
@@ -232,6 +671,7 @@ class ReindexAllFeatures(FlaskHandler):
         from framework.utils import chunk_list
 
         count = 0
+        docs = {}
         cursor = None
         while True:
             feature_entries, cursor, more = FeatureEntry.query().fetch_page(
@@ -241,6 +681,8 @@ class ReindexAllFeatures(FlaskHandler):
                 break
 
             feature_ids = [fe.key.integer_id() for fe in feature_entries]
+            for fe in feature_entries:
+                docs[fe.key.integer_id()] = make_feature_doc(fe)
 
             # Fetch existing FeatureWords for these features, respecting IN limit.
             futures = []
@@ -264,6 +706,7 @@ class ReindexAllFeatures(FlaskHandler):
             if not more or not cursor:
                 break
 
+        rebuild_fulltext_index(docs)
         msg = f'Added or updated {count} FeatureWords'
         logging.info(msg)
         return msg
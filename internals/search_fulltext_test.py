@@ -15,6 +15,9 @@
 
 """Tests for the full-text search indexing and retrieval module."""
 
+import threading
+from unittest import mock
+
 import flask
 
 import settings
@@ -268,11 +271,208 @@ class SearchFulltextFunctionsTest(testing_config.CustomTestCase):
         assert_found('two', field_name='cc')
         assert_not_found('two', field_name='creator')
 
-    # TODO(jrobbins): Unit test for search_fulltext.
+    def test_make_feature_doc(self):
+        """It lists the canonical words of each string, tagged by field."""
+        actual = search_fulltext.make_feature_doc(self.fe)
+        self.assertEqual(
+            [
+                ('creator', ('creator', 'example')),
+                ('updater', ('updater', 'example')),
+                ('owner', ('owner1', 'example')),
+                ('owner', ('owner2', 'example')),
+                ('name', ('feature', 'name')),
+                ('summary', ('sum',)),
+                ('browsers.chrome.flag_name', ('flag_name',)),
+            ],
+            actual,
+        )
+
+    @mock.patch('framework.cloud_tasks_helpers.enqueue_task')
+    def test_search_fulltext__words_and_phrases(self, mock_enqueue):
+        """It finds features by word or phrase using the in-memory index."""
+        fe = core_models.FeatureEntry(
+            name='Once upon a time',
+            summary='rode and strode all around',
+            category=core_enums.NETWORKING,
+        )
+        fe.put()
+        fe_id = fe.key.integer_id()
+        search_fulltext.index_feature(fe)
+
+        self.assertEqual([fe_id], search_fulltext.search_fulltext('strode'))
+        self.assertEqual(
+            [fe_id], search_fulltext.search_fulltext('once upon a time')
+        )
+        self.assertEqual([], search_fulltext.search_fulltext('upon once'))
+        self.assertEqual(
+            [fe_id],
+            search_fulltext.search_fulltext('around', field_name='summary'),
+        )
+        self.assertEqual(
+            [], search_fulltext.search_fulltext('around', field_name='name')
+        )
+        self.assertIsNone(search_fulltext.search_fulltext('the'))
+
+    @mock.patch('framework.cloud_tasks_helpers.enqueue_task')
+    def test_search_fulltext__sees_updates(self, mock_enqueue):
+        """After reindexing a feature, searches see its new words."""
+        fe = core_models.FeatureEntry(
+            name='first name', summary='sum', category=core_enums.NETWORKING
+        )
+        fe.put()
+        fe_id = fe.key.integer_id()
+        search_fulltext.index_feature(fe)
+        self.assertEqual([fe_id], search_fulltext.search_fulltext('first'))
+
+        fe.name = 'second name'
+        fe.put()
+        search_fulltext.index_feature(fe)
+        self.assertEqual([], search_fulltext.search_fulltext('first'))
+        self.assertEqual([fe_id], search_fulltext.search_fulltext('second'))
+
+    def test_get_fulltext_index__catches_up_from_deltas(self):
+        """An instance applies deltas written by other instances."""
+        index = search_fulltext.rebuild_fulltext_index({})
+        other_doc = search_fulltext.make_feature_doc(self.fe)
+        # Simulate another instance indexing a feature.
+        search_fulltext._local_index = None
+        search_fulltext.update_fulltext_index(123, other_doc)
+        search_fulltext._local_index = index
+
+        actual = search_fulltext.get_fulltext_index()
+        self.assertIs(index, actual)
+        self.assertEqual([123], actual.lookup({'flag_name'}))
+
+    def test_get_fulltext_index__reloads_snapshot(self):
+        """An instance without an index loads the shared snapshot."""
+        doc = search_fulltext.make_feature_doc(self.fe)
+        search_fulltext.rebuild_fulltext_index({123: doc})
+        search_fulltext._local_index = None
+
+        actual = search_fulltext.get_fulltext_index()
+        self.assertEqual([123], actual.lookup({'flag_name'}))
+
+    @mock.patch('framework.cloud_tasks_helpers.enqueue_task')
+    def test_get_fulltext_index__requests_rebuild(self, mock_enqueue):
+        """Without a usable index, a rebuild task is requested once."""
+        search_fulltext._local_index = None
+        self.assertIsNone(search_fulltext.get_fulltext_index())
+        self.assertIsNone(search_fulltext.get_fulltext_index())
+        mock_enqueue.assert_called_once_with(
+            search_fulltext.REBUILD_TASK_PATH, {}
+        )
+
+    @mock.patch('random.randrange')
+    def test_rebuild_fulltext_index__random_start(self, mock_randrange):
+        """A lost version counter restarts at a random version."""
+        mock_randrange.return_value = 4242
+        index = search_fulltext.rebuild_fulltext_index({})
+        self.assertEqual(
+            4242 + search_fulltext.REBUILD_VERSION_STEP, index.version
+        )
 
     # TODO(jrobbins): Unit test for ReindexAllFeatures.
 
 
+class FulltextIndexTest(testing_config.CustomTestCase):
+    """Tests for the in-memory inverted index."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.fe_1 = core_models.FeatureEntry(
+            creator_email='creator@example.com',
+            name='Once upon a time',
+            summary='rode and strode all around',
+            motivation='lived happily ever after.',
+            category=core_enums.NETWORKING,
+            cc_emails=['one@example.com', 'two@example.com'],
+        )
+        self.fe_2 = core_models.FeatureEntry(
+            name='time upon once',
+            summary='lived',
+            category=core_enums.NETWORKING,
+        )
+        self.index = search_fulltext.FulltextIndex.build(
+            {
+                1: search_fulltext.make_feature_doc(self.fe_1),
+                2: search_fulltext.make_feature_doc(self.fe_2),
+            },
+            version=7,
+        )
+
+    def find_phrase(self, phrase, field_name=None):
+        """Return IDs of features that have the phrase."""
+        word_set, _ = search_fulltext.parse_words([phrase])
+        words = search_fulltext.canonical_words(phrase)
+        return [
+            f_id
+            for f_id in self.index.lookup(word_set)
+            if self.index.has_phrase(f_id, words, field_name=field_name)
+        ]
+
+    def test_build(self):
+        """A new index has the given version and sorted postings."""
+        self.assertEqual(7, self.index.version)
+        self.assertEqual([1, 2], self.index.lookup({'time'}))
+        self.assertEqual([1, 2], self.index.lookup({'once', 'lived'}))
+        self.assertEqual([1], self.index.lookup({'once', 'happily'}))
+        self.assertEqual([], self.index.lookup({'once', 'junk'}))
+        self.assertEqual([], self.index.lookup(set()))
+
+    def test_has_phrase(self):
+        """Phrases are matched using word positions."""
+        self.assertEqual([1], self.find_phrase('once upon a time'))
+        self.assertEqual([2], self.find_phrase('upon once'))
+        self.assertEqual([1], self.find_phrase('strode all-around'))
+        self.assertEqual([1], self.find_phrase('two@example.com'))
+        self.assertEqual([], self.find_phrase('once time'))
+
+        # A single phrase cannot span fields or values of multi-valued fields
+        self.assertEqual([], self.find_phrase('time rode'))
+        self.assertEqual([], self.find_phrase('one example com two example'))
+
+    def test_has_phrase__field(self):
+        """If a field is specified, it only matches words in that field."""
+        self.assertEqual([1, 2], self.find_phrase('lived'))
+        self.assertEqual([1], self.find_phrase('lived', 'motivation'))
+        self.assertEqual([2], self.find_phrase('lived', 'summary'))
+        self.assertEqual([1], self.find_phrase('two', 'cc'))
+        self.assertEqual([], self.find_phrase('two', 'creator'))
+
+    def test_update(self):
+        """Updating a feature replaces its old words and positions."""
+        self.index.update(1, search_fulltext.make_feature_doc(self.fe_2))
+        self.assertEqual([], self.find_phrase('lived happily'))
+        self.assertEqual([1, 2], self.find_phrase('upon once'))
+        self.assertNotIn('happily', self.index.postings)
+
+        self.index.update(3, search_fulltext.make_feature_doc(self.fe_1))
+        self.assertEqual([3], self.find_phrase('lived happily'))
+        self.assertEqual([1, 2, 3], self.index.lookup({'time'}))
+
+    def test_update__concurrent(self):
+        """Threads can update and search the index at the same time."""
+        doc = search_fulltext.make_feature_doc(self.fe_1)
+
+        def update(first_id):
+            for feature_id in range(first_id, first_id + 200, 2):
+                self.index.update(feature_id, doc)
+                self.index.lookup({'time', 'once'})
+
+        threads = [
+            threading.Thread(target=update, args=(first_id,))
+            for first_id in (100, 101)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        expected = [1, 2] + list(range(100, 300))
+        self.assertEqual(expected, self.index.lookup({'time'}))
+        self.assertEqual(expected[:1] + expected[2:], self.find_phrase('ever'))
+
+
 class FindStopWordsTest(testing_config.CustomTestCase):
     """Tests for finding stop words in the search corpus."""
 
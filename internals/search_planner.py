@@ -0,0 +1,303 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cost-based planning of the terms of a search query.
+
+Each term is given an estimated number of matching features from
+statistics that are recorded whenever a term runs.  The planner orders
+terms from most to least selective.  When the most selective term is
+expected to leave only a few candidates, simple field terms are deferred
+and then checked against the candidate entities in memory, which saves
+one Datastore query for each of them.
+"""
+
+import dataclasses
+import logging
+from typing import Any, Optional
+
+from google.cloud import ndb  # type: ignore
+
+from framework import rediscache
+from internals import rank_tables, search_queries
+from internals.core_models import FeatureEntry
+
+# A parsed query term: (logical_op, field_name, op_str, vals_str, textterm).
+Term = tuple[str, str, str, str, str]
+
+# How a term is evaluated.
+STRATEGY_CACHED = 'cached'  # A bitmap kept in the search_bitmaps universe.
+STRATEGY_FULLTEXT = 'fulltext'  # A lookup in the in-memory fulltext index.
+STRATEGY_PREDEFINED = 'predefined'  # A special query, e.g., owner:me.
+STRATEGY_QUERY = 'query'  # A Datastore query.
+# A Datastore query, unless the other terms leave few enough candidates to
+# check in memory.
+STRATEGY_DEFERRED = 'deferred'
+
+# Deferred terms are checked in memory if there are at most this many
+# candidates, which are fetched in one batch.
+IN_MEMORY_LIMIT = 100
+
+# Relative costs, in units of one Datastore round trip.
+QUERY_COST = 1.0
+PER_RESULT_COST = 0.001  # Reading one key and adding it to a bitmap.
+IN_MEMORY_COST = 0.002  # Fetching and checking one candidate entity.
+
+# Operators that can be checked against an entity's values in memory.
+IN_MEMORY_OPERATORS = frozenset(['=', '<', '<=', '>', '>=', '!='])
+
+# The rediscache keys of the statistics used for estimates.
+TERM_STATS_KEY = 'SearchTermStats'
+FIELD_STATS_KEY = 'SearchFieldStats'
+STATS_TTL = 7 * 24 * 60 * 60  # One week
+
+
+@dataclasses.dataclass
+class TermPlan:
+    """How one term will be evaluated and what that is expected to cost."""
+
+    term: Term
+    strategy: str
+    estimated_count: int
+    estimated_cost: float = 0.0
+    # True if the estimate is the term's exact count when it last ran.
+    is_recorded_count: bool = False
+
+    @property
+    def is_subtracted(self) -> bool:
+        """Return True if the term's results are removed from the others.
+
+        Negated field terms instead run a query with the negated operator.
+        """
+        return self.term[0].strip() == '-' and self.strategy not in (
+            STRATEGY_QUERY,
+            STRATEGY_DEFERRED,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly description for explaining the plan."""
+        logical_op, field_name, op_str, vals_str, textterm = self.term
+        term_str = textterm or field_name + op_str + vals_str
+        return {
+            'term': (logical_op.strip() + ' ' + term_str).strip(),
+            'strategy': self.strategy,
+            'estimated_count': self.estimated_count,
+            'estimated_cost': round(self.estimated_cost, 3),
+        }
+
+
+@dataclasses.dataclass
+class QueryPlan:
+    """The terms of a query in the order that they are evaluated."""
+
+    steps: list[TermPlan]
+
+    @property
+    def deferred_steps(self) -> list[TermPlan]:
+        """Return the steps that wait for the candidates of the others."""
+        return [s for s in self.steps if s.strategy == STRATEGY_DEFERRED]
+
+    @property
+    def eager_steps(self) -> list[TermPlan]:
+        """Return the steps that start right away, in parallel."""
+        return [s for s in self.steps if s.strategy != STRATEGY_DEFERRED]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly description for explaining the plan."""
+        return {
+            'steps': [step.to_dict() for step in self.steps],
+            'estimated_cost': round(
+                sum(step.estimated_cost for step in self.steps), 3
+            ),
+            'in_memory_limit': IN_MEMORY_LIMIT,
+        }
+
+
+def term_stats_key(term: Term) -> str:
+    """Return the key of the recorded result count of a term."""
+    logical_op, field_name, op_str, vals_str, textterm = term
+    negation = '-' if logical_op.strip() == '-' else ''
+    if textterm:
+        term_str = 'text:' + textterm.lower()
+    else:
+        term_str = field_name.lower() + op_str + vals_str
+    return '%s|%s%s' % (TERM_STATS_KEY, negation, term_str)
+
+
+def field_stats_key(term: Term) -> str:
+    """Return the key of the recorded result counts of a term's field."""
+    logical_op, field_name, op_str, vals_str, textterm = term
+    return '%s|%s' % (FIELD_STATS_KEY, 'text' if textterm else field_name)
+
+
+def load_stats(terms: list[Term]) -> dict[str, Any]:
+    """Return the recorded statistics for the given terms."""
+    keys = [term_stats_key(t) for t in terms] + [
+        field_stats_key(t) for t in terms
+    ]
+    stats = rediscache.get_multi(keys) or {}
+    return {key: value for key, value in stats.items() if value is not None}
+
+
+def record_result_count(term: Term, count: int) -> None:
+    """Update the statistics with the number of features a term matched."""
+    total, num_terms = rediscache.get(field_stats_key(term)) or (0, 0)
+    rediscache.set_multi(
+        {
+            term_stats_key(term): count,
+            field_stats_key(term): (total + count, num_terms + 1),
+        },
+        STATS_TTL,
+    )
+
+
+def estimate_count(
+    term: Term, strategy: str, num_features: int, stats: dict[str, Any]
+) -> int:
+    """Estimate the number of features that a never-seen term will match."""
+    field_stats = stats.get(field_stats_key(term))
+    if field_stats:
+        total, num_terms = field_stats
+        return total // num_terms
+
+    op_str = term[2]
+    if strategy == STRATEGY_FULLTEXT:
+        return num_features // 100
+    if op_str in ('=', ':') or strategy == STRATEGY_PREDEFINED:
+        return num_features // 10
+    return num_features // 2
+
+
+def plan_query(
+    terms: list[Term],
+    strategies: list[str],
+    cached_counts: dict[int, int],
+    num_features: int,
+) -> QueryPlan:
+    """Choose the order and strategy of each term.
+
+    Args:
+      terms: The parsed terms of the user query.
+      strategies: How each term would be evaluated on its own, where
+        STRATEGY_DEFERRED marks terms that can also be checked in memory.
+      cached_counts: The exact counts of terms that have cached bitmaps,
+        by index.
+      num_features: The total number of features.
+    """
+    stats = load_stats(terms)
+    steps = []
+    for i, (term, strategy) in enumerate(zip(terms, strategies)):
+        if i in cached_counts:
+            steps.append(TermPlan(term, strategy, cached_counts[i]))
+        elif term_stats_key(term) in stats:
+            count = stats[term_stats_key(term)]
+            steps.append(
+                TermPlan(term, strategy, count, is_recorded_count=True)
+            )
+        else:
+            count = estimate_count(term, strategy, num_features, stats)
+            steps.append(TermPlan(term, strategy, count))
+
+    # Only a conjunction of terms can be narrowed down by one of them.
+    # The terms of a disjunction keep their order, which groups them.
+    is_conjunction = not any(step.term[0].strip() == 'OR' for step in steps)
+    driver = None
+    positive_steps = [s for s in steps if not s.is_subtracted]
+    if is_conjunction and positive_steps:
+        driver = min(positive_steps, key=lambda s: s.estimated_count)
+        if driver.estimated_count > IN_MEMORY_LIMIT:
+            driver = None
+
+    for step in steps:
+        query_cost = QUERY_COST + step.estimated_count * PER_RESULT_COST
+        if step.strategy == STRATEGY_DEFERRED and driver is not None:
+            if step is driver:
+                step.strategy = STRATEGY_QUERY
+                step.estimated_cost = query_cost
+            else:
+                in_memory_cost = driver.estimated_count * IN_MEMORY_COST
+                step.estimated_cost = min(query_cost, in_memory_cost)
+        elif step.strategy in (STRATEGY_CACHED, STRATEGY_FULLTEXT):
+            step.estimated_cost = step.estimated_count * PER_RESULT_COST
+        else:
+            if step.strategy == STRATEGY_DEFERRED:
+                step.strategy = STRATEGY_QUERY
+            step.estimated_cost = query_cost
+
+    if is_conjunction:
+        # Deferred terms run last, and each group starts most selective first.
+        steps.sort(
+            key=lambda s: (s.strategy == STRATEGY_DEFERRED, s.estimated_count)
+        )
+    logging.info('query plan: %r', [step.to_dict() for step in steps])
+    return QueryPlan(steps)
+
+
+def _matches_value(
+    key: tuple,
+    op_str: str,
+    val_list: list[search_queries.QueryValue | search_queries.Interval],
+) -> bool:
+    """Return True if one sort key satisfies the operator and values."""
+    if op_str == '=':
+        for val in val_list:
+            if isinstance(val, search_queries.Interval):
+                low = rank_tables.sort_key(val.low)
+                high = rank_tables.sort_key(val.high)
+                if low <= key <= high:
+                    return True
+            elif key == rank_tables.sort_key(val):
+                return True
+        return False
+
+    val_key = rank_tables.sort_key(val_list[0])
+    if op_str == '<':
+        return key < val_key
+    if op_str == '<=':
+        return key <= val_key
+    if op_str == '>':
+        return key > val_key
+    if op_str == '>=':
+        return key >= val_key
+    if op_str == '!=':
+        return key != val_key
+    raise ValueError('Unexpected query operator: %r' % op_str)
+
+
+def matches(
+    fe: Optional[FeatureEntry],
+    field: ndb.Property,
+    op_str: str,
+    val_list: list[search_queries.QueryValue | search_queries.Interval],
+) -> bool:
+    """Return True if the feature would be returned by a query on the field.
+
+    Like Datastore, nulls come before all other values and an entity
+    with a repeated property matches if any of its values match.
+    """
+    if fe is None:
+        return False
+    value = field._get_value(fe)
+    values = value if field._repeated else [value]
+    return any(
+        _matches_value(rank_tables.sort_key(v), op_str, val_list)
+        for v in values
+    )
+
+
+def can_check_in_memory(field_name: str, op_str: str) -> bool:
+    """Return True if a term on the field can be checked against entities."""
+    field = search_queries.QUERIABLE_FIELDS.get(field_name.lower())
+    return (
+        field is not None and field._indexed and op_str in IN_MEMORY_OPERATORS
+    )
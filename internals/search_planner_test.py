@@ -0,0 +1,181 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License")
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the cost-based planning of search query terms."""
+
+import testing_config  # isort: split
+
+import datetime
+
+from internals import search_planner
+from internals.core_models import FeatureEntry
+from internals.search_queries import Interval
+
+CATEGORY_TERM = ('', 'category', '=', 'Security', '')
+NAME_TERM = ('', 'name', '=', 'thing', '')
+TEXT_TERM = ('', '', '', '', 'canvas')
+NEGATED_TERM = ('-', 'owner', ':', 'me', '')
+OR_TERM = ('OR ', 'name', '=', 'other', '')
+
+
+class PlanQueryTest(testing_config.CustomTestCase):
+    """Tests for choosing the order and strategy of terms."""
+
+    def test_plan_query__defaults(self):
+        """Without statistics, every term runs in parallel."""
+        plan = search_planner.plan_query(
+            [CATEGORY_TERM, TEXT_TERM],
+            [
+                search_planner.STRATEGY_DEFERRED,
+                search_planner.STRATEGY_FULLTEXT,
+            ],
+            {},
+            100000,
+        )
+        self.assertEqual(
+            [TEXT_TERM, CATEGORY_TERM], [s.term for s in plan.steps]
+        )
+        self.assertEqual([1000, 10000], [s.estimated_count for s in plan.steps])
+        self.assertEqual([], plan.deferred_steps)
+        self.assertEqual(search_planner.STRATEGY_QUERY, plan.steps[1].strategy)
+
+    def test_plan_query__deferred(self):
+        """A selective term lets the others be checked in memory."""
+        search_planner.record_result_count(NAME_TERM, 3)
+        search_planner.record_result_count(CATEGORY_TERM, 2000)
+        plan = search_planner.plan_query(
+            [CATEGORY_TERM, NAME_TERM, NEGATED_TERM],
+            [
+                search_planner.STRATEGY_DEFERRED,
+                search_planner.STRATEGY_DEFERRED,
+                search_planner.STRATEGY_PREDEFINED,
+            ],
+            {},
+            10000,
+        )
+        self.assertEqual(
+            [NAME_TERM, NEGATED_TERM], [s.term for s in plan.eager_steps]
+        )
+        self.assertEqual([CATEGORY_TERM], [s.term for s in plan.deferred_steps])
+        self.assertTrue(plan.steps[0].is_recorded_count)
+        # Checking 3 candidates costs less than another query.
+        self.assertLess(plan.deferred_steps[0].estimated_cost, 1.0)
+
+        explained = plan.to_dict()
+        self.assertEqual(
+            ['name=thing', '- owner:me', 'category=Security'],
+            [step['term'] for step in explained['steps']],
+        )
+
+    def test_plan_query__disjunction(self):
+        """Terms joined by OR keep their order and are never deferred."""
+        search_planner.record_result_count(NAME_TERM, 3)
+        plan = search_planner.plan_query(
+            [CATEGORY_TERM, OR_TERM, NAME_TERM],
+            [search_planner.STRATEGY_DEFERRED] * 3,
+            {},
+            10000,
+        )
+        self.assertEqual(
+            [CATEGORY_TERM, OR_TERM, NAME_TERM], [s.term for s in plan.steps]
+        )
+        self.assertEqual([], plan.deferred_steps)
+
+    def test_plan_query__cached(self):
+        """Terms with cached bitmaps have exact counts and cost no query."""
+        plan = search_planner.plan_query(
+            [CATEGORY_TERM], [search_planner.STRATEGY_CACHED], {0: 7}, 10000
+        )
+        self.assertEqual(7, plan.steps[0].estimated_count)
+        self.assertLess(plan.steps[0].estimated_cost, 1.0)
+
+    def test_estimate_count__field_stats(self):
+        """Unseen terms are estimated from other terms on the same field."""
+        search_planner.record_result_count(CATEGORY_TERM, 10)
+        search_planner.record_result_count(('', 'category', '=', 'CSS', ''), 30)
+        stats = search_planner.load_stats([('', 'category', '=', 'DOM', '')])
+        self.assertEqual(
+            20,
+            search_planner.estimate_count(
+                ('', 'category', '=', 'DOM', ''),
+                search_planner.STRATEGY_DEFERRED,
+                10000,
+                stats,
+            ),
+        )
+
+
+class MatchesTest(testing_config.CustomTestCase):
+    """Tests for checking field terms against entities in memory."""
+
+    def setUp(self):
+        """Set up an unsaved feature entry."""
+        self.fe = FeatureEntry(
+            name='feature a',
+            summary='sum',
+            category=1,
+            owner_emails=['a@example.com', 'b@example.com'],
+            accurate_as_of=None,
+        )
+
+    def test_matches__equality(self):
+        """Equality matches any value of a repeated property."""
+        owners = FeatureEntry.owner_emails
+        self.assertTrue(
+            search_planner.matches(self.fe, owners, '=', ['b@example.com'])
+        )
+        self.assertTrue(
+            search_planner.matches(
+                self.fe, owners, '=', ['c@example.com', 'a@example.com']
+            )
+        )
+        self.assertFalse(
+            search_planner.matches(self.fe, owners, '=', ['c@example.com'])
+        )
+        self.assertFalse(
+            search_planner.matches(None, owners, '=', ['a@example.com'])
+        )
+
+    def test_matches__inequality(self):
+        """Nulls sort before all other values, like in Datastore."""
+        accurate = FeatureEntry.accurate_as_of
+        jan_1 = datetime.datetime(2024, 1, 1)
+        self.assertTrue(search_planner.matches(self.fe, accurate, '<', [jan_1]))
+        self.assertFalse(
+            search_planner.matches(self.fe, accurate, '>=', [jan_1])
+        )
+        self.assertTrue(
+            search_planner.matches(self.fe, FeatureEntry.category, '!=', [2])
+        )
+
+    def test_matches__interval(self):
+        """An interval matches values between its ends, inclusive."""
+        self.fe.accurate_as_of = datetime.datetime(2024, 3, 1)
+        interval = Interval(
+            datetime.datetime(2024, 1, 1), datetime.datetime(2024, 3, 1)
+        )
+        self.assertTrue(
+            search_planner.matches(
+                self.fe, FeatureEntry.accurate_as_of, '=', [interval]
+            )
+        )
+
+    def test_can_check_in_memory(self):
+        """Only terms on indexed FeatureEntry fields are checked in memory."""
+        self.assertTrue(search_planner.can_check_in_memory('category', '='))
+        self.assertTrue(search_planner.can_check_in_memory('Name', '<'))
+        self.assertFalse(search_planner.can_check_in_memory('summary', '='))
+        self.assertFalse(
+            search_planner.can_check_in_memory('browsers.chrome.desktop', '=')
+        )
@@ -25,7 +25,7 @@ from google.cloud.ndb.query import FilterNode  # for type checking only
 from google.cloud.ndb.tasklets import Future  # for type checking only
 
 from framework import users
-from internals import core_enums
+from internals import core_enums, rank_tables
 from internals.core_models import FeatureEntry, Stage
 from internals.review_models import Gate, Vote
 from internals.search_fulltext import FULLTEXT_FIELDS, search_fulltext
@@ -207,8 +207,11 @@ def handle_can_edit_me_query_async() -> list[int] | Future:
 
 
 def total_order_query_async(sort_spec: str) -> list[int] | Future:
-    """Create a query promise for all FeatureEntry IDs sorted by sort_spec."""
-    # TODO(jrobbins): Support multi-column sort.
+    """Create a query promise for all FeatureEntry IDs sorted by sort_spec.
+
+    This is only needed for fields that have no rank table, see
+    rank_table_columns() for multi-column sorting.
+    """
     descending = False
     if sort_spec.startswith('-'):
         descending = True
@@ -419,6 +422,100 @@ SORTABLE_FIELDS.update(
 )
 
 
+def _feature_rank_loader(
+    prop: Property,
+) -> Callable[[], rank_tables.RankEntries]:
+    """Return a function that loads the values of prop for all features."""
+
+    def load_entries() -> rank_tables.RankEntries:
+        # A projection yields one result for each value of a repeated
+        # property, and none for features that have no values.
+        projections = FeatureEntry.query().fetch(projection=[prop._name])
+        keys_by_id: dict[int, list[tuple]] = {}
+        for proj in projections:
+            value = getattr(proj, prop._code_name)
+            values = value if isinstance(value, list) else [value]
+            keys_by_id.setdefault(proj.key.integer_id(), []).extend(
+                rank_tables.sort_key(v) for v in values
+            )
+        return {f_id: (f_id, tuple(keys)) for f_id, keys in keys_by_id.items()}
+
+    return load_entries
+
+
+def load_pending_gate_ranks() -> rank_tables.RankEntries:
+    """Return the request dates of all pending gates."""
+    gates = Gate.query(Gate.state.IN(Gate.PENDING_STATES)).fetch()
+    return {
+        gate.key.integer_id(): (
+            gate.feature_id,
+            (rank_tables.sort_key(gate.requested_on),),
+        )
+        for gate in gates
+    }
+
+
+def load_final_vote_ranks() -> rank_tables.RankEntries:
+    """Return the dates of all votes that resolved a review."""
+    votes = Vote.query(Vote.state.IN(Gate.FINAL_STATES)).fetch()
+    return {
+        vote.key.integer_id(): (
+            vote.feature_id,
+            (rank_tables.sort_key(vote.set_on),),
+        )
+        for vote in votes
+    }
+
+
+# The name and loader of the rank table for each sortable field.  Fields
+# of unindexed properties can only be sorted by total_order_query_async().
+RANK_TABLES: dict[str, tuple[str, Callable[[], rank_tables.RankEntries]]] = {
+    field_name: (
+        rank_tables.table_name(FeatureEntry, prop),
+        _feature_rank_loader(prop),
+    )
+    for field_name, prop in QUERIABLE_FIELDS.items()
+    if prop._indexed
+}
+RANK_TABLES.update(
+    {
+        'gate.requested_on': (
+            rank_tables.table_name(Gate, Gate.requested_on),
+            load_pending_gate_ranks,
+        ),
+        'gate.reviewed_on': (
+            rank_tables.table_name(Vote, Vote.set_on),
+            load_final_vote_ranks,
+        ),
+    }
+)
+
+
+def rank_table_columns(
+    sort_spec: str,
+) -> Optional[list[tuple[rank_tables.RankTable, bool]]]:
+    """Return the rank table and direction of each column in sort_spec.
+
+    Columns are separated by commas and a leading '-' means descending,
+    e.g., 'category,-created.when'.  Return None if a column can only be
+    sorted by total_order_query_async().
+    """
+    columns = []
+    for column_spec in sort_spec.split(','):
+        column_spec = column_spec.strip()
+        descending = column_spec.startswith('-')
+        field_name = column_spec.lstrip('-').lower()
+        if field_name not in SORTABLE_FIELDS:
+            logging.info('Ignoring sort field name %r', column_spec)
+            continue
+        if field_name not in RANK_TABLES:
+            return None
+        name, load_entries = RANK_TABLES[field_name]
+        table = rank_tables.get_rank_table(name, load_entries)
+        columns.append((table, descending))
+    return columns
+
+
 def query_any_start_milestone(
     operator: str,
     val_list: list[QueryValue | Interval[QueryValue]],
@@ -18,7 +18,13 @@ import datetime
 from unittest import mock
 
 import testing_config  # Must be imported before the module under test.
-from internals import core_enums, search, search_fulltext, search_queries
+from internals import (
+    core_enums,
+    rank_tables,
+    search,
+    search_fulltext,
+    search_queries,
+)
 from internals.core_models import FeatureEntry, MilestoneSet, Stage
 from internals.review_models import Gate, Vote
 
@@ -402,6 +408,58 @@ class SearchFeaturesTest(testing_config.CustomTestCase):
         actual = search._resolve_promise_to_id_list(future)
         self.assertEqual([self.feature_1_id, self.feature_2_id], actual)
 
+    def test_rank_table_columns__field(self):
+        """We can get a rank table to sort features in either order."""
+        [(table, descending)] = search_queries.rank_table_columns('name')
+        self.assertFalse(descending)
+        self.assertEqual(
+            [self.feature_1_id, self.feature_2_id, self.feature_3_id],
+            table.ordered_ids(),
+        )
+
+        [(table, descending)] = search_queries.rank_table_columns('-name')
+        self.assertTrue(descending)
+        self.assertEqual(
+            [self.feature_3_id, self.feature_2_id, self.feature_1_id],
+            table.ordered_ids(descending),
+        )
+
+    def test_rank_table_columns__joined(self):
+        """We can get rank tables to sort by gate and vote dates."""
+        [(table, _)] = search_queries.rank_table_columns('gate.requested_on')
+        self.assertEqual([self.feature_2_id], table.ordered_ids())
+
+        [(table, _)] = search_queries.rank_table_columns('gate.reviewed_on')
+        self.assertEqual(
+            [self.feature_1_id, self.feature_2_id], table.ordered_ids()
+        )
+
+    def test_rank_table_columns__unindexed(self):
+        """Fields of unindexed properties have no rank table."""
+        self.assertIsNone(search_queries.rank_table_columns('summary'))
+        self.assertEqual([], search_queries.rank_table_columns('zodiac'))
+
+    def test_rank_table_columns__multiple_columns(self):
+        """We can sort by several columns."""
+        columns = search_queries.rank_table_columns('category, -name')
+        actual = rank_tables.sort_feature_ids(
+            [self.feature_1_id, self.feature_2_id, self.feature_3_id], columns
+        )
+        self.assertEqual(
+            [self.feature_3_id, self.feature_2_id, self.feature_1_id], actual
+        )
+
+    def test_rank_table_columns__patched_on_put(self):
+        """Putting a feature updates the rank tables."""
+        search_queries.rank_table_columns('name')
+        self.feature_3.name = 'a feature'
+        self.feature_3.put()
+        [(table, _)] = search_queries.rank_table_columns('name')
+        self.assertEqual(
+            [self.feature_3_id, self.feature_1_id, self.feature_2_id],
+            table.ordered_ids(),
+        )
+
     def test_stage_fields_have_join_conditions(self):
         """Every STAGE_QUERIABLE_FIELDS has a STAGE_TYPES_BY_QUERY_FIELD entry."""
         self.assertCountEqual(
@@ -19,7 +19,8 @@ import testing_config  # isort: split
 import datetime
 from unittest import mock
 
-from internals import core_enums, notifier, search
+from framework import users
+from internals import core_enums, notifier, rank_tables, search
 from internals.core_models import FeatureEntry, MilestoneSet, Stage
 from internals.review_models import Gate, Vote
 from internals.search_queries import Interval
@@ -262,6 +263,32 @@ class SearchParsingTest(testing_config.CustomTestCase):
             "Don't get confused by funny syntax",
         )
 
+    def test_resolve_relative_terms(self):
+        """Relative dates and milestones become concrete values."""
+        context = search.QueryContext(
+            now=datetime.datetime(2024, 5, 15, 13, 30),
+            current_stable_milestone=123,
+        )
+        terms = search.TERM_RE.findall(
+            'created.when>now-7d '
+            'browsers.chrome.desktop=current_stable..current_stable+2 '
+            '-name="now",5 canvas starred-by:me '
+        )
+        self.assertEqual(
+            [
+                ('', 'created.when', '>', '2024-05-08', ''),
+                ('', 'browsers.chrome.desktop', '=', '123..125', ''),
+                ('-', 'name', '=', '2024-05-15,5', ''),
+                ('', '', '', '', 'canvas'),
+                ('', 'starred-by', ':', 'me', ''),
+            ],
+            search.resolve_relative_terms(terms, context),
+        )
+        self.assertEqual(
+            'now+1000000000d',
+            search.resolve_relative_value('now+1000000000d', context),
+        )
+
 
 class SearchFunctionsTest(testing_config.CustomTestCase):
     """Tests for search execution functions."""
@@ -897,28 +924,193 @@ class SearchFunctionsTest(testing_config.CustomTestCase):
         self.assertEqual(1, len(actual))
         self.assertEqual(actual[0]['name'], 'feature 1')
 
-    @mock.patch('internals.search.fetch_all_feature_ids_set')
-    def test_process_query__empty_query_optimization(self, mock_fetch_all):
-        """We do not fetch all feature IDs when the user query is empty."""
-        actual, tc = search.process_query('')
-        mock_fetch_all.assert_not_called()
-
-        # Conversely, if a query consists only of a negation term, it must fetch
-        # all IDs initially so it has a complete set to subtract the matches from.
-        mock_fetch_all.reset_mock()
-        mock_fetch_all.return_value = set(
-            [
-                self.featureentry_1.key.integer_id(),
-                self.featureentry_2.key.integer_id(),
+    @mock.patch('internals.search_bitmaps.fetch_all_feature_ids')
+    def test_process_query__all_ids_cached(self, mock_fetch_all):
+        """We fetch all feature IDs at most once, then reuse the cached set."""
+        visible_ids = [
+            self.featureentry_1.key.integer_id(),
+            self.featureentry_2.key.integer_id(),
+        ]
+        mock_fetch_all.return_value = (
+            visible_ids
+            + [
                 self.featureentry_3.key.integer_id(),
                 self.featureentry_4.key.integer_id(),
-            ]
+            ],
+            {'deleted_unlisted_enterprise=false': visible_ids},
         )
+        actual, tc = search.process_query('')
+        self.assertEqual(1, len(mock_fetch_all.mock_calls))
+
+        # A query consisting only of a negation term subtracts its matches
+        # from the cached set of all IDs rather than fetching them again.
         actual, tc = search.process_query('-owner:me')
-        mock_fetch_all.assert_called_once()
+        self.assertEqual(1, len(mock_fetch_all.mock_calls))
+        self.assertCountEqual(
+            ['feature 1', 'feature 2'], [f['name'] for f in actual]
+        )
+
+    def test_process_query__top_k(self):
+        """Walking the sort order gives the same page as sorting everything."""
+        self.featureentry_3.unlisted = False
+        self.featureentry_3.put()
+        for sort_spec in ['-created.when', 'name', '-accurate_as_of']:
+            for start, num in [(0, 100), (0, 1), (1, 1), (2, 5), (9, 1)]:
+                top_k = search.process_query(
+                    '', sort_spec=sort_spec, start=start, num=num
+                )
+                with mock.patch(
+                    'internals.search.plan_top_k', return_value=None
+                ):
+                    full_sort = search.process_query(
+                        '', sort_spec=sort_spec, start=start, num=num
+                    )
+                self.assertEqual(full_sort, top_k)
 
     @mock.patch('logging.warning')
     def test_process_query__bad(self, mock_warn):
         """Query terms that are not valid, give warnings."""
         self.assertEqual(search.process_query('any:thing e=lse'), ([], 0))
         self.assertEqual(2, len(mock_warn.mock_calls))
+
+
+class TopKTest(testing_config.CustomTestCase):
+    """Tests for walking the sort order to find the first results."""
+
+    def setUp(self):
+        """Set up a rank table where feature 8 has no value."""
+        self.table = rank_tables.RankTable.build(
+            'FeatureEntry.name',
+            {
+                f_id: (f_id, (rank_tables.sort_key(name),))
+                for f_id, name in [(1, 'd'), (2, 'b'), (3, 'c'), (4, 'a')]
+            },
+        )
+        self.columns = [(self.table, False)]
+
+    def test_plan_top_k(self):
+        """Only queries without user terms, sorted by one column, use top-k."""
+        self.assertEqual(
+            (self.table, False), search.plan_top_k([], self.columns)
+        )
+        self.assertIsNone(
+            search.plan_top_k([('', 'name', '=', 'a', None)], self.columns)
+        )
+        self.assertIsNone(search.plan_top_k([], None))
+        self.assertIsNone(search.plan_top_k([], self.columns * 2))
+
+    def test_first_ids_in_order__same_as_sorting(self):
+        """The first IDs are a prefix of the fully sorted results."""
+        result_ids = {1, 2, 4, 8}
+        for descending in [False, True]:
+            expected = rank_tables.sort_feature_ids(
+                result_ids, [(self.table, descending)]
+            )
+            for limit in range(6):
+                self.assertEqual(
+                    expected[:limit],
+                    search._first_ids_in_order(
+                        result_ids, self.table, descending, limit
+                    ),
+                )
+
+
+class IdCacheTest(testing_config.CustomTestCase):
+    """Tests for the keys of the second-tier cache of result IDs."""
+
+    def setUp(self):
+        """Use a fixed time."""
+        self.context = search.QueryContext(
+            now=datetime.datetime(2024, 5, 15, 13, 30),
+            current_stable_milestone=123,
+        )
+
+    def make_key(self, query, user=None):
+        """Return the ID cache key of a query."""
+        terms = search.resolve_relative_terms(
+            search.TERM_RE.findall(query + ' '), self.context
+        )
+        return search.make_id_cache_key(
+            terms, self.context, False, False, False, user
+        )
+
+    def test_make_id_cache_key__shared(self):
+        """Queries that are not personalized share a partition."""
+        self.assertEqual(
+            'FeatureSearch|ids|q=created.when>2024-05-08 -category=1|'
+            'show_unlisted=False|show_deleted=False|show_enterprise=False|'
+            'user=no_access',
+            self.make_key('created.when>now-7d -category=1'),
+        )
+
+    def test_make_id_cache_key__personalized(self):
+        """Personalized queries are stored for each user."""
+        user = users.User(email='reviewer@example.com')
+        key = self.make_key('owner:me', user)
+        self.assertTrue(key.endswith('|user=reviewer@example.com'))
+        self.assertNotEqual(
+            key,
+            self.make_key('owner:me', users.User(email='other@example.com')),
+        )
+
+    def test_make_id_cache_key__gates(self):
+        """Saving a gate changes the key of approval queries only."""
+        user = users.User(email='reviewer@example.com')
+        approval_key = self.make_key('pending-approval-by:me', user)
+        owner_key = self.make_key('owner:me', user)
+
+        Gate(feature_id=1, stage_id=1, gate_type=1, state=Vote.NA).put()
+        self.assertNotEqual(
+            approval_key, self.make_key('pending-approval-by:me', user)
+        )
+        self.assertEqual(owner_key, self.make_key('owner:me', user))
+
+    def test_make_id_cache_key__stars(self):
+        """Starring only changes the key of the user who starred."""
+        user = users.User(email='starrer@example.com')
+        other = users.User(email='other@example.com')
+        user_key = self.make_key('starred-by:me', user)
+        other_key = self.make_key('starred-by:me', other)
+
+        notifier.FeatureStar(email='starrer@example.com', feature_id=1).put()
+        self.assertNotEqual(user_key, self.make_key('starred-by:me', user))
+        self.assertEqual(other_key, self.make_key('starred-by:me', other))
+
+    def test_make_id_cache_key__recent_reviews(self):
+        """Recent reviews depend on votes and on the day."""
+        key = self.make_key('is:recently-reviewed')
+        self.assertIn('|day=2024-05-15|', key)
+        self.assertIn('|Vote@', key)
+
+    def test_seconds_until_tomorrow(self):
+        """Cached IDs of relative queries expire at the end of the day."""
+        self.assertEqual(
+            10 * 60 * 60 + 30 * 60,
+            search.seconds_until_tomorrow(self.context.now),
+        )
+        self.assertEqual(
+            1,
+            search.seconds_until_tomorrow(
+                datetime.datetime(2024, 5, 15, 23, 59, 59, 500000)
+            ),
+        )
+
+    @mock.patch('internals.search.find_result_ids')
+    @mock.patch('internals.search_bitmaps.get_universe')
+    @mock.patch('internals.search_queries.rank_table_columns')
+    def test_process_query__exact_relative_values(
+        self, mock_columns, mock_universe, mock_find
+    ):
+        """Relative values are resolved in the cache key, not in the query."""
+        mock_columns.return_value = [
+            (rank_tables.RankTable('FeatureEntry.created'), True)
+        ]
+        mock_find.side_effect = RuntimeError('stop after finding IDs')
+
+        with self.assertRaises(RuntimeError):
+            search.process_query(
+                'updated.when<now', context=self.context, use_id_cache=True
+            )
+
+        terms = mock_find.call_args.args[0]
+        self.assertEqual([('', 'updated.when', '<', 'now', '')], terms)
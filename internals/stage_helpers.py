@@ -17,7 +17,7 @@
 
 from collections import defaultdict
 from datetime import datetime
-from typing import TypedDict
+from typing import Iterable, TypedDict
 
 from google.cloud import ndb  # type: ignore
 
@@ -26,6 +26,9 @@ from internals import core_enums, fetchchannels
 from internals.core_models import FeatureEntry, MilestoneSet, Stage
 from internals.review_models import Gate
 
+# Datastore allows at most this many values in one IN filter.
+MAX_IN_FILTER_VALUES = 30
+
 
 # Type return value of get_stage_info_for_templates()
 class StageTemplateInfo(TypedDict):
@@ -113,6 +116,46 @@ def organize_all_stages_by_feature(
     return stages_by_feature
 
 
+@ndb.tasklet
+def get_stages_by_feature_async(feature_ids: Iterable[int]):
+    """Start fetching the unarchived stages of many features.
+
+    The stages are fetched with one query for each MAX_IN_FILTER_VALUES
+    features, rather than one query per feature.
+
+    Returns:
+      A future of a dict with every feature ID as a key and that feature's
+      stages as the value, in the same order as a query on one feature.
+    """
+    unique_ids = list(dict.fromkeys(feature_ids))
+    chunk_futures = [
+        Stage.query(
+            # server_op sends one IN filter, rather than one query per value.
+            Stage.feature_id.IN(chunk, server_op=True),
+            Stage.archived == False,  # noqa: E712
+        ).fetch_async()
+        for chunk in utils.chunk_list(unique_ids, MAX_IN_FILTER_VALUES)
+    ]
+    chunk_results = yield chunk_futures
+
+    stages_by_feature: dict[int, list[Stage]] = {
+        feature_id: [] for feature_id in unique_ids
+    }
+    for stages in chunk_results:
+        for stage in stages:
+            stages_by_feature[stage.feature_id].append(stage)
+    for stages in stages_by_feature.values():
+        stages.sort(key=lambda s: s.key.integer_id())
+    return stages_by_feature
+
+
+def get_stages_by_feature(
+    feature_ids: Iterable[int],
+) -> dict[int, list[Stage]]:
+    """Return the unarchived stages of many features, by feature ID."""
+    return get_stages_by_feature_async(feature_ids).get_result()
+
+
 def get_feature_stage_ids_list(feature_id: int) -> list[dict[str, int]]:
     """Return a list of stage types and IDs associated with a given feature."""
     q = Stage.query(Stage.feature_id == feature_id)
@@ -87,6 +87,39 @@ class StageHelpersTest(testing_config.CustomTestCase):
             self.assertEqual(stages_list[0].stage_type, stage_type)
             expected_stage_types.remove(stage_type)
 
+    def test_get_stages_by_feature(self):
+        """Stages of many features are fetched in chunks, by feature."""
+        archived = Stage(
+            feature_id=self.feature_id,
+            stage_type=core_enums.STAGE_DEP_SHIPPING,
+            archived=True,
+        )
+        archived.put()
+        other_ids = list(range(1000, 1000 + stage_helpers.MAX_IN_FILTER_VALUES))
+        other_stage = Stage(
+            feature_id=other_ids[-1], stage_type=core_enums.STAGE_BLINK_SHIPPING
+        )
+        other_stage.put()
+
+        stages_by_feature = stage_helpers.get_stages_by_feature(
+            [self.feature_id, self.feature_id] + other_ids
+        )
+
+        self.assertEqual(
+            [self.feature_id] + other_ids, list(stages_by_feature.keys())
+        )
+        stages = stages_by_feature[self.feature_id]
+        self.assertEqual(5, len(stages))
+        self.assertNotIn(archived.key, [s.key for s in stages])
+        self.assertEqual(
+            sorted(s.key.integer_id() for s in stages),
+            [s.key.integer_id() for s in stages],
+        )
+        self.assertEqual(
+            [other_stage.key], [s.key for s in stages_by_feature[other_ids[-1]]]
+        )
+        self.assertEqual([], stages_by_feature[other_ids[0]])
+
 
 class StageHelpers_Milestones_Test(testing_config.CustomTestCase):
     """Tests for milestone-specific stage helper functions."""
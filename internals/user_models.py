@@ -25,7 +25,7 @@ from google.cloud import ndb  # type: ignore
 
 import hack_components
 import settings
-from framework import rediscache, users
+from framework import rediscache, request_cache, users
 
 
 class UserPref(ndb.Model):
@@ -52,10 +52,9 @@ class UserPref(ndb.Model):
         if not signed_in_user:
             return None
 
-        user_pref_list = (
-            UserPref.query()
-            .filter(UserPref.email == signed_in_user.email())
-            .fetch(1)
+        user_pref_list = request_cache.fetch(
+            UserPref.query().filter(UserPref.email == signed_in_user.email()),
+            1,
         )
         if user_pref_list:
             user_pref = user_pref_list[0]
@@ -129,6 +128,13 @@ class AppUser(ndb.Model):
     @classmethod
     def get_app_user(cls, email: str) -> Optional[AppUser]:
         """Return the AppUser for the specified user, or None."""
+        # Permission checks call this several times per request.
+        return request_cache.get_or_load(
+            ('AppUser', email), lambda: cls._load_app_user(email)
+        )
+
+    @classmethod
+    def _load_app_user(cls, email: str) -> Optional[AppUser]:
         cache_key = 'user|%s' % email
         cached_app_user = rediscache.get(cache_key)
         if cached_app_user:
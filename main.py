@@ -42,6 +42,7 @@ from api import (
     permissions_api,
     processes_api,
     releasenotes_api,
+    request_stats_api,
     review_latency_api,
     reviews_api,
     settings_api,
@@ -133,6 +134,10 @@ metrics_chart_routes: list[Route] = [
         '/data/webfeaturepopularity', metricsdata.WebFeaturePopularityHandler
     ),
     Route('/data/blink/<string:prop_type>', metricsdata.FeatureBucketsHandler),
+    Route(
+        '/data/summary/<string:metric_type>', metricsdata.BucketSummaryHandler
+    ),
+    Route('/data/movers/<string:metric_type>', metricsdata.MoversHandler),
 ]
 
 # TODO(jrobbins): Advance this to v1 once we have it fleshed out
@@ -150,6 +155,7 @@ api_routes: list[Route] = [
         f'{API_BASE}/feature_links_samples',
         feature_links_api.FeatureLinksSamplesAPI,
     ),
+    Route(f'{API_BASE}/request_stats', request_stats_api.RequestStatsAPI),
     Route(f'{API_BASE}/features/<int:feature_id>/votes', reviews_api.VotesAPI),
     Route(
         f'{API_BASE}/features/<int:feature_id>/votes/<int:gate_id>',
@@ -473,6 +479,7 @@ internals_routes: list[Route] = [
     Route(
         '/cron/fetch_webdx_feature_ids', maintenance_scripts.FetchWebdxFeatureId
     ),
+    Route('/cron/refresh_owners_files', maintenance_scripts.RefreshOwnersFiles),
     Route(
         '/cron/generate_review_activities',
         maintenance_scripts.GenerateReviewActivityFile,
@@ -494,6 +501,9 @@ internals_routes: list[Route] = [
         maintenance_scripts.DeleteWPTCoverageReport,
     ),
     Route('/admin/find_stop_words', search_fulltext.FindStopWords),
+    Route(
+        '/tasks/rebuild-fulltext-index', search_fulltext.RebuildFulltextIndex
+    ),
     Route('/tasks/email-subscribers', notifier.FeatureChangeHandler),
     Route('/tasks/detect-intent', detect_intent.IntentEmailHandler),
     Route('/tasks/email-reviewers', notifier.FeatureReviewHandler),
@@ -613,6 +623,14 @@ internals_routes: list[Route] = [
         '/scripts/reset_outstanding_notifications',
         maintenance_scripts.ResetOutstandingNotifications,
     ),
+    Route(
+        '/scripts/rebuild_feature_snapshots',
+        maintenance_scripts.RebuildFeatureSnapshots,
+    ),
+    Route(
+        '/scripts/backfill_latest_metrics',
+        maintenance_scripts.BackfillLatestMetrics,
+    ),
     Route('/_ah/warmup', basehandlers.WarmupHandler),
 ]
 
@@ -16,9 +16,8 @@
 
 from typing import Any
 
-from api import converters
 from framework import basehandlers
-from internals import core_enums
+from internals import core_enums, feature_snapshots
 from pages import form_definitions, form_field_specs
 
 METADATA_FIELD_MAPPING: dict[str, str] = {
@@ -104,7 +103,11 @@ class FeatureDetailHandler(basehandlers.FlaskHandler):
         according to the form definitions for the given feature type.
         """
         fe = self.get_specified_feature(**kwargs)
-        fe_dict = converters.feature_entry_to_json_verbose(fe)
+        feature_id = fe.key.integer_id()
+        snapshots = feature_snapshots.get_snapshots(
+            [feature_id], {feature_id: fe}
+        )
+        fe_dict = snapshots[feature_id][feature_snapshots.VERBOSE]
 
         # Select the appropriate metadata form definition based on feature type.
         if fe.feature_type == core_enums.FEATURE_TYPE_ENTERPRISE_ID:
@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+#
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Times search and the feature list functions on a synthetic corpus.
+
+The benchmark runs in-process against the Datastore emulator, in its own
+namespace, with fakeredis in place of Redis.  Unless --skip-seed is
+given, it first writes a deterministic corpus of FeatureEntries with the
+stages, gates, and votes of their feature types.  Then it times each
+case of a catalog of search queries, get_features_by_impl_status(),
+get_in_milestone(), get_by_ids(), and the converters.
+
+Each case runs with an empty cache and then with the cache that the
+previous runs left behind.  Every run uses a new NDB context, like a
+request does.  The results, including the Datastore, Redis, and HTTP
+calls of each run, are written as JSON so that they can be compared
+across commits.
+
+Usage: python scripts/benchmark_hot_paths.py --features 10000
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable
+from unittest import mock
+
+sys.path = [
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+] + sys.path
+os.environ.setdefault('DATASTORE_EMULATOR_HOST', 'localhost:15606')
+os.environ.setdefault('GOOGLE_CLOUD_PROJECT', 'cr-status-staging')
+os.environ.setdefault('SERVER_SOFTWARE', 'gunicorn')
+
+# ruff: noqa: E402
+import fakeredis
+from google.cloud import ndb  # type: ignore
+
+from api import converters
+from framework import instrumentation, rediscache, users
+from internals import core_enums, feature_helpers, search, stage_helpers
+from internals.core_models import FeatureEntry, MilestoneSet, Stage
+from internals.review_models import Gate, Vote
+
+NAMESPACE = 'benchmark'
+BATCH_SIZE = 500
+NUM_USERS = 200
+NUM_COMPONENTS = 80
+CURRENT_STABLE = 130
+FIRST_MILESTONE = 90
+# Features whose JSON dicts the converter and get_by_ids() cases build.
+PAGE_SIZE = 100
+VOTE_STATES = [
+    Vote.REVIEW_REQUESTED,
+    Vote.REVIEW_STARTED,
+    Vote.NEEDS_WORK,
+    Vote.APPROVED,
+    Vote.DENIED,
+    Vote.NA,
+]
+WORDS = (
+    'api css layout storage network media web font gpu audio video '
+    'canvas worker cache cookie permission sensor payment input scroll '
+    'animation style privacy security accessibility performance'
+).split()
+
+USERS = ['user%d@example.com' % i for i in range(NUM_USERS)]
+COMPONENTS = ['Blink>Component%d' % i for i in range(NUM_COMPONENTS)]
+OMAHA_DATA = [
+    {
+        'versions': [
+            {'channel': 'stable', 'version': '%d.0.1.0' % CURRENT_STABLE},
+            {'channel': 'beta', 'version': '%d.0.1.0' % (CURRENT_STABLE + 1)},
+        ]
+    }
+]
+
+
+def make_feature(rng: random.Random, feature_id: int) -> list[ndb.Model]:
+    """Return a feature and its stages, gates, and votes."""
+    feature_type = rng.choice(list(core_enums.FEATURE_TYPES))
+    created = datetime.datetime(2020, 1, 1) + datetime.timedelta(
+        hours=feature_id
+    )
+    fe = FeatureEntry(
+        id=feature_id,
+        created=created,
+        updated=created + datetime.timedelta(days=rng.randint(0, 900)),
+        name='%s %s feature %d' % tuple(rng.sample(WORDS, 2) + [feature_id]),
+        summary=' '.join(rng.choice(WORDS) for _ in range(30)),
+        category=rng.choice(list(core_enums.FEATURE_CATEGORIES)),
+        feature_type=feature_type,
+        impl_status_chrome=rng.choice(list(core_enums.IMPLEMENTATION_STATUS)),
+        owner_emails=rng.sample(USERS, rng.randint(1, 3)),
+        editor_emails=rng.sample(USERS, rng.randint(0, 2)),
+        blink_components=rng.sample(COMPONENTS, rng.randint(1, 2)),
+        unlisted=rng.random() < 0.02,
+        deleted=rng.random() < 0.01,
+    )
+    entities: list[ndb.Model] = [fe]
+
+    milestone = rng.randint(FIRST_MILESTONE, CURRENT_STABLE + 10)
+    stages_and_gates = core_enums.STAGES_AND_GATES_BY_FEATURE_TYPE[feature_type]
+    for stage_index, (stage_type, gate_types) in enumerate(stages_and_gates):
+        stage_id = feature_id * 100 + stage_index
+        stage = Stage(id=stage_id, feature_id=feature_id, stage_type=stage_type)
+        if rng.random() < 0.5:
+            stage.milestones = MilestoneSet(
+                desktop_first=milestone,
+                desktop_last=milestone + rng.randint(0, 6),
+                android_first=milestone + rng.randint(0, 2),
+            )
+        entities.append(stage)
+
+        for gate_index, gate_type in enumerate(gate_types):
+            gate_id = stage_id * 100 + gate_index
+            votes = [
+                Vote(
+                    id=gate_id * 10 + vote_index,
+                    feature_id=feature_id,
+                    gate_id=gate_id,
+                    gate_type=gate_type,
+                    state=rng.choice(VOTE_STATES),
+                    set_on=fe.updated,
+                    set_by=rng.choice(USERS),
+                )
+                for vote_index in range(rng.choice([0, 0, 1, 2]))
+            ]
+            gate = Gate(
+                id=gate_id,
+                feature_id=feature_id,
+                stage_id=stage_id,
+                gate_type=gate_type,
+                state=votes[-1].state if votes else Gate.PREPARING,
+            )
+            entities.append(gate)
+            entities.extend(votes)
+
+    return entities
+
+
+def seed(client: ndb.Client, num_features: int, seed_value: int) -> None:
+    """Write the synthetic corpus in batches."""
+    rng = random.Random(seed_value)
+    # Skip the cache invalidation of the put hooks while seeding.
+    with (
+        mock.patch.object(rediscache, 'redis_client', None),
+        client.context(cache_policy=False, global_cache_policy=False),
+    ):
+        batch: list[ndb.Model] = []
+        for feature_id in range(1, num_features + 1):
+            batch.extend(make_feature(rng, feature_id))
+            if len(batch) >= BATCH_SIZE:
+                ndb.put_multi(batch)
+                batch = []
+            if feature_id % 1000 == 0:
+                print('Seeded %d features' % feature_id, file=sys.stderr)
+        if batch:
+            ndb.put_multi(batch)
+
+
+def make_search_cases(
+    context: search.QueryContext,
+) -> list[tuple[str, Callable[[], Any]]]:
+    """Return a catalog of queries like the ones users send."""
+    queries = [
+        ('', '-updated.when'),
+        ('browsers.chrome.status=5', None),
+        ('category=%d' % core_enums.CSS, None),
+        ('feature_type=%d' % core_enums.FEATURE_TYPE_INCUBATE_ID, None),
+        ('browsers.chrome.desktop>=%d' % (CURRENT_STABLE - 5), None),
+        ('owner:%s' % USERS[1], None),
+        ('owner:me', '-updated.when'),
+        ('starred-by:me', None),
+        ('pending-approval-by:me', None),
+        ('css', None),
+        ('storage OR cookie', None),
+        ('canvas -browsers.chrome.status=5', 'name'),
+        (
+            'feature_type=%d category=%d'
+            % (
+                core_enums.FEATURE_TYPE_EXISTING_ID,
+                core_enums.WEBCOMPONENTS,
+            ),
+            'created.when',
+        ),
+    ]
+    return [
+        (
+            'search %r sort=%s' % (user_query, sort_spec),
+            lambda q=user_query, s=sort_spec: search.process_query(
+                q, sort_spec=s, context=context
+            ),
+        )
+        for user_query, sort_spec in queries
+    ]
+
+
+def make_cases(
+    client: ndb.Client, num_features: int, seed_value: int
+) -> list[tuple[str, Callable[[], Any]]]:
+    """Return the name and function of each case."""
+    rng = random.Random(seed_value)
+    page_ids = sorted(rng.sample(range(1, num_features + 1), PAGE_SIZE))
+    with client.context():
+        page = [
+            fe
+            for fe in ndb.get_multi(
+                [ndb.Key(FeatureEntry, feature_id) for feature_id in page_ids]
+            )
+            if fe
+        ]
+        stages = stage_helpers.get_stages_by_feature(page_ids)
+
+    context = search.QueryContext(
+        now=datetime.datetime.now(), current_stable_milestone=CURRENT_STABLE
+    )
+    cases = make_search_cases(context)
+    cases += [
+        (
+            'get_features_by_impl_status',
+            feature_helpers.get_features_by_impl_status,
+        ),
+        (
+            'get_in_milestone',
+            lambda: feature_helpers.get_in_milestone(CURRENT_STABLE),
+        ),
+        (
+            'get_by_ids %d' % PAGE_SIZE,
+            lambda: feature_helpers.get_by_ids(page_ids),
+        ),
+        (
+            'feature_entry_to_json_verbose %d' % PAGE_SIZE,
+            lambda: [
+                converters.feature_entry_to_json_verbose(
+                    fe, prefetched_stages=stages.get(fe.key.integer_id(), [])
+                )
+                for fe in page
+            ],
+        ),
+        (
+            'feature_entry_to_json_basic %d' % PAGE_SIZE,
+            lambda: [
+                converters.feature_entry_to_json_basic(
+                    fe, stages.get(fe.key.integer_id(), [])
+                )
+                for fe in page
+            ],
+        ),
+    ]
+    return cases
+
+
+def time_case(
+    client: ndb.Client, func: Callable[[], Any], repeat: int, cold: bool
+) -> dict[str, Any]:
+    """Run one case and return its timings and call counts."""
+    timings = []
+    calls: dict[str, int] = {}
+    for _ in range(repeat):
+        if cold:
+            rediscache.flushall()
+        with client.context(), instrumentation.scope() as metrics:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        calls = dict(metrics.counts)
+    return {
+        'cache': 'cold' if cold else 'warm',
+        'runs': repeat,
+        'min_ms': round(min(timings), 2),
+        'median_ms': round(statistics.median(timings), 2),
+        'max_ms': round(max(timings), 2),
+        'calls': calls,
+    }
+
+
+def get_commit() -> str | None:
+    """Return the commit that is checked out, if git can tell."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.realpath(__file__)),
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    """Seed the corpus, run each case, and write the results."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--features', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--skip-seed', action='store_true')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='benchmark_hot_paths.json')
+    args = parser.parse_args()
+
+    client = ndb.Client(namespace=NAMESPACE)
+    rediscache.redis_client = fakeredis.FakeStrictRedis()
+    instrumentation.install()
+    if not args.skip_seed:
+        seed(client, args.features, args.seed)
+
+    results = []
+    with (
+        mock.patch(
+            'internals.fetchchannels.get_omaha_data', return_value=OMAHA_DATA
+        ),
+        mock.patch.object(
+            users,
+            'get_current_user',
+            return_value=users.User(email=USERS[1]),
+        ),
+    ):
+        for name, func in make_cases(client, args.features, args.seed):
+            for cold in (True, False):
+                result = dict(
+                    name=name, **time_case(client, func, args.repeat, cold)
+                )
+                print(
+                    '%-60s %4s %10.1f ms'
+                    % (name, result['cache'], result['median_ms'])
+                )
+                results.append(result)
+
+    with open(args.output, 'w') as f:
+        json.dump(
+            {
+                'commit': get_commit(),
+                'created': datetime.datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'features': args.features,
+                'seed': args.seed,
+                'cases': results,
+            },
+            f,
+            indent=2,
+        )
+    print('Wrote %s' % args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+#
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares buffered and streamed JSON responses of a large feature list.
+
+Each mode sends a synthetic list of feature dicts like the one from
+/features.json through a Flask test client and reads the body chunk by
+chunk, as a WSGI server would.  Reported for each mode:
+
+  * ttfb ms: time from the request until the first chunk is available.
+  * total ms: time until the whole body has been read.
+  * peak MiB: peak memory allocated while handling the request, measured
+    with tracemalloc, which is less noisy than RSS of a whole process.
+  * max rss MiB: the process RSS high-water mark after the mode ran.
+    Modes run from the smallest to the largest expected peak, so each
+    growth is caused by the mode on that line.
+
+Usage: python scripts/benchmark_json_streaming.py --features 5000
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+sys.path = [
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+] + sys.path
+os.environ.setdefault('GOOGLE_CLOUD_PROJECT', 'cr-status-staging')
+os.environ.setdefault('SERVER_SOFTWARE', 'gunicorn')
+
+# ruff: noqa: E402
+import flask
+
+from framework import basehandlers
+
+
+def make_feature(feature_id: int) -> dict:
+    """Return a dict of about the size of a basic feature dict."""
+    return {
+        'id': feature_id,
+        'name': 'Feature %d' % feature_id,
+        'summary': 'A summary of the feature. ' * 20,
+        'unlisted': False,
+        'enterprise_impact': 1,
+        'breaking_change': False,
+        'confidential': False,
+        'blink_components': ['Blink>Component'],
+        'resources': {'samples': [], 'docs': ['https://example.com/doc']},
+        'created': {'by': 'user@example.com', 'when': '2024-01-01 00:00:00'},
+        'updated': {'by': 'user@example.com', 'when': '2024-02-01 00:00:00'},
+        'standards': {'spec': 'https://example.com/spec', 'maturity': {}},
+        'browsers': {
+            'chrome': {'status': {'text': 'Proposed', 'val': 1}},
+            'ff': {'view': {'text': 'No signal', 'val': 5}},
+            'safari': {'view': {'text': 'No signal', 'val': 5}},
+        },
+        'stages': [{'id': feature_id * 10 + i} for i in range(6)],
+    }
+
+
+def make_app(handler_data: list[dict]) -> flask.Flask:
+    """Make an app that returns the given list in each mode."""
+
+    class BufferedHandler(basehandlers.APIHandler):
+        def do_get(self, **kwargs):
+            return handler_data
+
+    class StreamedHandler(BufferedHandler):
+        STREAM_JSON = True
+
+    class GeneratorHandler(basehandlers.APIHandler):
+        STREAM_JSON = True
+
+        def do_get(self, **kwargs):
+            # Build each dict only when it is about to be sent.
+            return (make_feature(i) for i in range(len(handler_data)))
+
+    app = flask.Flask(__name__)
+    app.secret_key = 'benchmark'
+    for path, handler_class in [
+        ('/buffered', BufferedHandler),
+        ('/streamed', StreamedHandler),
+        ('/generator', GeneratorHandler),
+    ]:
+        app.add_url_rule(path, view_func=handler_class.as_view(path))
+    return app
+
+
+def measure(app: flask.Flask, path: str) -> tuple[float, float, float, int]:
+    """Return ttfb ms, total ms, peak MiB, and body size for one request."""
+    client = app.test_client()
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(path, buffered=False)
+    chunks = iter(response.response)
+    size = len(next(chunks))
+    ttfb = time.perf_counter() - start
+    for chunk in chunks:
+        size += len(chunk)
+    total = time.perf_counter() - start
+    response.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ttfb * 1000, total * 1000, peak / 2**20, size
+
+
+def max_rss_mib() -> float:
+    """Return the RSS high-water mark of this process."""
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    """Run each mode and print the results."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--features', type=int, default=5000)
+    args = parser.parse_args()
+
+    handler_data = [make_feature(i) for i in range(args.features)]
+    app = make_app(handler_data)
+    print(
+        'encoder: %s'
+        % ('json' if basehandlers.orjson is None else 'orjson for streams')
+    )
+    print(
+        '%-10s %10s %10s %10s %12s %10s'
+        % ('mode', 'ttfb ms', 'total ms', 'peak MiB', 'max rss MiB', 'MiB sent')
+    )
+    for mode in ('generator', 'streamed', 'buffered'):
+        ttfb, total, peak, size = measure(app, '/' + mode)
+        print(
+            '%-10s %10.1f %10.1f %10.1f %12.1f %10.1f'
+            % (mode, ttfb, total, peak, max_rss_mib(), size / 2**20)
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+#
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares round trips of pipelined rediscache calls with one per key.
+
+The old implementations are reproduced below.  Each case is run against
+fakeredis, counting the commands and pipelines that would each be one
+network round trip to a real Redis server.  The timings only include
+the in-process cost of fakeredis, so they understate the savings on a
+real network.
+
+Usage: python scripts/benchmark_rediscache.py --keys 1000
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import timeit
+
+sys.path = [
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+] + sys.path
+os.environ.setdefault('GOOGLE_CLOUD_PROJECT', 'cr-status-staging')
+os.environ.setdefault('SERVER_SOFTWARE', 'gunicorn')
+
+# ruff: noqa: E402
+import fakeredis
+from redis.client import Pipeline
+
+from framework import rediscache
+
+PREFIX = 'benchmark'
+
+
+class RoundTripCounter:
+    """Counts commands and pipelines sent by the redis client."""
+
+    def __init__(self, client):
+        """Wrap the client's methods that talk to the server."""
+        self.count = 0
+        execute_command = client.execute_command
+        pipeline_execute = Pipeline.execute
+
+        def counting_execute_command(*args, **kwargs):
+            self.count += 1
+            return execute_command(*args, **kwargs)
+
+        def counting_pipeline_execute(pipeline, *args, **kwargs):
+            self.count += 1
+            return pipeline_execute(pipeline, *args, **kwargs)
+
+        client.execute_command = counting_execute_command
+        Pipeline.execute = counting_pipeline_execute
+
+
+def old_set_multi(entries, time=86400):
+    """The old implementation, with one SET per key."""
+    for key in entries:
+        rediscache.set(key, entries[key], time)
+
+
+def old_delete_keys_with_prefix(prefix):
+    """The old implementation, with default SCAN batches and one DEL per key."""
+    client = rediscache.redis_client
+    pattern = rediscache.add_gae_prefix(prefix + '|*')
+    pos, keys = client.scan(cursor=0, match=pattern)
+    target = keys
+    while pos != 0:
+        pos, keys = client.scan(cursor=pos, match=pattern)
+        target.extend(keys)
+    for key in target:
+        client.delete(key)
+
+
+def make_entries(num_keys):
+    """Return feature dicts like those that get_by_ids() caches."""
+    return {
+        '%s|%d' % (PREFIX, i): {'id': i, 'name': 'Feature %d' % i}
+        for i in range(num_keys)
+    }
+
+
+def fill(entries):
+    """Store entries without counting, using MSET."""
+    rediscache.redis_client.mset(
+        {
+            rediscache.add_gae_prefix(k): pickle.dumps(v)
+            for k, v in entries.items()
+        }
+    )
+
+
+def main():
+    """Run each case and print round trips and timings."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--keys', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rediscache.redis_client = fakeredis.FakeStrictRedis()
+    counter = RoundTripCounter(rediscache.redis_client)
+    entries = make_entries(args.keys)
+
+    cases = [
+        ('set_multi with TTL', old_set_multi, rediscache.set_multi, False),
+        (
+            'delete_keys_with_prefix',
+            old_delete_keys_with_prefix,
+            rediscache.delete_keys_with_prefix,
+            True,
+        ),
+    ]
+    print('%d keys' % args.keys)
+    print(
+        '%-26s %12s %12s %10s %10s'
+        % ('', 'old trips', 'new trips', 'old ms', 'new ms')
+    )
+    for name, old_fn, new_fn, needs_keys in cases:
+        arg = PREFIX if needs_keys else entries
+        results = []
+        for fn in (old_fn, new_fn):
+            rediscache.redis_client.flushall()
+            if needs_keys:
+                fill(entries)
+            counter.count = 0
+            fn(arg)
+            trips = counter.count
+
+            def run():
+                if needs_keys:
+                    fill(entries)
+                fn(arg)
+
+            seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+            results.append((trips, seconds * 1000))
+        (old_trips, old_ms), (new_trips, new_ms) = results
+        print(
+            '%-26s %12d %12d %10.1f %10.1f'
+            % (name, old_trips, new_trips, old_ms, new_ms)
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+#
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the size and speed of rediscache codecs on feature dicts.
+
+The payloads have the shape of converters.feature_entry_to_json_basic(),
+with generated text of typical lengths.  Each case is a value that we
+cache: one feature dict, as stored by get_by_ids(), and a list of feature
+dicts, as stored for a milestone or release notes page.
+
+Usage: python scripts/benchmark_rediscache_codecs.py --features 300
+"""
+
+import argparse
+import os
+import pickle
+import random
+import sys
+import timeit
+
+sys.path = [
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+] + sys.path
+os.environ.setdefault('GOOGLE_CLOUD_PROJECT', 'cr-status-staging')
+os.environ.setdefault('SERVER_SOFTWARE', 'gunicorn')
+
+# ruff: noqa: E402
+from framework import rediscache
+
+WORDS = (
+    'the api allows web developers to control how content is rendered and '
+    'provides a new css property for layout with javascript events that '
+    'fire when elements change size or visibility in the viewport'
+).split()
+
+
+def make_text(rng: random.Random, num_words: int) -> str:
+    """Return generated prose."""
+    return ' '.join(rng.choice(WORDS) for _ in range(num_words))
+
+
+def make_view(rng: random.Random) -> dict:
+    """Return a vendor view like _compute_vendor_views()."""
+    return {
+        'text': rng.choice(['No signal', 'Positive', 'Neutral', 'Negative']),
+        'val': rng.randrange(1, 8),
+        'url': 'https://github.com/mozilla/standards-positions/issues/%d'
+        % rng.randrange(1000),
+        'notes': make_text(rng, 10) if rng.random() < 0.3 else None,
+    }
+
+
+def make_feature_dict(rng: random.Random, feature_id: int) -> dict:
+    """Return a dict with the shape of a basic feature dict."""
+    owners = ['owner%d@chromium.org' % rng.randrange(500) for _ in range(2)]
+    components = ['Blink>Layout', 'Blink>CSS'][: rng.randrange(1, 3)]
+    when = '2024-%02d-%02d 10:11:12.123456' % (
+        rng.randrange(1, 13),
+        rng.randrange(1, 29),
+    )
+    return {
+        'id': feature_id,
+        'name': make_text(rng, 4).title(),
+        'summary': make_text(rng, 80),
+        'feature_type_int': rng.randrange(4),
+        'unlisted': False,
+        'enterprise_impact': 1,
+        'enterprise_product_category': 0,
+        'breaking_change': False,
+        'confidential': False,
+        'first_enterprise_notification_milestone': None,
+        'blink_components': components,
+        'resources': {
+            'samples': ['https://example.com/sample/%d' % feature_id],
+            'docs': [],
+        },
+        'creator': owners[0],
+        'editors': [],
+        'owners': owners,
+        'created': {'by': owners[0], 'when': when},
+        'updated': {'by': owners[1], 'when': when},
+        'accurate_as_of': when,
+        'standards': {
+            'spec': 'https://w3c.github.io/spec-%d/' % feature_id,
+            'maturity': {
+                'text': 'Specification being incubated in a Community Group',
+                'short_text': 'Incubation',
+                'val': 2,
+            },
+        },
+        'browsers': {
+            'chrome': {
+                'bug': 'https://crbug.com/%d' % rng.randrange(10**9),
+                'blink_components': components,
+                'devrel': ['devrel@chromium.org'],
+                'owners': owners,
+                'origintrial': False,
+                'prefixed': False,
+                'flag': rng.random() < 0.2,
+                'status': {'text': 'Enabled by default', 'val': 5},
+                'announced': False,
+            },
+            'ff': {'view': make_view(rng)},
+            'safari': {'view': make_view(rng)},
+            'webdev': {'view': {'text': 'No signals', 'val': 4}},
+            'other': {'view': {'notes': None}},
+        },
+        'is_released': True,
+        'milestone': rng.randrange(100, 130),
+    }
+
+
+def measure(key: str, value, repeat: int) -> tuple[int, float, float]:
+    """Return the encoded size and the encode and decode times in ms."""
+    encoded = rediscache.encode(key, value)
+    assert rediscache.decode(encoded) == value
+    encode_s = min(
+        timeit.repeat(
+            lambda: rediscache.encode(key, value), number=10, repeat=repeat
+        )
+    )
+    decode_s = min(
+        timeit.repeat(
+            lambda: rediscache.decode(encoded), number=10, repeat=repeat
+        )
+    )
+    return len(encoded), encode_s * 100, decode_s * 100
+
+
+def measure_old_pickle(value, repeat: int) -> tuple[int, float, float]:
+    """Measure plain pickle, as rediscache stored every value before."""
+    encoded = pickle.dumps(value)
+    encode_s = min(
+        timeit.repeat(lambda: pickle.dumps(value), number=10, repeat=repeat)
+    )
+    decode_s = min(
+        timeit.repeat(lambda: pickle.loads(encoded), number=10, repeat=repeat)
+    )
+    return len(encoded), encode_s * 100, decode_s * 100
+
+
+def main():
+    """Run each codec on each payload and print the results."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--features', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    features = [make_feature_dict(rng, i) for i in range(args.features)]
+    rediscache.use_codec('json', rediscache.CODEC_JSON)
+    payloads = [
+        ('one feature dict', features[0]),
+        ('%d feature dicts' % args.features, features),
+    ]
+    codecs = [
+        ('pickle (old)', None),
+        ('pickle + zlib', 'pickle|1'),
+        ('json + zlib', 'json|1'),
+    ]
+
+    print(
+        '%-22s %-14s %10s %10s %10s'
+        % ('payload', 'codec', 'bytes', 'encode ms', 'decode ms')
+    )
+    for payload_name, value in payloads:
+        for codec_name, key in codecs:
+            if key is None:
+                size, encode_ms, decode_ms = measure_old_pickle(
+                    value, args.repeat
+                )
+            else:
+                size, encode_ms, decode_ms = measure(key, value, args.repeat)
+            print(
+                '%-22s %-14s %10d %10.3f %10.3f'
+                % (payload_name, codec_name, size, encode_ms, decode_ms)
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+#
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the bitmap search engine with the old set-based implementation.
+
+Each case combines the ID lists that search terms would return, the way
+process_query() does, including the permission term that every search
+has.  The bitmap engine gets the permission term and the set of all
+features from the cached universe, while the set engine must convert the
+permission query results on every search.  The set timings do not include
+the Datastore queries that the old implementation needed for those, so
+they understate its real cost.
+
+Usage: python scripts/benchmark_search_bitmaps.py --features 20000
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path = [
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+] + sys.path
+os.environ.setdefault('GOOGLE_CLOUD_PROJECT', 'cr-status-staging')
+os.environ.setdefault('SERVER_SOFTWARE', 'gunicorn')
+
+# ruff: noqa: E402
+from internals.search_bitmaps import FeatureIdUniverse
+
+
+def make_corpus(num_features: int) -> list[int]:
+    """Return sparse feature IDs that look like NDB-allocated IDs."""
+    rng = random.Random(1)
+    return rng.sample(
+        range(5_000_000_000_000_000, 6_000_000_000_000_000), num_features
+    )
+
+
+def set_and_not(all_ids, permission_ids, term_lists):
+    """The old implementation of: -term0 term1."""
+    result = set(all_ids)
+    result.difference_update(term_lists[0])
+    result.intersection_update(term_lists[1])
+    result.intersection_update(permission_ids)
+    return len(result)
+
+
+def bitmap_and_not(universe, permission_bitmap, term_lists):
+    """The bitmap implementation of: -term0 term1."""
+    result = universe.all_bitmap() - universe.bitmap(term_lists[0])
+    result = result & universe.bitmap(term_lists[1])
+    return len(result & permission_bitmap)
+
+
+def set_or(all_ids, permission_ids, term_lists):
+    """The old implementation of: term0 OR term1."""
+    result = set(term_lists[0])
+    result.update(term_lists[1])
+    result.intersection_update(permission_ids)
+    return len(result)
+
+
+def bitmap_or(universe, permission_bitmap, term_lists):
+    """The bitmap implementation of: term0 OR term1."""
+    result = universe.bitmap(term_lists[0]) | universe.bitmap(term_lists[1])
+    return len(result & permission_bitmap)
+
+
+def set_permissions_only(all_ids, permission_ids, term_lists):
+    """The old implementation of an empty query."""
+    return len(set(permission_ids))
+
+
+def bitmap_permissions_only(universe, permission_bitmap, term_lists):
+    """The bitmap implementation of an empty query."""
+    return len(permission_bitmap)
+
+
+def main():
+    """Time each case with both implementations and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--features', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    all_ids = make_corpus(args.features)
+    rng = random.Random(2)
+    permission_ids = rng.sample(all_ids, args.features * 9 // 10)
+    term_lists = [
+        rng.sample(all_ids, args.features // 10),
+        rng.sample(all_ids, args.features // 2),
+    ]
+    universe = FeatureIdUniverse(
+        'benchmark', all_ids, {'permissions': permission_ids}
+    )
+    permission_bitmap = universe.term_bitmaps['permissions']
+
+    cases = [
+        ('AND NOT', set_and_not, bitmap_and_not),
+        ('OR', set_or, bitmap_or),
+        ('empty', set_permissions_only, bitmap_permissions_only),
+    ]
+    print(f'{args.features} features, best of {args.repeat} runs')
+    print(f'{"case":10} {"set (ms)":>10} {"bitmap (ms)":>12}')
+    for name, set_impl, bitmap_impl in cases:
+        set_args = (all_ids, permission_ids, term_lists)
+        bitmap_args = (universe, permission_bitmap, term_lists)
+        assert set_impl(*set_args) == bitmap_impl(*bitmap_args)
+        set_time = min(
+            timeit.repeat(
+                lambda: set_impl(*set_args), number=1, repeat=args.repeat
+            )
+        )
+        bitmap_time = min(
+            timeit.repeat(
+                lambda: bitmap_impl(*bitmap_args), number=1, repeat=args.repeat
+            )
+        )
+        print(f'{name:10} {set_time * 1000:10.3f} {bitmap_time * 1000:12.3f}')
+
+    # Once terms are bitmaps, combining them is a single integer operation.
+    a, b = universe.bitmap(term_lists[0]), universe.bitmap(term_lists[1])
+    op_time = min(
+        timeit.repeat(lambda: len((a & b) | (a - b)), number=1, repeat=100)
+    )
+    print(f'bitmap AND+OR+NOT without conversion: {op_time * 1e6:.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+#
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares Datastore queries for the stages of a cold page of features.
+
+The old implementation of get_by_ids() sent one Stage query per feature,
+and the release notes sent one IN filter that NDB splits into one query
+per value on the client.  stage_helpers.get_stages_by_feature() sends one
+server-side IN filter per MAX_IN_FILTER_VALUES features.
+
+Stage.query() is replaced by a fake that counts the queries that would
+each be one RunQuery RPC, so no Datastore or emulator is needed.  The
+latency column is an estimate that assumes the given RPC latency and
+number of RPCs that NDB keeps in flight at once.
+
+Usage: python scripts/benchmark_stage_loading.py --rpc-ms 15
+"""
+
+import argparse
+import math
+import os
+import sys
+import timeit
+from unittest import mock
+
+sys.path = [
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+] + sys.path
+os.environ.setdefault('GOOGLE_CLOUD_PROJECT', 'cr-status-staging')
+os.environ.setdefault('SERVER_SOFTWARE', 'gunicorn')
+# No RPCs are sent, but the client needs somewhere to not send them.
+os.environ.setdefault('DATASTORE_EMULATOR_HOST', 'localhost:15606')
+
+# ruff: noqa: E402
+from google.cloud import ndb  # type: ignore
+
+from internals import stage_helpers
+from internals.core_models import Stage
+
+STAGES_PER_FEATURE = 6
+
+
+class FakeStageQueries:
+    """Answers Stage queries from memory and counts them."""
+
+    def __init__(self, feature_ids: list[int]):
+        """Make STAGES_PER_FEATURE stages for each feature."""
+        self.count = 0
+        self.stages_by_feature: dict[int, list[Stage]] = {}
+        for feature_id in feature_ids:
+            stages = []
+            for i in range(STAGES_PER_FEATURE):
+                stage = Stage(feature_id=feature_id, stage_type=110 + i)
+                stage.key = ndb.Key(Stage, feature_id * 100 + i)
+                stages.append(stage)
+            self.stages_by_feature[feature_id] = stages
+
+    def query(self, feature_filter, archived_filter=None):
+        """Return a fake query for a feature_id filter."""
+        del archived_filter  # No fake stages are archived.
+        if isinstance(feature_filter, ndb.query.DisjunctionNode):
+            # NDB runs a client-side IN as one query per value.
+            values = [node._value for node in feature_filter]
+            self.count += len(values)
+        else:
+            values = feature_filter._value
+            if not isinstance(values, list):
+                values = [values]
+            self.count += 1
+        results = [s for v in values for s in self.stages_by_feature[v]]
+        future = ndb.Future()
+        future.set_result(results)
+        return mock.Mock(fetch_async=mock.Mock(return_value=future))
+
+
+def old_get_by_ids_stages(feature_ids: list[int]) -> dict[int, list[Stage]]:
+    """The old get_by_ids(), with one query per feature."""
+    futures = [
+        Stage.query(
+            Stage.feature_id == f_id,
+            Stage.archived == False,  # noqa: E712
+        ).fetch_async()
+        for f_id in feature_ids
+    ]
+    stages: list[Stage] = []
+    for future in futures:
+        stages.extend(future.get_result())
+    return stage_helpers.organize_all_stages_by_feature(stages)
+
+
+def old_release_notes_stages(
+    feature_ids: list[int],
+) -> dict[int, list[Stage]]:
+    """The old release notes prefetch, with a client-side IN filter."""
+    stages = Stage.query(
+        Stage.feature_id.IN(feature_ids),
+        Stage.archived == False,  # noqa: E712
+    ).fetch_async()
+    return stage_helpers.organize_all_stages_by_feature(stages.get_result())
+
+
+def estimate_ms(queries: int, rpc_ms: float, concurrency: int) -> float:
+    """Estimate latency when at most `concurrency` RPCs are in flight."""
+    return math.ceil(queries / concurrency) * rpc_ms
+
+
+def main():
+    """Run each loader for each page size and print the results."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rpc-ms', type=float, default=15)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    loaders = [
+        ('get_by_ids (old)', old_get_by_ids_stages),
+        ('release notes (old)', old_release_notes_stages),
+        ('get_stages_by_feature', stage_helpers.get_stages_by_feature),
+    ]
+    print(
+        '%-24s %8s %10s %12s %14s'
+        % ('loader', 'features', 'queries', 'cpu ms', 'est. rpc ms')
+    )
+    with ndb.Client().context():
+        for page_size in (10, 100, 1000):
+            feature_ids = list(range(1, page_size + 1))
+            fake = FakeStageQueries(feature_ids)
+            with mock.patch.object(Stage, 'query', side_effect=fake.query):
+                for name, loader in loaders:
+                    fake.count = 0
+                    stages_by_feature = loader(feature_ids)
+                    assert len(stages_by_feature) == page_size
+                    queries = fake.count
+                    seconds = min(
+                        timeit.repeat(
+                            lambda: loader(feature_ids),
+                            number=1,
+                            repeat=args.repeat,
+                        )
+                    )
+                    print(
+                        '%-24s %8d %10d %12.1f %14.0f'
+                        % (
+                            name,
+                            page_size,
+                            queries,
+                            seconds * 1000,
+                            estimate_ms(queries, args.rpc_ms, args.concurrency),
+                        )
+                    )
+
+
+if __name__ == '__main__':
+    main()
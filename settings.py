@@ -95,6 +95,9 @@ MAX_ATTACHMENT_SIZE = 1 * 1024 * 1024
 # Largest overall POST to any handler.
 MAX_REQUEST_CONTENT_LENGTH = 16 * 1024 * 1024
 
+# Requests that take longer than this are logged with their call counts.
+SLOW_REQUEST_MS = 1000
+
 # Origin trials API URL
 OT_URL = 'https://origintrials-staging.corp.google.com/origintrials/'
 OT_API_URL = 'https://staging-chromeorigintrials-pa.sandbox.googleapis.com'
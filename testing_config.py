@@ -102,8 +102,7 @@ class CustomTestCase(unittest.TestCase):
         """Runs the test case, managing the context for NDB and clearing caches."""
         from framework import rediscache
 
-        if rediscache.redis_client:
-            rediscache.redis_client.flushall()
+        rediscache.flushall()
         sign_out()
         client = ndb.Client()
         with client.context():